@@ -0,0 +1,92 @@
+# filler interface generation for nodes with many unconnected ports: the
+# lazy FillerRange expansion against building an Interface object for each
+# filler up front (as before FillerRange), on the same lab
+#
+# run with: uv run python -m benchmarks.fillers [nodes] [ports]
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from eve2cml.eve.interface import FillerRange, Interface
+from eve2cml.eve.node import Node
+from eve2cml.main import Eve2CMLmapper, convert_file
+from eve2cml.options import Options
+from tests.labgen import make_unl
+
+
+def _eager_interfaces(segments, node_def, lab):
+    # every filler is an Interface, all of them are built before the first
+    # one is emitted, with one label lookup per interface
+    interfaces = []
+    for segment in segments:
+        if isinstance(segment, FillerRange):
+            interfaces.extend(
+                Interface(
+                    id=0,
+                    name=segment.name,
+                    obj_type="filler",
+                    network_id=999999,
+                    slot=slot,
+                )
+                for slot in segment.slots
+            )
+        else:
+            interfaces.append(segment)
+    return [
+        iface.as_cml_dict(idx, node_def, lab) for idx, iface in enumerate(interfaces)
+    ]
+
+
+@contextmanager
+def eager():
+    lazy = Node.__dict__["_cml_interfaces"]
+    Node._cml_interfaces = staticmethod(_eager_interfaces)
+    try:
+        yield
+    finally:
+        Node._cml_interfaces = lazy
+
+
+@contextmanager
+def lazy():
+    yield
+
+
+def run(content: str, options: Options, mode):
+    mapper = Eve2CMLmapper.load()
+    lab = convert_file(content, "bench.unl", mapper, options=options)
+    with mode():
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = lab.as_cml_dict()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    interfaces = sum(len(node["interfaces"]) for node in result["nodes"])
+    return elapsed, peak, interfaces, result
+
+
+def main():
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    ports = int(sys.argv[2]) if len(sys.argv) > 2 else 48
+    content = make_unl(nodes, ethernet=ports, template="nxosv9k")
+    print(f"{nodes} nodes x {ports} ports")
+    results = []
+    for label, options, mode in (
+        ("eager Interfaces", Options(), eager),
+        ("lazy FillerRange", Options(), lazy),
+        ("trimmed fillers", Options(trim_fillers=True), lazy),
+    ):
+        elapsed, peak, interfaces, result = run(content, options, mode)
+        results.append(result)
+        print(
+            f"{label:16} {elapsed * 1000:8.1f}ms {peak / 1024 / 1024:8.1f}MB peak "
+            f"{interfaces:8d} interfaces"
+        )
+    # both ways give the same topology
+    assert results[0] == results[1]
+
+
+if __name__ == "__main__":
+    main()
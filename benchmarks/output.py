@@ -0,0 +1,45 @@
+# size and emit/load time of the full and the compact (--compact) output
+#
+# run with: uv run python -m benchmarks.output [nodes] [ports]
+import sys
+import time
+
+import yaml
+
+from eve2cml.compact import compact
+from eve2cml.main import Eve2CMLmapper, cml_yaml, convert_file
+from tests.labgen import make_unl
+
+# the C loader if PyYAML was built with libyaml
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def run(cml: dict):
+    start = time.perf_counter()
+    content = cml_yaml(cml)
+    emitted = time.perf_counter() - start
+    start = time.perf_counter()
+    yaml.load(content, Loader=Loader)
+    loaded = time.perf_counter() - start
+    return len(content.encode("utf-8")), emitted, loaded
+
+
+def main():
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    ports = int(sys.argv[2]) if len(sys.argv) > 2 else 48
+    content = make_unl(nodes, ethernet=ports, template="nxosv9k", config_size=40)
+    lab = convert_file(content, "bench.unl", Eve2CMLmapper.load())
+    cml = lab.as_cml_dict()
+    print(f"{nodes} nodes x {ports} ports")
+    full = None
+    for label, topology in (("full", cml), ("compact", compact(cml))):
+        size, emitted, loaded = run(topology)
+        full = full or size
+        print(
+            f"{label:8} {size / 1024 / 1024:8.2f}MB ({size / full:4.0%}) "
+            f"emit {emitted * 1000:8.1f}ms load {loaded * 1000:8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# style and color parsing of text object annotations
+#
+# run with: uv run python -m benchmarks.styles [objects]
+import sys
+import time
+
+from eve2cml.eve import style
+
+STYLES = [
+    "display: inline; position: absolute; left: {n}px; top: {n}px; cursor: move; "
+    "z-index: 1001; transform: rotate(15deg); width: 249.675px; height: 146.137px;",
+    "vertical-align: top; color: rgb(255, 255, 255); "
+    "background-color: rgb(255, 0, 0); font-size: 60.3px; font-weight: normal;",
+    "z-index: 90;",
+]
+COLORS = ["rgb(0, 0, 0)", "rgba(255, 255, 255, 0)", "#000000", "hsl(0, 100%, 50%)"]
+
+
+def workload(first: int, last: int):
+    for n in range(first, last):
+        for template in STYLES:
+            parsed = style.parse_style(template.format(n=n % 50))
+            style.parse_rotate(parsed.get("transform", ""))
+        for color in COLORS:
+            style.color_convert(color)
+
+
+def main():
+    objects = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    cached = [
+        style._declarations,
+        style.color_convert,
+        style.parse_rotate,
+    ]
+    print(f"{objects} text objects")
+    for label in ("uncached", "cached"):
+        for func in cached:
+            func.cache_clear()
+        start = time.perf_counter()
+        if label == "uncached":
+            # a cold cache for every text object
+            for n in range(objects):
+                workload(n, n + 1)
+                for func in cached:
+                    func.cache_clear()
+        else:
+            workload(0, objects)
+        elapsed = time.perf_counter() - start
+        print(f"{label:16} {elapsed * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
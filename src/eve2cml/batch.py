@@ -0,0 +1,423 @@
+import io
+import json
+import logging
+import multiprocessing
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from multiprocessing.connection import Connection, wait
+from multiprocessing.process import BaseProcess
+from typing import Any, Optional
+from xml.etree.ElementTree import ParseError
+
+from . import ir
+from .dedup import Deduplicator, LabSource
+from .diagnostics import Diagnostics
+from .eve import Lab
+from .filters import SourceFilter
+from .log import log_queue, worker_logging
+from .mapper import Eve2CMLmapper
+from .options import Options
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore[assignment]
+
+_LOGGER = logging.getLogger(__name__)
+
+# errors of a lab file itself, these stop the batch without --keep-going
+PARSE_ERRORS = (ParseError, UnicodeDecodeError, ValueError)
+
+BACKENDS = ("processes", "threads")
+
+
+class Limits:
+    def __init__(
+        self,
+        timeout: float = 0,
+        max_memory: int = 0,
+        jobs: int = 1,
+        backend: str = "processes",
+    ):
+        # timeout in seconds and max_memory in bytes per lab, 0 is no limit,
+        # they need the process backend
+        self.timeout = timeout
+        self.max_memory = max_memory
+        self.jobs = jobs
+        self.backend = backend
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(timeout={self.timeout}, max_memory={self.max_memory}, jobs={self.jobs}, backend={self.backend})"
+
+    @property
+    def isolated(self) -> bool:
+        # labs are parsed in worker processes when any limit is set
+        if self.backend == "threads":
+            return False
+        return self.timeout > 0 or self.max_memory > 0 or self.jobs > 1
+
+    @property
+    def threaded(self) -> bool:
+        return self.backend == "threads" and self.jobs > 1
+
+
+class Failure:
+    def __init__(self, filename: str, reason: str, detail: str = ""):
+        self.filename = filename
+        self.reason = reason
+        self.detail = detail
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"filename": self.filename, "reason": self.reason, "detail": self.detail}
+
+
+class FailureReport:
+    def __init__(self):
+        self.failures: list[Failure] = []
+
+    def __len__(self) -> int:
+        return len(self.failures)
+
+    def add(self, filename: str, reason: str, detail: str = ""):
+        _LOGGER.error("%s: %s %s", filename, reason, detail)
+        self.failures.append(Failure(filename, reason, detail))
+
+    def dump_json(self, out: io.TextIOBase):
+        json.dump([failure.as_dict() for failure in self.failures], out, indent=2)
+        out.write("\n")
+
+    def summary(self) -> str:
+        return "\n".join(
+            f"  {failure.filename}: {failure.reason}" for failure in self.failures
+        )
+
+
+def _address_space() -> int:
+    # the current size of this process, the memory budget comes on top
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError):
+        return 0
+
+
+def _worker(
+    conn: Connection,
+    content: bytes,
+    filename: str,
+    mapper: Eve2CMLmapper,
+    options: Optional[Options],
+    max_memory: int,
+    diagnostics: Optional[Diagnostics] = None,
+    log_queue: Any = None,
+    log_level: int = logging.WARNING,
+):
+    from .main import convert_file
+
+    if log_queue is not None:
+        worker_logging(log_queue, log_level)
+    if max_memory > 0 and resource is not None:
+        limit = _address_space() + max_memory
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        try:
+            lab = convert_file(
+                content.decode("utf-8"), filename, mapper, diagnostics, options
+            )
+        except PARSE_ERRORS as exc:
+            conn.send(("parse-error", str(exc)))
+            return
+        # The lab is converted here as well, within the limits.  The parsed
+        # lab goes back as a snapshot (see ir.py, it holds the converted
+        # annotations) with the converted topology, which is written as it
+        # is, and the diagnostics of both steps.
+        try:
+            cml = lab.as_cml_dict()
+            payload = ir.dumps(lab)
+        except MemoryError:
+            raise
+        except Exception as exc:
+            conn.send(("convert-error", f"{exc.__class__.__name__}: {exc}"))
+            return
+        conn.send(("ok", (payload, cml, diagnostics)))
+    except MemoryError:
+        conn.send(("memory", "memory budget exceeded"))
+    except Exception as exc:
+        conn.send(("error", f"{exc.__class__.__name__}: {exc}"))
+    finally:
+        conn.close()
+
+
+class _Job:
+    def __init__(
+        self, index: int, source: LabSource, process: BaseProcess, deadline: float
+    ):
+        self.index = index
+        self.source = source
+        self.process = process
+        self.deadline = deadline
+
+
+class BatchRunner:
+    # Converts the labs of many files.  A lab which fails is recorded in the
+    # failure report and the batch continues, only parse errors stop it
+    # unless keep_going is set.  With limits, each lab is parsed in a worker
+    # process which is killed when it runs out of time.  The thread backend
+    # parses in parallel without limits.
+    def __init__(
+        self,
+        mapper: Eve2CMLmapper,
+        diagnostics: Optional[Diagnostics] = None,
+        options: Optional[Options] = None,
+        dedup: Optional[Deduplicator] = None,
+        limits: Optional[Limits] = None,
+        keep_going: bool = False,
+        failures: Optional[FailureReport] = None,
+        selection: Optional[SourceFilter] = None,
+    ):
+        self.mapper = mapper
+        self.diagnostics = diagnostics
+        self.options = options
+        self.dedup = dedup
+        self.limits = limits or Limits()
+        self.keep_going = keep_going
+        self.failures = failures if failures is not None else FailureReport()
+        self.selection = selection
+        if self.limits.max_memory > 0 and resource is None:
+            _LOGGER.warning("memory limits are not supported on this platform")
+
+    def _fail(self, filename: str, reason: str, detail: str = "", fatal=False):
+        self.failures.add(filename, reason, detail)
+        if fatal and not self.keep_going:
+            _LOGGER.critical("stopping, use --keep-going to skip labs with errors")
+            sys.exit(1)
+
+    def _sources(self, paths: Iterable[str]) -> Iterator[LabSource]:
+        from .main import lab_sources
+
+        for path in paths:
+            try:
+                yield from lab_sources(path, self.selection)
+            except FileNotFoundError as exc:
+                self._fail(path, "not-found", str(exc), fatal=True)
+
+    def _converted(self, source: LabSource, lab: Lab) -> Lab:
+        if self.dedup is not None:
+            self.dedup.register(source, lab)
+        return lab
+
+    def _failed(self, source: LabSource, reason: str, detail: str, fatal=False):
+        # the duplicates of a failed lab fail with it, also the ones which
+        # come later (see _skip)
+        duplicates = []
+        if self.dedup is not None:
+            duplicates = self.dedup.discard(source, reason)
+        self._fail(source.filename, reason, detail, fatal)
+        for duplicate in duplicates:
+            self._fail(duplicate, reason, f"duplicate of {source.filename}")
+
+    def _skip(self, source: LabSource) -> bool:
+        # duplicates are not parsed again, the same failures are reported for
+        # them with one or more jobs
+        if self.dedup is None:
+            return False
+        failed = self.dedup.failure(source)
+        if failed is not None:
+            self._fail(
+                source.filename, failed.reason, f"duplicate of {failed.filename}"
+            )
+            return True
+        return self.dedup.skip(source, self.diagnostics)
+
+    def run(self, paths: Iterable[str]) -> list[Lab]:
+        if self.limits.isolated:
+            results = self._run_isolated(paths)
+        elif self.limits.threaded:
+            results = self._run_threaded(paths)
+        else:
+            results = self._run_inline(paths)
+        return [results[index] for index in sorted(results)]
+
+    def _run_inline(self, paths: Iterable[str]) -> dict[int, Lab]:
+        from .main import convert_file
+
+        results: dict[int, Lab] = {}
+        for index, source in enumerate(self._sources(paths)):
+            if self._skip(source):
+                continue
+            try:
+                lab = convert_file(
+                    source.read().decode("utf-8"),
+                    source.filename,
+                    self.mapper,
+                    self.diagnostics,
+                    self.options,
+                )
+            except MemoryError:
+                self._failed(source, "memory", "out of memory")
+                continue
+            except PARSE_ERRORS as exc:
+                self._failed(source, "parse-error", str(exc), fatal=True)
+                continue
+            except Exception as exc:
+                # the same as in a worker process
+                self._failed(source, "error", f"{exc.__class__.__name__}: {exc}")
+                continue
+            results[index] = self._converted(source, lab)
+        return results
+
+    def _parse(self, content: bytes, filename: str) -> Lab:
+        from .main import convert_file
+
+        return convert_file(
+            content.decode("utf-8"),
+            filename,
+            self.mapper,
+            self.diagnostics,
+            self.options,
+        )
+
+    def _collect(
+        self,
+        future: Future[Lab],
+        index: int,
+        source: LabSource,
+        results: dict[int, Lab],
+    ):
+        # the same failures as in a worker process
+        try:
+            lab = future.result()
+        except MemoryError:
+            self._failed(source, "memory", "out of memory")
+        except PARSE_ERRORS as exc:
+            self._failed(source, "parse-error", str(exc), fatal=True)
+        except Exception as exc:
+            self._failed(source, "error", f"{exc.__class__.__name__}: {exc}")
+        else:
+            results[index] = self._converted(source, lab)
+
+    def _run_threaded(self, paths: Iterable[str]) -> dict[int, Lab]:
+        # Labs are parsed on a thread pool, the diagnostics are shared.  The
+        # sources, the dedup index and the results are only handled here, a
+        # few labs ahead of the pool are read.
+        results: dict[int, Lab] = {}
+        running: dict[Future[Lab], tuple[int, LabSource]] = {}
+        pool = ThreadPoolExecutor(max_workers=self.limits.jobs)
+        try:
+            for index, source in enumerate(self._sources(paths)):
+                if self._skip(source):
+                    continue
+                future = pool.submit(self._parse, source.read(), source.filename)
+                running[future] = (index, source)
+                if self.dedup is None:
+                    source.release()
+                else:
+                    self.dedup.reserve(source)
+                if len(running) >= 2 * self.limits.jobs:
+                    done, _ = wait_futures(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._collect(future, *running.pop(future), results)
+            for future in list(running):
+                self._collect(future, *running.pop(future), results)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        return results
+
+    def _start(self, context, index: int, source: LabSource) -> tuple[Connection, _Job]:
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_worker,
+            args=(
+                sender,
+                source.read(),
+                source.filename,
+                self.mapper,
+                self.options,
+                self.limits.max_memory,
+                self.diagnostics.fork() if self.diagnostics is not None else None,
+                log_queue(),
+                logging.getLogger().getEffectiveLevel(),
+            ),
+            daemon=True,
+        )
+        process.start()
+        sender.close()
+        if self.dedup is None:
+            source.release()
+        else:
+            # identical labs dispatched while this one is running are skipped
+            self.dedup.reserve(source)
+        timeout = self.limits.timeout
+        deadline = time.monotonic() + timeout if timeout > 0 else float("inf")
+        return receiver, _Job(index, source, process, deadline)
+
+    def _finish(self, conn: Connection, job: _Job, results: dict[int, Lab]):
+        try:
+            status, payload = conn.recv()
+        except EOFError:
+            job.process.join()
+            self._failed(job.source, "crashed", f"exit code {job.process.exitcode}")
+            return
+        finally:
+            conn.close()
+        job.process.join()
+        if status == "ok":
+            snapshot, cml, diagnostics = payload
+            lab = ir.loads(snapshot, self.mapper, self.diagnostics, self.options)
+            lab.converted = cml
+            if self.diagnostics is not None and diagnostics is not None:
+                self.diagnostics.merge(diagnostics)
+            results[job.index] = self._converted(job.source, lab)
+        else:
+            self._failed(job.source, status, payload, fatal=status == "parse-error")
+
+    def _run_isolated(self, paths: Iterable[str]) -> dict[int, Lab]:
+        # forked workers start fast and share the loaded mapper
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        results: dict[int, Lab] = {}
+        running: dict[Connection, _Job] = {}
+        sources = enumerate(self._sources(paths))
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(running) < self.limits.jobs:
+                    item = next(sources, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    index, source = item
+                    if self._skip(source):
+                        continue
+                    conn, job = self._start(context, index, source)
+                    running[conn] = job
+                if len(running) == 0:
+                    break
+
+                deadline = min(job.deadline for job in running.values())
+                timeout = None
+                if deadline != float("inf"):
+                    timeout = max(deadline - time.monotonic(), 0)
+                for ready in wait(list(running), timeout):
+                    assert isinstance(ready, Connection)
+                    self._finish(ready, running.pop(ready), results)
+
+                now = time.monotonic()
+                for conn, job in list(running.items()):
+                    if job.deadline <= now:
+                        del running[conn]
+                        job.process.kill()
+                        job.process.join()
+                        conn.close()
+                        self._failed(
+                            job.source,
+                            "timeout",
+                            f"no result after {self.limits.timeout}s",
+                        )
+        finally:
+            for job in running.values():
+                job.process.kill()
+        return results
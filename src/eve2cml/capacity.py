@@ -0,0 +1,194 @@
+import json
+from collections import Counter
+from typing import Any, Optional, TextIO
+
+from .mapper import Eve2CMLmapper
+
+
+class LabUsage:
+    # expected resources of one generated topology, cpu_share is the vCPUs
+    # scaled by the CPU limit of the nodes
+    def __init__(self, name: str):
+        self.name = name
+        self.nodes = 0
+        self.cpus = 0
+        self.ram = 0
+        self.cpu_share = 0.0
+        # node definitions without values and without defaults
+        self.unknown: Counter[str] = Counter()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(name={self.name}, cpus={self.cpus}, ram={self.ram})"
+
+    def add_node(self, node: dict[str, Any], mapper: Eve2CMLmapper):
+        # the converter leaves cpus and ram empty with an overriding mapping
+        # or when the EVE node has no value, the node definition default is
+        # used then
+        self.nodes += 1
+        node_def = node["node_definition"]
+        defaults = mapper.node_defaults.get(node_def)
+        cpus = node["cpus"]
+        ram = node["ram"]
+        if (cpus is None or ram is None) and defaults is None:
+            self.unknown[node_def] += 1
+        if cpus is None:
+            cpus = defaults.cpus if defaults is not None else 0
+        if ram is None:
+            ram = defaults.ram if defaults is not None else 0
+        self.cpus += cpus
+        self.ram += ram
+        self.cpu_share += cpus * (node["cpu_limit"] or 100) / 100
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "nodes": self.nodes,
+            "cpus": self.cpus,
+            "ram": self.ram,
+            "cpu_share": round(self.cpu_share, 2),
+        }
+
+
+class Host:
+    def __init__(self, index: int, cpus: int, ram: int):
+        self.index = index
+        self.cpus = cpus
+        self.ram = ram
+        self.labs: list[LabUsage] = []
+        self.used_cpus = 0
+        self.used_ram = 0
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(index={self.index}, labs={len(self.labs)})"
+
+    def fits(self, usage: LabUsage) -> bool:
+        return (
+            self.used_cpus + usage.cpus <= self.cpus
+            and self.used_ram + usage.ram <= self.ram
+        )
+
+    def place(self, usage: LabUsage):
+        self.labs.append(usage)
+        self.used_cpus += usage.cpus
+        self.used_ram += usage.ram
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "host": self.index,
+            "cpus": self.used_cpus,
+            "ram": self.used_ram,
+            "labs": [usage.name for usage in self.labs],
+        }
+
+
+def pack(
+    labs: list[LabUsage], cpus: int, ram: int, hosts: int = 0
+) -> tuple[list[Host], list[LabUsage]]:
+    # First fit decreasing: the labs, largest first by the larger of their
+    # CPU and RAM fraction of a host, go to the first host with room for
+    # both.  Without a number of hosts, a host is added when none has room.
+    # Returns the used hosts and the labs which did not fit.
+    def size(usage: LabUsage) -> float:
+        return max(usage.cpus / cpus, usage.ram / ram)
+
+    placed: list[Host] = [Host(idx + 1, cpus, ram) for idx in range(hosts)]
+    unplaced: list[LabUsage] = []
+    for usage in sorted(labs, key=size, reverse=True):
+        host = next((host for host in placed if host.fits(usage)), None)
+        if host is None and hosts == 0:
+            host = Host(len(placed) + 1, cpus, ram)
+            if host.fits(usage):
+                placed.append(host)
+            else:
+                host = None
+        if host is None:
+            unplaced.append(usage)
+            continue
+        host.place(usage)
+    return [host for host in placed if host.labs], unplaced
+
+
+class CapacityReport:
+    # Sums up the expected resources of the generated topologies and, with a
+    # host size, proposes a placement of the labs onto compute hosts.
+    def __init__(
+        self,
+        mapper: Eve2CMLmapper,
+        hosts: int = 0,
+        host_cpus: int = 0,
+        host_ram: int = 0,
+    ):
+        self.mapper = mapper
+        self.hosts = hosts
+        self.host_cpus = host_cpus
+        self.host_ram = host_ram
+        self.labs: list[LabUsage] = []
+
+    def add(self, name: str, cml: dict[str, Any]) -> LabUsage:
+        usage = LabUsage(name)
+        for node in cml["nodes"]:
+            usage.add_node(node, self.mapper)
+        self.labs.append(usage)
+        return usage
+
+    def total(self) -> LabUsage:
+        total = LabUsage("total")
+        for usage in self.labs:
+            total.nodes += usage.nodes
+            total.cpus += usage.cpus
+            total.ram += usage.ram
+            total.cpu_share += usage.cpu_share
+            total.unknown.update(usage.unknown)
+        return total
+
+    def placement(self) -> Optional[tuple[list[Host], list[LabUsage]]]:
+        if self.host_cpus <= 0 or self.host_ram <= 0:
+            return None
+        return pack(self.labs, self.host_cpus, self.host_ram, self.hosts)
+
+    def as_dict(self) -> dict[str, Any]:
+        total = self.total()
+        result: dict[str, Any] = {
+            "labs": [usage.as_dict() for usage in self.labs],
+            "total": total.as_dict(),
+            "unknown": dict(sorted(total.unknown.items())),
+        }
+        placement = self.placement()
+        if placement is not None:
+            hosts, unplaced = placement
+            result["hosts"] = [host.as_dict() for host in hosts]
+            result["unplaced"] = [usage.name for usage in unplaced]
+        return result
+
+    def write_json(self, out: TextIO):
+        json.dump(self.as_dict(), out, indent=2)
+        out.write("\n")
+
+    def write_text(self, out: TextIO):
+        width = max([len(usage.name) for usage in self.labs] + [5])
+        out.write(
+            f"{'lab':<{width}} {'nodes':>6} {'vCPUs':>6} {'RAM MB':>8} {'CPU share':>9}\n"
+        )
+        total = self.total()
+        for usage in [*self.labs, total]:
+            out.write(
+                f"{usage.name:<{width}} {usage.nodes:>6} {usage.cpus:>6} "
+                f"{usage.ram:>8} {usage.cpu_share:>9.2f}\n"
+            )
+        for node_def, count in sorted(total.unknown.items()):
+            out.write(f"no defaults for {node_def} ({count} nodes), not counted\n")
+
+        placement = self.placement()
+        if placement is None:
+            return
+        hosts, unplaced = placement
+        out.write(
+            f"\n{len(hosts)} host(s) with {self.host_cpus} vCPUs and {self.host_ram} MB RAM:\n"
+        )
+        for host in hosts:
+            out.write(
+                f"  host {host.index}: {host.used_cpus} vCPUs, {host.used_ram} MB: "
+                f"{', '.join(usage.name for usage in host.labs)}\n"
+            )
+        if unplaced:
+            out.write(f"not placed: {', '.join(usage.name for usage in unplaced)}\n")
@@ -0,0 +1,48 @@
+from typing import Any
+
+# The compact output profile leaves out the node, interface and link keys
+# which only hold the value CML uses anyway and writes interfaces and links
+# in flow style, one line each.  node_definition, label, x and y are always
+# written.
+
+# keys of a node which CML defaults when they are missing, with that value
+_NODE_DEFAULTS: dict[str, Any] = {
+    "boot_disk_size": None,
+    "configuration": "",
+    "cpu_limit": None,
+    "cpus": None,
+    "data_volume": None,
+    "hide_links": False,
+    "image_definition": None,
+    "ram": None,
+    "tags": [],
+}
+_INTERFACE_DEFAULTS: dict[str, Any] = {"type": "physical"}
+_LINK_DEFAULTS: dict[str, Any] = {"conditioning": {}}
+
+
+class FlowMap(dict):
+    # a mapping written in flow style, see CMLDumper in main.py
+    pass
+
+
+def _without(record: dict[str, Any], defaults: dict[str, Any]) -> dict[str, Any]:
+    return {
+        key: value
+        for key, value in record.items()
+        if key not in defaults or value != defaults[key]
+    }
+
+
+def compact(cml: dict[str, Any]) -> dict[str, Any]:
+    # a copy, the topology itself is not changed
+    nodes = []
+    for node in cml["nodes"]:
+        node = _without(node, _NODE_DEFAULTS)
+        node["interfaces"] = [
+            FlowMap(_without(iface, _INTERFACE_DEFAULTS))
+            for iface in node.get("interfaces", [])
+        ]
+        nodes.append(node)
+    links = [FlowMap(_without(link, _LINK_DEFAULTS)) for link in cml["links"]]
+    return {**cml, "nodes": nodes, "links": links}
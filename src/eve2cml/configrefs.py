@@ -0,0 +1,91 @@
+import os
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from .eve.config import config_digest
+
+# Node configs which several nodes share can be written once: as a YAML
+# anchor which the other nodes refer to with an alias, or as a file named
+# by the SHA-256 of the config, <dir>/<hash>.cfg, which the topology refers
+# to with a !config tag.  Only configs of at least min_size bytes are
+# written like this, the others stay inline.
+
+
+class SharedConfig(str):
+    # a config written once with an anchor, see CMLAnchorDumper in main.py
+    pass
+
+
+class ConfigFile:
+    # a config in a file, the path is relative to the topology
+    def __init__(self, path: str):
+        self.path = path
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(path={self.path})"
+
+
+def _large(config: Any, min_size: int) -> bool:
+    return isinstance(config, str) and len(config) >= max(min_size, 1)
+
+
+def shared_configs(cml: dict[str, Any], min_size: int) -> dict[str, Any]:
+    # equal configs become the same object, the YAML emitter anchors an
+    # object on its first use and writes an alias for the others
+    shared: dict[str, SharedConfig] = {}
+    nodes = []
+    for node in cml["nodes"]:
+        config = node.get("configuration")
+        if _large(config, min_size):
+            node = {
+                **node,
+                "configuration": shared.setdefault(config, SharedConfig(config)),
+            }
+        nodes.append(node)
+    return {**cml, "nodes": nodes}
+
+
+def config_files(
+    cml: dict[str, Any], directory: Path, base: Path, min_size: int
+) -> tuple[dict[str, Any], dict[Path, str]]:
+    # Returns the topology with references and the config files to write.
+    # base is the directory of the topology.
+    files: dict[Path, str] = {}
+    nodes = []
+    for node in cml["nodes"]:
+        config = node.get("configuration")
+        if _large(config, min_size):
+            target = directory / f"{config_digest(config)}.cfg"
+            files[target] = config
+            reference = ConfigFile(Path(os.path.relpath(target, base)).as_posix())
+            node = {**node, "configuration": reference}
+        nodes.append(node)
+    return {**cml, "nodes": nodes}, files
+
+
+class ConfigLoader(yaml.SafeLoader):
+    # reads the !config references relative to base, the directory of the
+    # topology
+    def __init__(self, stream, base: Path = Path(".")):
+        super().__init__(stream)
+        self.base = base
+
+
+def _construct_config(loader: ConfigLoader, node: yaml.ScalarNode) -> str:
+    path = loader.base / loader.construct_scalar(node)
+    return path.read_text(encoding="utf-8")
+
+
+ConfigLoader.add_constructor("!config", _construct_config)
+
+
+def load_topology(path: Path) -> dict[str, Any]:
+    # like yaml.load, with the directory of the topology as the base
+    with open(path, encoding="utf-8") as fh:
+        loader = ConfigLoader(fh, path.parent)
+        try:
+            return loader.get_single_data()
+        finally:
+            loader.dispose()
@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import os
+import shutil
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Union
+
+from .diagnostics import Diagnostics, report
+
+if TYPE_CHECKING:
+    from .eve import Lab
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LabSource:
+    # a lab file before it is parsed: a plain file or a ZIP member
+    def __init__(self, filename: str, crc: int, size: int, read: Callable[[], bytes]):
+        self.filename = filename
+        self.crc = crc
+        self.size = size
+        self._read = read
+        self._content: Optional[bytes] = None
+        self._digest: Optional[str] = None
+
+    def read(self) -> bytes:
+        if self._content is None:
+            self._content = self._read()
+        return self._content
+
+    def release(self):
+        # the content is only needed once for parsing, the digest stays
+        self._content = None
+
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.read()).hexdigest()
+        return self._digest
+
+
+class PendingLab:
+    # stands in for a lab which is still being parsed (in a worker process),
+    # duplicates found meanwhile are handed over when the lab is registered
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.duplicates: list[str] = []
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(filename={self.filename})"
+
+
+class FailedLab:
+    # stands in for a lab which failed, its later duplicates fail the same
+    def __init__(self, filename: str, reason: str):
+        self.filename = filename
+        self.reason = reason
+        self.duplicates: list[str] = []
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(filename={self.filename}, reason={self.reason})"
+        )
+
+
+class Deduplicator:
+    # CRC and size are the cheap key (for ZIP members they come from the
+    # archive directory without reading anything).  A member is only read
+    # to confirm a match of the cheap key by its full content hash, labs
+    # which are converted anyway are hashed while their content is at hand.
+    def __init__(self):
+        self._candidates: dict[
+            tuple[int, int],
+            list[tuple[LabSource, Union[Lab, PendingLab, FailedLab]]],
+        ] = {}
+        self.skipped = 0
+
+    def _find(self, source: LabSource) -> Optional[Union["Lab", PendingLab, FailedLab]]:
+        for candidate, lab in self._candidates.get((source.crc, source.size), []):
+            if candidate.digest == source.digest:
+                return lab
+        return None
+
+    def original(
+        self, source: LabSource
+    ) -> Optional[Union["Lab", PendingLab, FailedLab]]:
+        lab = self._find(source)
+        if lab is not None:
+            self.skipped += 1
+        return lab
+
+    def failure(self, source: LabSource) -> Optional[FailedLab]:
+        # the failed lab this source is a duplicate of
+        lab = self._find(source)
+        return lab if isinstance(lab, FailedLab) else None
+
+    def skip(
+        self, source: LabSource, diagnostics: Optional[Diagnostics] = None
+    ) -> bool:
+        # a duplicate is recorded with its original, which writes its output
+        original = self.original(source)
+        if original is None:
+            return False
+        original.duplicates.append(source.filename)
+        report(
+            diagnostics,
+            "duplicate",
+            original.filename,
+            source.filename,
+            logging.WARNING,
+            "%s is a duplicate of %s, skipped",
+            source.filename,
+            original.filename,
+            logger=_LOGGER,
+        )
+        return True
+
+    def reserve(self, source: LabSource):
+        # a source which is dispatched for parsing, later sources with the
+        # same content are skipped right away
+        self.register(source, PendingLab(source.filename))
+
+    def register(self, source: LabSource, lab: Union["Lab", PendingLab]):
+        _ = source.digest
+        source.release()
+        candidates = self._candidates.setdefault((source.crc, source.size), [])
+        for idx, (candidate, pending) in enumerate(candidates):
+            if candidate is source:
+                lab.duplicates.extend(pending.duplicates)
+                candidates[idx] = (source, lab)
+                return
+        candidates.append((source, lab))
+
+    def discard(self, source: LabSource, reason: str) -> list[str]:
+        # a source which failed, returns the duplicates skipped meanwhile,
+        # later duplicates are found by failure()
+        _ = source.digest
+        source.release()
+        failed = FailedLab(source.filename, reason)
+        candidates = self._candidates.setdefault((source.crc, source.size), [])
+        for idx, (candidate, pending) in enumerate(candidates):
+            if candidate is source:
+                candidates[idx] = (source, failed)
+                return pending.duplicates
+        candidates.append((source, failed))
+        return []
+
+
+def link_or_copy(src: Path, dst: Path):
+    if src.resolve() == dst.resolve():
+        return
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
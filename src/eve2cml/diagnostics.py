@@ -0,0 +1,149 @@
+import io
+import json
+import logging
+import threading
+from collections.abc import Hashable
+from typing import Any, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DiagEvent:
+    def __init__(self, kind: str, key: Hashable, level: int):
+        self.kind = kind
+        self.key = key
+        self.level = level
+        self.count = 0
+        self.labs: dict[str, int] = {}
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "key": list(self.key) if isinstance(self.key, tuple) else self.key,
+            "level": logging.getLevelName(self.level),
+            "count": self.count,
+            "labs": self.labs,
+        }
+
+
+class Diagnostics:
+    # collects conversion events by kind and key, only the first `limit`
+    # occurrences of each kind are passed on to the logger.  Labs converted
+    # on several threads share one collector.
+    def __init__(self, limit: Optional[int] = 5):
+        self.limit = limit
+        self.events: dict[str, dict[Hashable, DiagEvent]] = {}
+        self._logged: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        kind: str,
+        key: Hashable,
+        lab: str,
+        level: int,
+        msg: str,
+        *args,
+        logger: logging.Logger = _LOGGER,
+        stacklevel: int = 2,
+    ):
+        enabled = logger.isEnabledFor(level)
+        with self._lock:
+            events = self.events.setdefault(kind, {})
+            event = events.get(key)
+            if event is None:
+                event = events[key] = DiagEvent(kind, key, level)
+            event.count += 1
+            event.labs[lab] = event.labs.get(lab, 0) + 1
+            if not enabled:
+                return
+            logged = self._logged.get(kind, 0)
+            self._logged[kind] = logged + 1
+
+        # logged outside of the lock, handlers have their own
+        if self.limit is None or logged < self.limit:
+            logger.log(level, msg, *args, stacklevel=stacklevel)
+        elif logged == self.limit:
+            logger.log(level, "more '%s' messages suppressed, see summary", kind)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # sent to and from worker processes, without the lock
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def fork(self) -> "Diagnostics":
+        # an empty collector for a worker process, the messages logged here
+        # count against its limit
+        child = Diagnostics(self.limit)
+        with self._lock:
+            child._logged = dict(self._logged)
+        return child
+
+    def merge(self, other: "Diagnostics"):
+        # the events of a worker process, its logged messages include the
+        # ones logged here before it started
+        with self._lock:
+            for kind, events in other.events.items():
+                ours = self.events.setdefault(kind, {})
+                for key, event in events.items():
+                    found = ours.get(key)
+                    if found is None:
+                        found = ours[key] = DiagEvent(kind, key, event.level)
+                    found.count += event.count
+                    for lab, count in event.labs.items():
+                        found.labs[lab] = found.labs.get(lab, 0) + count
+            for kind, logged in other._logged.items():
+                self._logged[kind] = max(self._logged.get(kind, 0), logged)
+
+    def __len__(self) -> int:
+        return sum(len(events) for events in self.events.values())
+
+    def as_dict(self) -> dict[str, list[dict[str, Any]]]:
+        return {
+            kind: [event.as_dict() for event in events.values()]
+            for kind, events in self.events.items()
+        }
+
+    def dump_json(self, out: io.TextIOBase):
+        json.dump(self.as_dict(), out, indent=2)
+        out.write("\n")
+
+    def summary(self, level: int = logging.WARNING) -> str:
+        lines: list[str] = []
+        for kind, events in self.events.items():
+            shown = [event for event in events.values() if event.level >= level]
+            if len(shown) == 0:
+                continue
+            total = sum(event.count for event in shown)
+            lines.append(f"{kind}: {total} occurrence(s), {len(shown)} distinct")
+            for event in sorted(shown, key=lambda e: e.count, reverse=True):
+                key = event.key
+                if isinstance(key, tuple):
+                    key = ":".join(str(k) for k in key)
+                lines.append(
+                    f"  {key}: {event.count}x in {len(event.labs)} lab(s): "
+                    + ", ".join(sorted(event.labs))
+                )
+        return "\n".join(lines)
+
+
+def report(
+    diag: Optional[Diagnostics],
+    kind: str,
+    key: Hashable,
+    lab: str,
+    level: int,
+    msg: str,
+    *args,
+    logger: logging.Logger = _LOGGER,
+):
+    # without a collector, this logs every single occurrence like before
+    if diag is None:
+        logger.log(level, msg, *args, stacklevel=2)
+        return
+    diag.record(kind, key, lab, level, msg, *args, logger=logger, stacklevel=3)
@@ -0,0 +1,61 @@
+import binascii
+import mimetypes
+import re
+
+# base64 data URIs, like in <img src="data:image/png;base64,..."> or in a
+# style with url(data:...), the payload can contain line breaks
+_DATA_URI = re.compile(
+    r"data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?:;[\w.+-]+=[^;,\"')\s]*)*;base64,"
+    r"(?P<payload>[A-Za-z0-9+/=\s]*)"
+)
+
+# the reference which replaces a data URI in the HTML of a text object
+SCHEME = "eve2cml-blob"
+
+
+class Blob:
+    # an inline binary payload, only its position in the decoded HTML is
+    # kept, the content is decoded again when it is actually needed
+    def __init__(self, index: int, mime: str, start: int, end: int):
+        self.index = index
+        self.mime = mime
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(index={self.index}, mime={self.mime}, size={self.size})"
+
+    @property
+    def size(self) -> int:
+        # approximate size of the decoded content
+        return (self.end - self.start) * 3 // 4
+
+    @property
+    def extension(self) -> str:
+        return mimetypes.guess_extension(self.mime) or ".bin"
+
+    def content(self, html: str) -> bytes:
+        return binascii.a2b_base64(html[self.start : self.end])
+
+
+def strip_blobs(html: str) -> tuple[str, list[Blob]]:
+    # replaces the data URIs with references, the HTML parser never sees
+    # the payload
+    blobs: list[Blob] = []
+    parts: list[str] = []
+    pos = 0
+    for match in _DATA_URI.finditer(html):
+        blob = Blob(
+            len(blobs),
+            match.group("mime") or "application/octet-stream",
+            match.start("payload"),
+            match.end("payload"),
+        )
+        blobs.append(blob)
+        parts.append(html[pos : match.start()])
+        parts.append(f"{SCHEME}:{blob.index}")
+        pos = match.end()
+    if len(blobs) == 0:
+        return html, blobs
+    parts.append(html[pos:])
+    return "".join(parts), blobs
@@ -1,21 +1,68 @@
+import hashlib
+from typing import Optional
 from xml.etree.ElementTree import Element
 
 from .decode import decode_data
 
 
+def config_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ConfigPool:
+    # Decoded configs by the SHA-256 of their content.  Identical configs,
+    # like the same startup config of many nodes of a training lab, share
+    # one string.  There is one pool per lab (see Objects).
+    def __init__(self):
+        self._bodies: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+    def intern(self, text: str) -> str:
+        if not text:
+            return text
+        return self._bodies.setdefault(config_digest(text), text)
+
+
 class Config:
     def __init__(self, id: int, data: str):
         self.id = id
-        self.data = data
-        self._data: str
+        self._raw = data
+        self._data: Optional[str] = None
+        self.pool: Optional[ConfigPool] = None
 
+    # the base64 data is only decoded when the config is actually used
     @property
-    def data(self):
+    def data(self) -> str:
+        if self._data is None:
+            data = decode_data(self._raw)
+            if self.pool is not None:
+                data = self.pool.intern(data)
+            self._data = data
         return self._data
 
     @data.setter
     def data(self, value: str):
-        self._data = decode_data(value)
+        self._raw = value
+        self._data = None
+
+    @classmethod
+    def from_text(cls, id: int, text: str) -> "Config":
+        # an already decoded config, like from a snapshot
+        config = cls(id, "")
+        config._data = text
+        return config
+
+    def share(self, pool: ConfigPool):
+        # decoded data goes into the pool from now on
+        self.pool = pool
+        if self._data is not None:
+            self._data = pool.intern(self._data)
+
+    @property
+    def decoded(self) -> bool:
+        return self._data is not None
 
     def __str__(self):
         return f"Config ID: {self.id}, Data: {self.data}"
@@ -1,3 +1,5 @@
+import re
+from typing import Optional
 from xml.etree.ElementTree import Element
 
 from .config import Config
@@ -8,10 +10,25 @@ class ConfigSet:
         self.id = id
         self.name = name
         self.configs = configs
+        self._index: Optional[dict[int, Config]] = None
 
     def __str__(self):
         return f"Config Set ID: {self.id}, Name: {self.name}, Contained Configs: {self.configs}"
 
+    def get(self, id: int) -> Optional[Config]:
+        if self._index is None:
+            # assigned when complete, other threads may look up meanwhile
+            index: dict[int, Config] = {}
+            for config in self.configs:
+                index.setdefault(config.id, config)
+            self._index = index
+        return self._index.get(id)
+
+    @property
+    def slug(self) -> str:
+        # usable as part of a filename
+        return re.sub(r"[^\w.-]+", "_", self.name).strip("_") or str(self.id)
+
     @classmethod
     def parse(cls, lab: Element, path) -> list["ConfigSet"]:
         configsets: list[ConfigSet] = []
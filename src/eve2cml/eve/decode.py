@@ -1,13 +1,23 @@
 import base64
+import binascii
 import logging
+import sys
 from typing import Optional
 
 _LOGGER = logging.getLogger(__name__)
 
+# strict mode rejects anything that is not plain base64 (like line breaks),
+# these go through the lenient decoder below
+_STRICT = {"strict_mode": True} if sys.version_info >= (3, 11) else {}
+
 
 def decode_data(data: Optional[str]) -> str:
     if data is None:
         return ""
+    try:
+        return binascii.a2b_base64(data, **_STRICT).decode("utf-8")
+    except (binascii.Error, ValueError):
+        pass
     try:
         decoded = base64.b64decode(data).decode("utf-8")
     except Exception as exc:
@@ -1,5 +1,10 @@
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any
 from xml.etree.ElementTree import Element
 
+if TYPE_CHECKING:
+    from .lab import Lab
+
 
 class Interface:
     def __init__(
@@ -41,12 +46,13 @@ class Interface:
         return f"{self.__class__.__name__}(id={self.id}, slot={self.slot})"
 
     def as_cml_dict(self, idx, node_def, lab):
-        # can likely remove the idx arg as the id should match the idx!
-        assert self.id == idx
+        # idx is the position in the CML interface list (with fillers), the
+        # EVE interface ID is kept
         return {
-            # "id": f"i{self.id}",
             "id": f"i{idx}",
-            "label": lab.mapper.cml_iface_label(self.slot, node_def, self.name),
+            "label": lab.mapper.cml_iface_label(
+                self.slot, node_def, self.name, lab.diagnostics, lab.filename
+            ),
             "slot": self.slot,
             "type": "physical",
         }
@@ -77,3 +83,30 @@ class Interface:
             )
             interfaces.append(interface)
         return interfaces
+
+
+class FillerRange:
+    # a run of unconnected interfaces, only turned into dicts when emitted
+    def __init__(self, slots: range, name: str):
+        self.slots = slots
+        self.name = name
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(slots={self.slots.start}..{self.slots.stop - 1})"
+
+    def as_cml_dicts(
+        self, idx: int, node_def: str, lab: "Lab"
+    ) -> Iterator[dict[str, Any]]:
+        labels = lab.mapper.cml_iface_labels(
+            self.slots, node_def, self.name, lab.diagnostics, lab.filename
+        )
+        for offset, (slot, label) in enumerate(zip(self.slots, labels)):
+            yield {
+                "id": f"i{idx + offset}",
+                "label": label,
+                "slot": slot,
+                "type": "physical",
+            }
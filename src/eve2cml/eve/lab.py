@@ -1,7 +1,12 @@
 import logging
-from typing import Any
+from typing import Any, Optional
 
+from ..diagnostics import Diagnostics, report
+from ..log import log_context
 from ..mapper import Eve2CMLmapper
+from ..options import Options
+from ..rewrite import InterfaceRenamer, rename_table
+from .configset import ConfigSet
 from .interface import Interface
 from .network import Network
 from .node import Node
@@ -52,6 +57,8 @@ class Lab:
         objects: Objects,
         filename: str,
         mapper: Eve2CMLmapper,
+        diagnostics: Optional[Diagnostics] = None,
+        options: Optional[Options] = None,
     ):
         self.name = name
         self.version = version
@@ -66,61 +73,170 @@ class Lab:
         # conversion data
         self.mapper = mapper
         self.filename = filename
-
-        self._links: list[dict[str, Any]] = []
-        self._current_link_id = 0
+        self.diagnostics = diagnostics
+        self.options = options or Options()
+        # filenames of identical labs which were not converted again
+        self.duplicates: list[str] = []
+        # the topology converted in a worker process (see batch.py), used by
+        # the output instead of converting the lab again
+        self.converted: Optional[dict[str, Any]] = None
 
     def as_cml_dict(self):
-        result: dict[str, Any] = {}
-        result["lab"] = {
-            "notes": self.description,
-            "description": f"Imported from {self.filename} via eve2cml converter",
-            "title": self.name,
-            "version": "0.1.0",
-        }
-        result["annotations"] = self.objects.cml_annotations()
-        result["links"] = self.cml_links()
-        result["nodes"] = [
-            node.as_cml_dict(node.id, self) for node in self.topology.nodes
-        ]
+        with log_context(lab=self.filename, phase="convert"):
+            result: dict[str, Any] = {}
+            result["lab"] = {
+                "notes": self.description,
+                "description": f"Imported from {self.filename} via eve2cml converter",
+                "title": self.name,
+                "version": "0.1.0",
+            }
+            result["annotations"] = self.objects.cml_annotations()
+            # the parsed lab is not changed, a lab can be converted again or on
+            # several threads at the same time
+            links, added = self.convert_links()
+            result["links"] = links
+            result["nodes"] = [
+                self._node_dict(node) for node in [*self.topology.nodes, *added]
+            ]
 
-        labels = {node["label"] for node in result["nodes"]}
-        if len(labels) != len(result["nodes"]):
-            _LOGGER.warning(
-                "node labels are not unique, this can not be imported into CML!"
-            )
+            labels = {node["label"] for node in result["nodes"]}
+            if len(labels) != len(result["nodes"]):
+                _LOGGER.warning(
+                    "node labels are not unique, this can not be imported into CML!"
+                )
+
+            return result
 
-        return result
+    def _node_dict(self, node: Node) -> dict[str, Any]:
+        with log_context(node=node.id):
+            return node.as_cml_dict(node.id, self)
+
+    def with_configset(
+        self, cml: dict[str, Any], configset: ConfigSet
+    ) -> dict[str, Any]:
+        # Re-binds the node configurations of an already converted topology
+        # to the given config set.  Everything else is shared with the
+        # original result, this is a shallow copy plus one dict per node.
+        eve_nodes = {f"n{node.id}": node for node in self.topology.nodes}
+        nodes: list[dict[str, Any]] = []
+        for node_dict in cml["nodes"]:
+            node = eve_nodes.get(node_dict["id"])
+            if node is None:
+                nodes.append(node_dict)
+                continue
+            config = configset.get(node.id)
+            configuration = (config.data if config else "") or node.cml_config
+            if self.options.rewrite_ifaces:
+                configuration = self.rewrite_ifaces(
+                    node, configuration, node_dict["interfaces"]
+                )
+            nodes.append({**node_dict, "configuration": configuration})
+        return {**cml, "nodes": nodes}
+
+    def rewrite_ifaces(
+        self, node: Node, config: str, interfaces: list[dict[str, Any]]
+    ) -> str:
+        # the interfaces are the converted ones of the node, the EVE names
+        # are matched to the CML labels by slot
+        if not config:
+            return config
+        labels = {iface["slot"]: iface["label"] for iface in interfaces}
+        renamer = InterfaceRenamer(
+            rename_table(
+                (iface.name, labels[iface.slot])
+                for iface in node.interfaces
+                if iface.slot in labels
+            )
+        )
+        config, count = renamer.rewrite(config)
+        if count > 0:
+            self._report(
+                "renamed",
+                node.template,
+                logging.INFO,
+                "Renamed %d interface reference(s) in the config of %s",
+                count,
+                node.name,
+            )
+        return config
 
     def __str__(self):
         return f"Lab: {self.name}, Version: {self.version}, Script Timeout: {self.scripttimeout}, Countdown: {self.countdown}, Lock: {self.lock}, SAT: {self.sat}"
 
+    def _report(self, kind: str, key, level: int, msg: str, *args):
+        report(
+            self.diagnostics,
+            kind,
+            key,
+            self.filename,
+            level,
+            msg,
+            *args,
+            logger=_LOGGER,
+        )
+
+    def convert_links(self) -> tuple[list[dict[str, Any]], list[Node]]:
+        # the CML links and the nodes added for them (unmanaged switches and
+        # external connectors)
+        builder = _LinkBuilder(self)
+        builder.build()
+        return builder.links, builder.nodes
+
+    def cml_links(self) -> list[dict[str, Any]]:
+        return self.convert_links()[0]
+
+
+class _LinkBuilder:
+    # the state of converting the networks of a lab into links, the added
+    # nodes are kept here and not in the topology of the lab
+    def __init__(self, lab: Lab):
+        self.lab = lab
+        self.options = lab.options
+        self.links: list[dict[str, Any]] = []
+        self.nodes: list[Node] = []
+        self._next_node_id = max([node.id for node in lab.topology.nodes], default=0)
+        # network ID -> (node, interface), nodes added later are indexed too
+        self._index: dict[int, list[tuple[Node, Interface]]] = {}
+        for node in lab.topology.nodes:
+            self._index_node(node)
+
+    def _report(self, kind: str, key, level: int, msg: str, *args):
+        report(
+            self.lab.diagnostics,
+            kind,
+            key,
+            self.lab.filename,
+            level,
+            msg,
+            *args,
+            logger=_LOGGER,
+        )
+
+    def _index_node(self, node: Node):
+        for iface in node.interfaces:
+            self._index.setdefault(iface.network_id, []).append((node, iface))
+
+    def _add_node(self, node: Node):
+        self.nodes.append(node)
+        self._index_node(node)
+
+    def _node_id(self) -> int:
+        self._next_node_id += 1
+        return self._next_node_id
+
     def _network_ifaces(self, network_id: int) -> list[Interface]:
-        interfaces: list[Interface] = []
-        for node in self.topology.nodes:
-            for iface in node.interfaces:
-                if iface.network_id == network_id:
-                    interfaces.append(iface)
-        return interfaces
-
-    def _connect_internal_network(
-        self, ums_node_id: int, network_id: int, name: str
-    ) -> list[CMLlink]:
-        found_ids: list[tuple[int, int]] = []
-        for node in self.topology.nodes:
-            for iface in node.interfaces:
-                if iface.network_id == network_id:
-                    found_ids.append((int(node.id), iface.slot))
+        return [iface for _, iface in self._index.get(network_id, [])]
+
+    def _network_endpoints(self, network_id: int) -> list[tuple[int, int]]:
         return [
-            CMLlink(ums_node_id, idx, *found, name)
-            for idx, found in enumerate(found_ids)
+            (int(node.id), iface.slot)
+            for node, iface in self._index.get(network_id, [])
         ]
 
     def _insert_ext_conn(self, network: Network, config: str, offset=0) -> Node:
-        next_node_id = self.topology.next_node_id()
         obj_type = "cml_ext_conn"
         ext_conn = Node(
-            id=next_node_id,
+            id=self._node_id(),
             name=f"ext-{network.obj_type}-{network.name}",
             interfaces=[
                 Interface(
@@ -138,20 +254,16 @@ class Lab:
             ethernet=1,
         )
         ext_conn.cml_config = config
-        self.topology.nodes.append(ext_conn)
+        self._add_node(ext_conn)
         return ext_conn
 
-    def _insert_ums(self, network: Network, num_ifaces: int):
-        _LOGGER.info("ums")
-        next_node_id = self.topology.next_node_id()
-        ums_links = self._connect_internal_network(
-            next_node_id, network.id, network.name
-        )
-
+    def _add_ums(
+        self, network: Network, name: str, num_ifaces: int, left: int, top: int
+    ) -> Node:
         obj_type = "cml_ums"
         ums = Node(
-            id=next_node_id,
-            name=f"ums-{network.obj_type}-{network.name}",
+            id=self._node_id(),
+            name=name,
             interfaces=[
                 Interface(
                     id=idx,
@@ -164,60 +276,149 @@ class Lab:
             ],
             obj_type=obj_type,
             template=obj_type,
-            left=network.left,
-            top=network.top,
+            left=left,
+            top=top,
         )
         ums.ethernet = 8 if num_ifaces < 8 else num_ifaces
-        self.topology.nodes.append(ums)
-        for link in ums_links:
-            self._links.append(link.as_cml_dict(self._current_link_id))
-            self._current_link_id += 1
+        self._add_node(ums)
+        return ums
 
-    def cml_links(self) -> list[dict[str, Any]]:
-        for network in self.topology.networks:
-            _LOGGER.info("Processing network %d, %s", network.id, network.name)
+    def _add_link(self, link: CMLlink):
+        self.links.append(link.as_cml_dict(len(self.links)))
+
+    def _insert_ums(self, network: Network, num_ifaces: int):
+        endpoints = self._network_endpoints(network.id)
+        max_ports = self.options.max_ums_ports
+        if max_ports and len(endpoints) > max_ports:
+            self._insert_ums_tree(network, endpoints, max(max_ports, 3))
+            return
+
+        ums = self._add_ums(
+            network,
+            f"ums-{network.obj_type}-{network.name}",
+            num_ifaces,
+            network.left,
+            network.top,
+        )
+        for idx, endpoint in enumerate(endpoints):
+            self._add_link(CMLlink(ums.id, idx, *endpoint, network.name))
+
+    def _insert_ums_tree(
+        self, network: Network, endpoints: list[tuple[int, int]], max_ports: int
+    ):
+        # Build a balanced tree of unmanaged switches from the bottom up: each
+        # level groups up to max_ports-1 endpoints on a switch and uses the
+        # last port as the uplink into the next level, the root has no uplink.
+        # A tree for n endpoints needs about n/(max_ports-2) switches.
+        levels: list[list[Node]] = []
+        level = endpoints
+        while len(level) > max_ports:
+            groups = -(-len(level) // (max_ports - 1))
+            size, extra = divmod(len(level), groups)
+            switches: list[Node] = []
+            next_level: list[tuple[int, int]] = []
+            start = 0
+            for group in range(groups):
+                chunk = level[start : start + size + (1 if group < extra else 0)]
+                start += len(chunk)
+                ums = self._add_ums(
+                    network,
+                    f"ums-{network.obj_type}-{network.name}-{len(levels) + 1}.{group}",
+                    len(chunk) + 1,
+                    network.left,
+                    network.top,
+                )
+                for idx, endpoint in enumerate(chunk):
+                    self._add_link(CMLlink(ums.id, idx, *endpoint, network.name))
+                switches.append(ums)
+                next_level.append((ums.id, len(chunk)))
+            levels.append(switches)
+            level = next_level
+
+        root = self._add_ums(
+            network,
+            f"ums-{network.obj_type}-{network.name}",
+            len(level),
+            network.left,
+            network.top,
+        )
+        for idx, endpoint in enumerate(level):
+            self._add_link(CMLlink(root.id, idx, *endpoint, network.name))
+
+        # root sits at the network position, the levels below it in rows
+        for depth, switches in enumerate(reversed(levels), start=1):
+            for idx, ums in enumerate(switches):
+                ums.left = int(network.left + (idx - (len(switches) - 1) / 2) * 120)
+                ums.top = network.top + depth * 120
+
+        _LOGGER.info(
+            "network %s: %d ports on a tree of %d switches",
+            network.name,
+            len(endpoints),
+            sum(len(switches) for switches in levels) + 1,
+        )
+
+    def build(self):
+        for network in self.lab.topology.networks:
             ifcelist = self._network_ifaces(network.id)
             num_ifaces = len(ifcelist)
 
+            self._report(
+                "network",
+                network.obj_type,
+                logging.INFO,
+                "Processing network %d, %s (%s)",
+                network.id,
+                network.name,
+                network.obj_type,
+            )
+
             if network.obj_type == "bridge":
                 if num_ifaces == 2:
-                    _LOGGER.info("p2p")
                     from_iface = ifcelist[0]
                     to_iface = ifcelist[1]
-                    self._links.append(
+                    self._add_link(
                         CMLlink(
                             from_iface.node_id,
                             from_iface.slot,
                             to_iface.node_id,
                             to_iface.slot,
                             network.name,
-                        ).as_cml_dict(self._current_link_id)
+                        )
                     )
-                    self._current_link_id += 1
                 elif num_ifaces > 2:
                     self._insert_ums(network, num_ifaces)
                 else:
-                    _LOGGER.error("Can't deal with bridge with %d ifaces", num_ifaces)
+                    self._report(
+                        "bridge-ports",
+                        num_ifaces,
+                        logging.ERROR,
+                        "Can't deal with bridge with %d ifaces",
+                        num_ifaces,
+                    )
 
             elif network.obj_type.startswith("nat"):
-                _LOGGER.info("nat")
                 if num_ifaces != 1:
-                    _LOGGER.error("NAT interface has %d ifaces", num_ifaces)
+                    self._report(
+                        "nat-ports",
+                        num_ifaces,
+                        logging.ERROR,
+                        "NAT interface has %d ifaces",
+                        num_ifaces,
+                    )
                     continue
                 ext_conn = self._insert_ext_conn(network, config="nat")
-                self._links.append(
+                self._add_link(
                     CMLlink(
                         ifcelist[0].node_id,
                         ifcelist[0].slot,
                         ext_conn.id,
                         0,
                         network.name,
-                    ).as_cml_dict(self._current_link_id)
+                    )
                 )
-                self._current_link_id += 1
 
             elif network.obj_type.startswith("pnet"):
-                _LOGGER.info("pnet")
                 bridge_number = int(network.obj_type.lstrip("pnet"))
                 ext_conn = self._insert_ext_conn(
                     network, config=f"bridge{bridge_number}", offset=64
@@ -225,14 +426,21 @@ class Lab:
                 self._insert_ums(network, num_ifaces + 1)
 
             elif network.obj_type == "internal":
-                _LOGGER.warning("Ignoring internal network %s", network.name)
+                self._report(
+                    "internal",
+                    network.name,
+                    logging.WARNING,
+                    "Ignoring internal network %s",
+                    network.name,
+                )
 
             else:
-                _LOGGER.error(
+                self._report(
+                    "unhandled-network",
+                    network.obj_type,
+                    logging.ERROR,
                     "Unhandled network type %s (%d port(s)) in %s",
                     network.obj_type,
                     num_ifaces,
-                    self.filename,
+                    self.lab.filename,
                 )
-
-        return self._links
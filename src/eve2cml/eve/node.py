@@ -1,8 +1,10 @@
 import logging
-from typing import TYPE_CHECKING
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any, Union
 from xml.etree.ElementTree import Element
 
-from . import Interface
+from ..diagnostics import report
+from .interface import FillerRange, Interface
 
 if TYPE_CHECKING:
     from .lab import Lab
@@ -68,64 +70,87 @@ class Node:
         return f"ID: {self.id}, Name: {self.name}, Type: {self.obj_type}, X: {self.left}, Y: {self.top}, Template: {self.template}, Image: {self.image}, Ethernet: {self.ethernet}"
 
     def as_cml_dict(self, node_id: int, lab: "Lab"):
-        nd_map = lab.mapper.node_def(self.obj_type, self.template, self.image)
+        nd_map = lab.mapper.node_def(
+            self.obj_type, self.template, self.image, lab.diagnostics, lab.filename
+        )
 
-        temp_list: list[Interface] = []
+        # real interfaces and ranges of filler interfaces, in slot order
+        segments: list[Union[Interface, FillerRange]] = []
         prev_idx = 0
         prev_slot = 0
-        _LOGGER.debug(self.interfaces)
+        debug = _LOGGER.isEnabledFor(logging.DEBUG)
+        if debug:
+            _LOGGER.debug(self.interfaces)
         for idx, iface in enumerate(self.interfaces):
             delta = iface.slot - prev_slot
-            _LOGGER.debug(
-                "idx, slot, prev, delta %d/%d/%d/%d", idx, iface.slot, prev_slot, delta
-            )
-            for idx2 in range(delta):
+            if debug:
                 _LOGGER.debug(
-                    "prepending filler interface id %d/%d", prev_idx, prev_slot + idx2
+                    "idx, slot, prev, delta %d/%d/%d/%d",
+                    idx,
+                    iface.slot,
+                    prev_slot,
+                    delta,
                 )
-                temp_list.append(
-                    Interface(
-                        id=prev_idx,
-                        obj_type=self.obj_type,
-                        network_id=999999,
-                        name="filler",
-                        slot=prev_slot + idx2,
+            if delta > 0:
+                if debug:
+                    _LOGGER.debug(
+                        "prepending filler interfaces %d/%d-%d",
+                        prev_idx,
+                        prev_slot,
+                        iface.slot - 1,
                     )
-                )
-                prev_idx += 1
-            iface.id = prev_idx
-            temp_list.append(iface)
+                segments.append(FillerRange(range(prev_slot, iface.slot), "filler"))
+                prev_idx += delta
+            segments.append(iface)
             prev_slot = iface.slot + 1
             prev_idx += 1
 
-        _LOGGER.debug("list %s", temp_list)
+        if debug:
+            _LOGGER.debug("list %s", segments)
 
-        iface_count = len(temp_list)
+        # prev_idx is the number of interfaces at this point
+        iface_count = prev_idx
         iface_diff = int(self.ethernet) - iface_count
+        if lab.options.trim_fillers:
+            iface_diff = 0
         if iface_diff > 0:
-            _LOGGER.info(
+            report(
+                lab.diagnostics,
+                "fillers",
+                nd_map.node_def,
+                lab.filename,
+                logging.INFO,
                 "Filler interfaces needed for Node %d/%s, add %d",
                 self.id,
                 self.name,
                 iface_diff,
+                logger=_LOGGER,
             )
-            for iface_idx in range(iface_diff):
-                id = iface_count + iface_idx
-                temp_list.append(
-                    Interface(
-                        id=id,
-                        obj_type=self.obj_type,
-                        network_id=999999,
-                        slot=id,
-                        name="doesntmatterhere",
-                    )
+            segments.append(
+                FillerRange(
+                    range(iface_count, iface_count + iface_diff), "doesntmatterhere"
                 )
+            )
 
         # If there's no config then use the cml config (which also might be the
         # empty string)
         config = lab.objects.get_config(self.config, self.id) or self.cml_config
 
-        _LOGGER.info("Serializing %s %s", self.name, self.id)
+        report(
+            lab.diagnostics,
+            "serialized",
+            nd_map.node_def,
+            lab.filename,
+            logging.INFO,
+            "Serializing %s %s",
+            self.name,
+            self.id,
+            logger=_LOGGER,
+        )
+        interfaces = list(self._cml_interfaces(segments, nd_map.node_def, lab))
+        if lab.options.rewrite_ifaces:
+            config = lab.rewrite_ifaces(self, config, interfaces)
+
         return {
             "id": f"n{node_id}",
             "boot_disk_size": None,
@@ -141,12 +166,22 @@ class Node:
             "tags": [],
             "x": int(self.left),
             "y": int(self.top),
-            "interfaces": [
-                iface.as_cml_dict(idx, nd_map.node_def, lab)
-                for idx, iface in enumerate(temp_list)
-            ],
+            "interfaces": interfaces,
         }
 
+    @staticmethod
+    def _cml_interfaces(
+        segments: list[Union[Interface, FillerRange]], node_def: str, lab: "Lab"
+    ) -> Iterator[dict[str, Any]]:
+        idx = 0
+        for segment in segments:
+            if isinstance(segment, FillerRange):
+                yield from segment.as_cml_dicts(idx, node_def, lab)
+                idx += len(segment)
+            else:
+                yield segment.as_cml_dict(idx, node_def, lab)
+                idx += 1
+
     @classmethod
     def parse(cls, lab: Element) -> list["Node"]:
         nodes: list[Node] = []
@@ -1,8 +1,8 @@
 import logging
-from typing import Any
+from typing import Any, Optional
 from xml.etree.ElementTree import Element
 
-from .config import Config
+from .config import Config, ConfigPool
 from .configset import ConfigSet
 from .task import Task
 from .textobject import TextObject
@@ -17,25 +17,47 @@ class Objects:
         configs: list[Config],
         configsets: list[ConfigSet],
         textobjects: list[TextObject],
+        annotations: Optional[list[dict[str, Any]]] = None,
     ):
         self.tasks = tasks
         self.configs = configs
         self.configsets = configsets
         self.textobjects = textobjects
+        # the annotations don't depend on the mapper, they are computed once
+        # (or come with a snapshot, see ir.py)
+        self.annotations = annotations
+        self._config_index: Optional[dict[int, Config]] = None
+        # the configs and the configs of the config sets share their content
+        self.config_pool = ConfigPool()
+        for config in configs:
+            config.share(self.config_pool)
+        for configset in configsets:
+            for config in configset.configs:
+                config.share(self.config_pool)
 
     def __str__(self):
         return f"Tasks: {self.tasks}, Configs: {self.configs}, Config Sets: {self.configsets}, Text Objects: {self.textobjects}"
 
+    def get_configset(self, id: int) -> Optional[ConfigSet]:
+        for config_set in self.configsets:
+            if config_set.id == id:
+                return config_set
+        return None
+
     def get_config(self, cfg_set: int, id: int):
         if cfg_set == 1:
-            for config in self.configs:
-                if config.id == id:
-                    return config.data
-            return ""
+            if self._config_index is None:
+                # assigned when complete, like in ConfigSet.get
+                index: dict[int, Config] = {}
+                for config in self.configs:
+                    index.setdefault(config.id, config)
+                self._config_index = index
+            found = self._config_index.get(id)
+            return found.data if found is not None else ""
         for config_set in self.configsets:
-            for config in config_set.configs:
-                if config.id == id:
-                    return config.data
+            found = config_set.get(id)
+            if found is not None:
+                return found.data
         return ""
 
     @classmethod
@@ -56,9 +78,12 @@ class Objects:
         )
 
     def cml_annotations(self) -> list[dict[str, Any]]:
+        if self.annotations is not None:
+            return self.annotations
         annotations: list[dict[str, Any]] = []
         for object in self.textobjects:
             annotation_list = object.as_cml_annotations()
             for annotation in annotation_list:
                 annotations.append(annotation)
+        self.annotations = annotations
         return annotations
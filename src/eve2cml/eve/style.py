@@ -0,0 +1,124 @@
+import colorsys
+import re
+from functools import lru_cache
+from typing import Optional
+
+# A declaration is "name: value", the value may contain quoted strings and
+# parentheses with colons and semicolons in them, like url(data:...;base64,...)
+_DECLARATION = re.compile(
+    r"""\s*([^:;\s][^:;]*?)\s*:\s*((?:[^;"'(]+|"[^"]*"?|'[^']*'?|\([^)]*\)?)*)(?:;|$)"""
+)
+_ALPHA = r"(?:\s*[,/]\s*(\d{1,3}(?:\.\d*)?%?|\.\d+%?))?"
+_RGB = re.compile(
+    r"rgba?\(\s*(\d{1,3})\s*,\s*(\d{1,3})\s*,\s*(\d{1,3})" + _ALPHA + r"\s*\)"
+)
+_HSL = re.compile(
+    r"hsla?\(\s*(\d+(?:\.\d*)?)(?:deg)?\s*[,\s]\s*(\d+(?:\.\d*)?)%\s*[,\s]\s*"
+    r"(\d+(?:\.\d*)?)%" + _ALPHA + r"\s*\)"
+)
+_ROTATE = re.compile(r"rotate\(\s*(-?\d+(?:\.\d*)?)deg\s*\)")
+
+TRANSPARENT = "#00000000"
+
+
+@lru_cache(maxsize=1024)
+def _declarations(style_string: str) -> tuple[tuple[str, str], ...]:
+    return tuple(
+        (match.group(1), match.group(2).strip())
+        for match in _DECLARATION.finditer(style_string)
+    )
+
+
+def parse_style(style_string: str) -> dict[str, str]:
+    # the parsed declarations are shared, every caller gets its own dict
+    return dict(_declarations(style_string))
+
+
+def _alpha(value: Optional[str]) -> int:
+    # EVE writes integer alpha values from 0 to 255, CSS uses fractions
+    # from 0 to 1 or percentages
+    if value is None:
+        return 255
+    alpha: float
+    if value.endswith("%"):
+        alpha = float(value[:-1]) * 255 / 100
+    elif "." in value:
+        alpha = float(value) * 255
+    else:
+        alpha = int(value)
+    if alpha < 0 or alpha > 255:
+        raise ValueError
+    return round(alpha)
+
+
+def _hex(red: int, green: int, blue: int, alpha: int) -> str:
+    return f"#{red:02X}{green:02X}{blue:02X}{alpha:02X}"
+
+
+def rgb_to_hex(rgb_string: str) -> str:
+    match = _RGB.match(rgb_string)
+    if match is None:
+        raise ValueError
+    red, green, blue = (int(v) for v in match.groups()[:3])
+    for value in (red, green, blue):
+        if value > 255:
+            raise ValueError
+    return _hex(red, green, blue, _alpha(match.group(4)))
+
+
+def hsl_to_hex(hsl_string: str) -> str:
+    match = _HSL.match(hsl_string)
+    if match is None:
+        raise ValueError
+    hue, saturation, lightness = (float(v) for v in match.groups()[:3])
+    if saturation > 100 or lightness > 100:
+        raise ValueError
+    rgb = colorsys.hls_to_rgb(hue % 360 / 360, lightness / 100, saturation / 100)
+    red, green, blue = (round(v * 255) for v in rgb)
+    return _hex(red, green, blue, _alpha(match.group(4)))
+
+
+@lru_cache(maxsize=256)
+def color_convert(color: str) -> str:
+    if color.startswith("rgb"):
+        color = rgb_to_hex(color)
+    elif color.startswith("hsl"):
+        color = hsl_to_hex(color)
+    elif color == "transparent":
+        return TRANSPARENT
+    if color.startswith("#") and len(color) in (4, 5):
+        # short hex notation, #RGB and #RGBA
+        color = "#" + "".join(c * 2 for c in color[1:])
+    if color.startswith("#") and len(color) == 7:
+        return f"{color}FF"
+    return color
+
+
+def parse_opacity(opacity: str) -> float:
+    opacity = opacity.strip()
+    if opacity.endswith("%"):
+        value = float(opacity[:-1]) / 100
+    else:
+        value = float(opacity)
+    return min(max(value, 0.0), 1.0)
+
+
+@lru_cache(maxsize=256)
+def with_opacity(color: str, *opacities: str) -> str:
+    # scale the alpha channel of a converted #RRGGBBAA color with CSS/SVG
+    # opacity values, anything else is returned unchanged
+    if len(color) != 9 or not color.startswith("#"):
+        return color
+    alpha = int(color[7:], 16)
+    for opacity in opacities:
+        if opacity:
+            alpha = round(alpha * parse_opacity(opacity))
+    return f"{color[:7]}{alpha:02X}"
+
+
+@lru_cache(maxsize=64)
+def parse_rotate(rotate: str) -> int:
+    match = _ROTATE.search(rotate)
+    if match:
+        return int(float(match.group(1)))
+    return 0
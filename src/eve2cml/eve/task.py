@@ -11,8 +11,24 @@ class Task:
         self.obj_type = obj_type
         self.data = data
 
+    # data is the raw base64 content, text is decoded once on first access
+    @property
+    def data(self) -> Optional[str]:
+        return self._raw
+
+    @data.setter
+    def data(self, value: Optional[str]):
+        self._raw = value
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = decode_data(self._raw)
+        return self._text
+
     def __str__(self):
-        return f"Task {self.id}, Name: {self.name}, Type: {self.obj_type}, Data: {decode_data(self.data)}"
+        return f"Task {self.id}, Name: {self.name}, Type: {self.obj_type}, Data: {self.text}"
         # return f"Task {self.id}, Name: {self.name}, Type: {self.obj_type}"
 
     @classmethod
@@ -1,12 +1,17 @@
 import logging
-import re
 from functools import cached_property
 from typing import Any, Optional
 from xml.etree.ElementTree import Element
 
 from bs4 import BeautifulSoup, ResultSet
 
+from .blob import Blob, strip_blobs
 from .decode import decode_data
+from .style import color_convert as color_convert
+from .style import parse_rotate as parse_rotate
+from .style import parse_style as parse_style
+from .style import rgb_to_hex as rgb_to_hex
+from .style import with_opacity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -14,67 +19,60 @@ _LOGGER = logging.getLogger(__name__)
 GRAY = "#808080FF"
 
 
-def parse_style(style_string):
-    style_dict = {}
-    style_pairs = style_string.split(";")
-    for pair in style_pairs:
-        if pair.strip():  # Skip empty strings
-            key, value = pair.split(":")
-            style_dict[key.strip()] = value.strip()
-    # _LOGGER.info("style %s %s", style_string, style_dict)
-    return style_dict
-
-
-def rgb_to_hex(rgb_string):
-    # Split the RGB components and convert them to integers
-    exp = r"rgba?\((\d{1,3}),\s*(\d{1,3}),\s*(\d{1,3})(?:,\s*(\d{1,3}))?\)"
-    match = re.match(exp, rgb_string)
-    if match:
-        values = [255 if v is None else int(v) for v in match.groups()]
-        for value in values:
-            if value < 0 or value > 255:
-                raise ValueError
-        return f"#{''.join([f'{int(v):02x}' for v in values])}".upper()
-    raise ValueError
-
-
-def color_convert(color: str) -> str:
-    if color.startswith("rgb"):
-        color = rgb_to_hex(color)
-    if color.startswith("#") and len(color) == 7:
-        return f"{color}FF"
-    return color
-
-
-def parse_rotate(rotate: str) -> int:
-    exp = r"rotate\((\d{1,3})deg\)"
-    match = re.match(exp, rotate)
-    if match:
-        return int(match.group(1))
-    return 0
-
-
 class TextObject:
     def __init__(self, id: int, name: str, obj_type: str, data=""):
         self.id = id
         self.name = name
         self.obj_type = obj_type
+        self._raw: Optional[str] = None
         self._data: Optional[BeautifulSoup] = None
         self._div: Optional[ResultSet[Any]] = None
-        self._div_style = None
+        self._div_style: Optional[dict[str, str]] = None
+        self._blobs: list[Blob] = []
         if data:
             self.data = data
 
+    # the base64 HTML is decoded and parsed on first use, inline data URIs
+    # (like embedded images) are replaced by references before parsing
     @property
-    def data(self):
+    def raw(self) -> Optional[str]:
+        return self._raw
+
+    @property
+    def data(self) -> Optional[BeautifulSoup]:
+        if self._data is None and self._raw is not None:
+            # the parsed data is set last, it marks the other fields as
+            # complete for a lab converted on several threads
+            html, blobs = strip_blobs(decode_data(self._raw))
+            data = BeautifulSoup(html, "html.parser")
+            div = data.find_all("div", class_="customShape")
+            self._blobs = blobs
+            self._div = div
+            self._div_style = parse_style(div[0]["style"]) if len(div) > 0 else None
+            self._data = data
         return self._data
 
     @data.setter
     def data(self, value: str):
-        self._data = BeautifulSoup(decode_data(value), "html.parser")
-        self._div = self._data.find_all("div", class_="customShape")
-        if len(self._div) > 0:
-            self._div_style = parse_style(self._div[0]["style"])
+        self._raw = value
+        self._data = None
+        self._div = None
+        self._div_style = None
+        self._blobs = []
+        self.__dict__.pop("style_summary", None)
+
+    @property
+    def blobs(self) -> list[Blob]:
+        _ = self.data
+        return self._blobs
+
+    def blob_content(self, blob: Blob) -> bytes:
+        return blob.content(decode_data(self._raw))
+
+    @property
+    def div_style(self) -> Optional[dict[str, str]]:
+        _ = self.data
+        return self._div_style
 
     @cached_property
     def style_summary(self):
@@ -82,10 +80,11 @@ class TextObject:
             has = tag.has_attr("style")
             return has
 
-        if self._data is None or self._data.div is None:
+        data = self.data
+        if data is None or data.div is None:
             return {}
 
-        style = self._data.div.find_all(has_style)
+        style = data.div.find_all(has_style)
         styles: dict[str, str] = {}
         for el in style:
             el_style = parse_style(el["style"])
@@ -94,7 +93,7 @@ class TextObject:
         # Check out potential font tags for color information
         # This is quite a hack as there could be different colors in a text
         # object, also font sizes and what else...  Pretty much the Wild West.
-        font_tags = self._data.div.find_all("font")
+        font_tags = data.div.find_all("font")
         if len(font_tags) > 0:
             # First color in list? Or the last... Guessing
             color = font_tags[0].attrs.get("color")
@@ -103,33 +102,38 @@ class TextObject:
         return styles
 
     def prettify(self) -> str:
-        if self.data is not None:
-            return self.data.prettify()
+        data = self.data
+        if data is not None:
+            return data.prettify()
         return ""
 
     @property
     def strings(self) -> str:
-        if self.data is not None:
-            return "\n".join(self.data.stripped_strings)
+        data = self.data
+        if data is not None:
+            return "\n".join(data.stripped_strings)
         return ""
 
     @property
     def left(self) -> int:
-        if self._div_style is None:
+        div_style = self.div_style
+        if div_style is None:
             return 0
-        return int(float(self._div_style["left"].strip("px")))
+        return int(float(div_style["left"].strip("px")))
 
     @property
     def top(self) -> int:
-        if self._div_style is None:
+        div_style = self.div_style
+        if div_style is None:
             return 0
-        return int(float(self._div_style["top"].strip("px")))
+        return int(float(div_style["top"].strip("px")))
 
     @property
     def width(self) -> int:
-        if self._div_style is None:
+        div_style = self.div_style
+        if div_style is None:
             return 0
-        value = self._div_style.get("width", "")
+        value = div_style.get("width", "")
         # best guesses
         if value == "" or value == "auto":
             line_length = max([len(line) for line in self.strings.split("\n")])
@@ -142,9 +146,10 @@ class TextObject:
 
     @property
     def height(self) -> int:
-        if self._div_style is None:
+        div_style = self.div_style
+        if div_style is None:
             return 0
-        value = self._div_style.get("height", "")
+        value = div_style.get("height", "")
         # best guesses
         if value == "" or value == "auto":
             lines = self.strings.rstrip().count("\n") + 1
@@ -157,15 +162,17 @@ class TextObject:
 
     @property
     def z_index(self) -> int:
-        if self._div_style is None:
+        div_style = self.div_style
+        if div_style is None:
             return 0
-        return int(self._div_style.get("z-index", 0))
+        return int(div_style.get("z-index", 0))
 
     @property
     def rotation(self) -> int:
-        if self._div_style is None:
+        div_style = self.div_style
+        if div_style is None:
             return 0
-        transform = self._div_style.get("transform")
+        transform = div_style.get("transform")
         if transform is None:
             return 0
         return int(parse_rotate(transform))
@@ -188,6 +195,15 @@ class TextObject:
             text_objects.append(text_object)
         return text_objects
 
+    @staticmethod
+    def _color(summary: dict[str, str], attr: str) -> str:
+        # SVG shapes have separate fill and stroke opacities on top of the
+        # opacity of the whole element
+        color = color_convert(summary.get(attr, GRAY))
+        return with_opacity(
+            color, summary.get("opacity", ""), summary.get(f"{attr}-opacity", "")
+        )
+
     def as_cml_annotations(self) -> list[dict[str, Any]]:
         if self.obj_type == "text":
             if not len(self.strings) > 0:
@@ -195,11 +211,14 @@ class TextObject:
                 return []
 
             _LOGGER.info("Procssing ID %d, TEXT", self.id)
+            opacity = self.style_summary.get("opacity", "")
             color = color_convert(self.style_summary.get("color", GRAY))
+            color = with_opacity(color, opacity)
             text_size = self.style_summary.get("font-size", "16px")
             background_color = self.style_summary.get("background-color", "")
             if background_color:
                 background_color = color_convert(background_color)
+                background_color = with_opacity(background_color, opacity)
             font_family = self.style_summary.get("font-family", "serif")
             ret_val = [
                 {
@@ -242,13 +261,13 @@ class TextObject:
 
         elif self.obj_type == "square":
             _LOGGER.info("Procssing ID %d, SQUARE", self.id)
-            summary = {**self.style_summary, **self._data.div.svg.rect.attrs}  # type: ignore
+            summary = {**self.style_summary, **self.data.div.svg.rect.attrs}  # type: ignore
             return [
                 {
-                    "border_color": color_convert(summary.get("stroke", GRAY)),
+                    "border_color": self._color(summary, "stroke"),
                     "border_radius": int(float(summary.get("rx", "0"))),
                     "border_style": summary.get("bla", ""),
-                    "color": color_convert(summary.get("fill", GRAY)),
+                    "color": self._color(summary, "fill"),
                     "thickness": max(int(float(summary.get("stroke-width", "1"))), 1),
                     # rotation works with 2.8+
                     "rotation": self.rotation,
@@ -263,14 +282,14 @@ class TextObject:
 
         elif self.obj_type == "circle":
             _LOGGER.info("Procssing ID %d, CIRCLE", self.id)
-            summary = {**self.style_summary, **self._data.div.svg.ellipse.attrs}  # type: ignore
+            summary = {**self.style_summary, **self.data.div.svg.ellipse.attrs}  # type: ignore
             rx = float(summary.get("rx", "80"))
             ry = float(summary.get("ry", "80"))
             return [
                 {
-                    "border_color": color_convert(summary.get("stroke", GRAY)),
+                    "border_color": self._color(summary, "stroke"),
                     "border_style": summary.get("bla", ""),
-                    "color": color_convert(summary.get("stroke", GRAY)),
+                    "color": self._color(summary, "stroke"),
                     "thickness": max(int(float(summary.get("stroke-width", "1"))), 1),
                     # rotation works with 2.8+
                     "rotation": self.rotation,
@@ -0,0 +1,107 @@
+import fnmatch
+import logging
+import re
+import xml.etree.ElementTree as ET
+from collections.abc import Callable, Iterable
+from typing import IO, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# patterns are globs, a pattern with this prefix is a regular expression
+REGEX_PREFIX = "re:"
+
+
+class Pattern:
+    # A glob or (with "re:") a regular expression.  A glob without a "/"
+    # matches the last path component, like "lab-*.unl" for labs in any
+    # directory of an archive.  A regular expression matches anywhere.
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        if pattern.startswith(REGEX_PREFIX):
+            self._regex = re.compile(pattern[len(REGEX_PREFIX) :])
+            self._search = True
+            self._basename = False
+        else:
+            self._regex = re.compile(fnmatch.translate(pattern))
+            self._search = False
+            self._basename = "/" not in pattern
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.pattern!r})"
+
+    def matches(self, name: str, path: bool = False) -> bool:
+        if path and self._basename:
+            name = name.rsplit("/", 1)[-1]
+        if self._search:
+            return self._regex.search(name) is not None
+        return self._regex.match(name) is not None
+
+
+def _selected(
+    name: str, include: list[Pattern], exclude: list[Pattern], path: bool
+) -> bool:
+    if include and not any(p.matches(name, path) for p in include):
+        return False
+    return not any(p.matches(name, path) for p in exclude)
+
+
+def peek_lab_name(stream: IO[bytes]) -> Optional[str]:
+    # the parser reads the stream in small chunks, only as far as the start
+    # of the root element, None if it is not a lab
+    try:
+        for _, elem in ET.iterparse(stream, events=("start",)):
+            if elem.tag != "lab":
+                return None
+            return elem.attrib.get("name", "")
+    except ET.ParseError:
+        pass
+    return None
+
+
+class SourceFilter:
+    # Selects lab files by their path (the member name in a ZIP archive)
+    # and by the name of the lab.  Paths are checked first, they are known
+    # without reading anything.  For the lab name, only the start of a file
+    # is read.
+    def __init__(
+        self,
+        include: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+        labs: Iterable[str] = (),
+        exclude_labs: Iterable[str] = (),
+    ):
+        self.include = [Pattern(p) for p in include]
+        self.exclude = [Pattern(p) for p in exclude]
+        self.labs = [Pattern(p) for p in labs]
+        self.exclude_labs = [Pattern(p) for p in exclude_labs]
+        self.skipped = 0
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(include={self.include}, exclude={self.exclude}, labs={self.labs}, exclude_labs={self.exclude_labs})"
+
+    @property
+    def by_name(self) -> bool:
+        return len(self.labs) > 0 or len(self.exclude_labs) > 0
+
+    def _skip(self, path: str, reason: str) -> bool:
+        _LOGGER.debug("%s skipped, %s", path, reason)
+        self.skipped += 1
+        return False
+
+    def accepts(self, path: str, open_stream: Callable[[], IO[bytes]]) -> bool:
+        # open_stream is only called with lab name patterns
+        if not _selected(path, self.include, self.exclude, True):
+            return self._skip(path, "path not selected")
+        if not self.by_name:
+            return True
+        with open_stream() as stream:
+            name = peek_lab_name(stream)
+        if name is None:
+            # not a lab, only dropped when a lab name is required, otherwise
+            # the parser reports the problem
+            if self.labs:
+                return self._skip(path, "no lab name found")
+            return True
+        if not _selected(name, self.labs, self.exclude_labs, False):
+            return self._skip(path, f"lab name {name!r} not selected")
+        return True
@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+import logging
+import xml.etree.ElementTree as ET
+from collections import Counter
+from typing import Any, Optional, TextIO
+
+from .dedup import LabSource
+from .mapper import Eve2CMLmapper
+
+_LOGGER = logging.getLogger(__name__)
+
+# elements which are only counted, their content (base64 configs, HTML of
+# text objects and tasks) is dropped as soon as the element is complete
+_OBJECTS = {
+    "config": "configs",
+    "configset": "configsets",
+    "task": "tasks",
+    "textobject": "textobjects",
+}
+
+
+def network_category(obj_type: str) -> str:
+    # the same distinction as in Lab.cml_links()
+    if obj_type == "bridge":
+        return "bridge"
+    if obj_type.startswith("nat"):
+        return "nat"
+    if obj_type.startswith("pnet"):
+        return "pnet"
+    if obj_type == "internal":
+        return "internal"
+    return "unhandled"
+
+
+class Inventory:
+    # counts of node types, network types and objects over many labs,
+    # collected with a streaming scan instead of a conversion
+    def __init__(self):
+        self.labs = 0
+        self.failed = 0
+        self.nodes: Counter[tuple[str, str, str]] = Counter()
+        self.networks: Counter[str] = Counter()
+        self.objects: Counter[str] = Counter()
+
+    def scan(self, source: LabSource):
+        nodes: Counter[tuple[str, str, str]] = Counter()
+        networks: Counter[str] = Counter()
+        objects: Counter[str] = Counter()
+        # config sets contain configs, only the top level ones are counted
+        in_configset = False
+        try:
+            for event, elem in ET.iterparse(
+                io.BytesIO(source.read()), events=("start", "end")
+            ):
+                tag = elem.tag
+                if event == "start":
+                    if tag == "node":
+                        attrib = elem.attrib
+                        nodes[
+                            (
+                                attrib.get("type", "unknown"),
+                                attrib.get("template", "unknown"),
+                                attrib.get("image", "unknown"),
+                            )
+                        ] += 1
+                    elif tag == "network":
+                        networks[elem.attrib.get("type", "unknown")] += 1
+                    elif tag == "configset":
+                        in_configset = True
+                    continue
+                if tag in _OBJECTS and not (tag == "config" and in_configset):
+                    objects[_OBJECTS[tag]] += 1
+                if tag == "configset":
+                    in_configset = False
+                elem.clear()
+        except ET.ParseError as exc:
+            _LOGGER.error("%s: %s", source.filename, exc)
+            self.failed += 1
+            return
+        finally:
+            source.release()
+        self.labs += 1
+        self.nodes.update(nodes)
+        self.networks.update(networks)
+        self.objects.update(objects)
+
+    def rows(self, mapper: Eve2CMLmapper) -> list[dict[str, Any]]:
+        # the mapper is consulted once per distinct node type
+        rows: list[dict[str, Any]] = [
+            {"kind": "labs", "name": "scanned", "mapping": "", "count": self.labs},
+            {"kind": "labs", "name": "failed", "mapping": "", "count": self.failed},
+        ]
+        for (obj_type, template, image), count in sorted(self.nodes.items()):
+            key = mapper.resolve_key(obj_type, template, image)
+            mapping = "unmapped"
+            if key is not None:
+                mapping = f"{key} -> {mapper.map[key].node_def}"
+            rows.append(
+                {
+                    "kind": "node",
+                    "name": f"{obj_type}:{template}:{image}",
+                    "mapping": mapping,
+                    "count": count,
+                }
+            )
+        for obj_type, count in sorted(self.networks.items()):
+            rows.append(
+                {
+                    "kind": "network",
+                    "name": obj_type,
+                    "mapping": network_category(obj_type),
+                    "count": count,
+                }
+            )
+        for name in _OBJECTS.values():
+            rows.append(
+                {
+                    "kind": "object",
+                    "name": name,
+                    "mapping": "",
+                    "count": self.objects[name],
+                }
+            )
+        return rows
+
+    def write_csv(self, out: TextIO, mapper: Eve2CMLmapper):
+        writer = csv.DictWriter(out, ["kind", "name", "mapping", "count"])
+        writer.writeheader()
+        writer.writerows(self.rows(mapper))
+
+    def write_json(self, out: TextIO, mapper: Eve2CMLmapper):
+        result: dict[str, Any] = {}
+        for row in self.rows(mapper):
+            entry: dict[str, Optional[Any]] = {"count": row["count"]}
+            if row["mapping"]:
+                entry["mapping"] = row["mapping"]
+            result.setdefault(row["kind"], {})[row["name"]] = entry
+        json.dump(result, out, indent=2)
+        out.write("\n")
@@ -0,0 +1,246 @@
+import io
+import logging
+import pickle
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Optional
+
+from .diagnostics import Diagnostics
+from .eve import (
+    Config,
+    ConfigSet,
+    Interface,
+    Lab,
+    Network,
+    Node,
+    Objects,
+    Task,
+    TextObject,
+    Topology,
+)
+from .mapper import Eve2CMLmapper
+from .options import Options
+
+_LOGGER = logging.getLogger(__name__)
+
+# A snapshot ("intermediate representation") of a parsed lab.  It holds the
+# mapper independent part of a conversion: the topology, decoded configs and
+# the annotations of the text objects.  The payload is a zlib compressed
+# pickle of builtin types only, it is loaded with an unpickler which refuses
+# any class.  Bump the version when the records below change.
+MAGIC = b"EVE2CMLIR"
+VERSION = 1
+SUFFIX = ".e2cir"
+_HEADER = struct.Struct("!9sH")
+
+_LAB_FIELDS = (
+    "name",
+    "version",
+    "scripttimeout",
+    "countdown",
+    "lock",
+    "sat",
+    "description",
+    "filename",
+)
+_NODE_FIELDS = (
+    "id",
+    "name",
+    "obj_type",
+    "template",
+    "image",
+    "console",
+    "cpu",
+    "cpulimit",
+    "ram",
+    "ethernet",
+    "uuid",
+    "firstmac",
+    "qemu_options",
+    "qemu_version",
+    "qemu_arch",
+    "delay",
+    "sat",
+    "icon",
+    "config",
+    "left",
+    "top",
+    "e0dhcp",
+)
+_INTERFACE_FIELDS = (
+    "id",
+    "name",
+    "obj_type",
+    "network_id",
+    "labelpos",
+    "curviness",
+    "beziercurviness",
+    "midpoint",
+    "srcpos",
+    "dstpos",
+    "node_id",
+    "slot",
+)
+_NETWORK_FIELDS = ("id", "obj_type", "name", "top", "left")
+
+
+class IRError(ValueError):
+    pass
+
+
+class _RestrictedUnpickler(pickle.Unpickler):
+    # the snapshot only contains builtin types, anything else is refused
+    def find_class(self, module: str, name: str):
+        raise pickle.UnpicklingError(f"{module}.{name} not allowed in a snapshot")
+
+
+def _fields(obj: Any, fields: tuple[str, ...]) -> dict[str, Any]:
+    return {field: getattr(obj, field) for field in fields}
+
+
+def _lab_record(lab: Lab) -> dict[str, Any]:
+    objects = lab.objects
+    return {
+        **_fields(lab, _LAB_FIELDS),
+        "duplicates": lab.duplicates,
+        "nodes": [
+            {
+                **_fields(node, _NODE_FIELDS),
+                "cml_hide_links": node.cml_hide_links,
+                "cml_config": node.cml_config,
+                "interfaces": [
+                    _fields(iface, _INTERFACE_FIELDS) for iface in node.interfaces
+                ],
+            }
+            for node in lab.topology.nodes
+        ],
+        "networks": [_fields(net, _NETWORK_FIELDS) for net in lab.topology.networks],
+        "tasks": [
+            {"id": t.id, "name": t.name, "obj_type": t.obj_type, "data": t.data}
+            for t in objects.tasks
+        ],
+        "configs": [(config.id, config.data) for config in objects.configs],
+        "configsets": [
+            {
+                "id": configset.id,
+                "name": configset.name,
+                "configs": [(config.id, config.data) for config in configset.configs],
+            }
+            for configset in objects.configsets
+        ],
+        "textobjects": [
+            {"id": t.id, "name": t.name, "obj_type": t.obj_type, "data": t.raw}
+            for t in objects.textobjects
+        ],
+        "annotations": objects.cml_annotations(),
+    }
+
+
+def _text_object(record: dict[str, Any]) -> TextObject:
+    text_object = TextObject(record["id"], record["name"], record["obj_type"])
+    if record["data"]:
+        text_object.data = record["data"]
+    return text_object
+
+
+def _lab(
+    record: dict[str, Any],
+    mapper: Eve2CMLmapper,
+    diagnostics: Optional[Diagnostics],
+    options: Optional[Options],
+) -> Lab:
+    nodes: list[Node] = []
+    for node_record in record["nodes"]:
+        node = Node(
+            interfaces=[Interface(**iface) for iface in node_record["interfaces"]],
+            **{field: node_record[field] for field in _NODE_FIELDS},
+        )
+        node.cml_hide_links = node_record["cml_hide_links"]
+        node.cml_config = node_record["cml_config"]
+        nodes.append(node)
+
+    objects = Objects(
+        tasks=[Task(**task) for task in record["tasks"]],
+        configs=[Config.from_text(*config) for config in record["configs"]],
+        configsets=[
+            ConfigSet(
+                configset["id"],
+                configset["name"],
+                [Config.from_text(*config) for config in configset["configs"]],
+            )
+            for configset in record["configsets"]
+        ],
+        textobjects=[_text_object(t) for t in record["textobjects"]],
+        annotations=record["annotations"],
+    )
+    lab = Lab(
+        topology=Topology(
+            nodes=nodes, networks=[Network(**net) for net in record["networks"]]
+        ),
+        objects=objects,
+        mapper=mapper,
+        diagnostics=diagnostics,
+        options=options,
+        **{field: record[field] for field in _LAB_FIELDS},
+    )
+    lab.duplicates = list(record["duplicates"])
+    return lab
+
+
+def ir_filename(lab: Lab) -> str:
+    # labs with the same name from different directories or archives must
+    # not overwrite each other
+    path = Path(lab.filename)
+    return f"{path.stem}-{zlib.crc32(lab.filename.encode('utf-8')):08x}{SUFFIX}"
+
+
+def dumps(lab: Lab) -> bytes:
+    payload = pickle.dumps(_lab_record(lab), protocol=4)
+    return _HEADER.pack(MAGIC, VERSION) + zlib.compress(payload)
+
+
+def loads(
+    content: bytes,
+    mapper: Eve2CMLmapper,
+    diagnostics: Optional[Diagnostics] = None,
+    options: Optional[Options] = None,
+) -> Lab:
+    if len(content) < _HEADER.size:
+        raise IRError("not a snapshot")
+    magic, version = _HEADER.unpack_from(content)
+    if magic != MAGIC:
+        raise IRError("not a snapshot")
+    if version != VERSION:
+        raise IRError(f"snapshot version {version} is not supported")
+    try:
+        payload = zlib.decompress(content[_HEADER.size :])
+        record = _RestrictedUnpickler(io.BytesIO(payload)).load()
+    except (zlib.error, pickle.UnpicklingError, EOFError) as exc:
+        raise IRError(f"can't load snapshot: {exc}") from exc
+    return _lab(record, mapper, diagnostics, options)
+
+
+def save_ir(directory: str, labs: list[Lab]):
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    for lab in labs:
+        (path / ir_filename(lab)).write_bytes(dumps(lab))
+    _LOGGER.info("%d snapshot(s) saved to %s", len(labs), directory)
+
+
+def load_ir(
+    directory: str,
+    mapper: Eve2CMLmapper,
+    diagnostics: Optional[Diagnostics] = None,
+    options: Optional[Options] = None,
+) -> list[Lab]:
+    labs: list[Lab] = []
+    for filename in sorted(Path(directory).glob(f"*{SUFFIX}")):
+        try:
+            labs.append(loads(filename.read_bytes(), mapper, diagnostics, options))
+        except IRError as exc:
+            _LOGGER.error("%s: %s", filename, exc)
+    if len(labs) == 0:
+        _LOGGER.warning("no snapshots found in %s", directory)
+    return labs
@@ -1,4 +1,12 @@
+import copy
+import json
 import logging
+import multiprocessing
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
 
 # Define color codes for different log levels
 COLOR_CODES = {
@@ -19,16 +27,121 @@ class ColorFormatter(logging.Formatter):
     def format(self, record):
         log_level = record.levelname
         if log_level in COLOR_CODES:
+            # a copy, the record is shared with the other handlers (and
+            # threads)
             color_code = COLOR_CODES[log_level]
-            # record.msg = f"{color_code}{record.msg}{COLOR_CODES['RESET']}"
+            record = copy.copy(record)
             record.levelname = f"{color_code}{record.levelname}:{COLOR_CODES['RESET']}"
 
         return super().format(record)
 
 
-def initialize_logging(level_str: str, nocolor: bool):
+# the lab file, the node ID and the phase (parse, convert, validate, output)
+# a record was logged in, set by log_context() and added to the records by
+# the ContextFilter of the handler
+_FIELDS: dict[str, ContextVar[Any]] = {
+    "lab": ContextVar("lab", default=None),
+    "node": ContextVar("node", default=None),
+    "phase": ContextVar("phase", default=None),
+}
+
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    tokens = [
+        (_FIELDS[name], _FIELDS[name].set(value)) for name, value in fields.items()
+    ]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    # runs in the thread which logs the record, fields which were passed via
+    # extra (or by a worker process) are kept
+    def filter(self, record):
+        for name, var in _FIELDS.items():
+            if not hasattr(record, name):
+                setattr(record, name, var.get())
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    # one JSON object per line
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        for name in _FIELDS:
+            entry[name] = getattr(record, name, None)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+# the handler added by initialize_logging() and, in queue mode, the
+# listener which formats the records
+_handler: Optional[logging.Handler] = None
+_listener: Optional[QueueListener] = None
+
+
+def log_queue() -> Optional[Any]:
+    # the queue worker processes send their records to, None without queue
+    # mode
+    if _listener is None:
+        return None
+    return _listener.queue
+
+
+def worker_logging(queue: Any, level: int):
+    # in a worker process: the records go to the listener of the parent
+    # process, the worker does not format them
+    logger = logging.getLogger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = QueueHandler(queue)
+    handler.addFilter(ContextFilter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+
+def stop_logging():
+    # flushes the queue and logs directly again, records logged after this
+    # are formatted by the thread which logs them
+    global _handler, _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    logger = logging.getLogger()
+    if _handler is not None:
+        logger.removeHandler(_handler)
+    _handler = _listener.handlers[0]
+    logger.addHandler(_handler)
+    _listener = None
+
+
+def initialize_logging(
+    level_str: str, nocolor: bool, json_lines: bool = False, queue: bool = False
+) -> Optional[QueueListener]:
+    # With queue, records are put into a queue and formatted by a listener
+    # thread, worker processes use the same queue (see worker_logging()).
+    # Returns that listener, stop_logging() stops it.
+    global _handler, _listener
+
     # get the root logger
     logger = logging.getLogger()
+    stop_logging()
+    if _handler is not None:
+        logger.removeHandler(_handler)
 
     # Set level
     level = logging._nameToLevel.get(level_str.upper(), logging.INFO)
@@ -37,17 +150,28 @@ def initialize_logging(level_str: str, nocolor: bool):
     # Create console handler and set level
     ch = logging.StreamHandler()
     ch.setLevel(level)
+    ch.addFilter(ContextFilter())
 
     # Create formatter and set to handler
     log_format = "%(levelname)s [%(module)s:%(lineno)d] %(message)s"
-    if nocolor:
+    formatter: logging.Formatter
+    if json_lines:
+        formatter = JsonFormatter()
+    elif nocolor:
         formatter = logging.Formatter(log_format)
     else:
         formatter = ColorFormatter(log_format)
     ch.setFormatter(formatter)
 
     # Add handler to logger
-    logger.addHandler(ch)
+    _handler = ch
+    if queue:
+        records: Any = multiprocessing.Queue(-1)
+        _listener = QueueListener(records, ch, respect_handler_level=True)
+        _listener.start()
+        _handler = QueueHandler(records)
+        _handler.addFilter(ContextFilter())
+    logger.addHandler(_handler)
 
     # # Test logging
     # logger.debug('Debug message')
@@ -55,3 +179,4 @@ def initialize_logging(level_str: str, nocolor: bool):
     # logger.warning('Warning message')
     # logger.error('Error message')
     # logger.critical('Critical message')
+    return _listener
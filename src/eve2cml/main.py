@@ -1,22 +1,55 @@
 import argparse
 import io
+import json
 import logging
+import re
 import sys
 import xml.etree.ElementTree as ET
 import zipfile
+import zlib
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Any, Optional, TextIO
 
 import yaml
 
 from ._version import __version__
+from .batch import BACKENDS, BatchRunner, FailureReport, Limits
+from .capacity import CapacityReport
+from .compact import FlowMap, compact
+from .configrefs import (
+    ConfigFile,
+    SharedConfig,
+    config_files,
+    load_topology,
+    shared_configs,
+)
+from .dedup import Deduplicator, LabSource, link_or_copy
+from .diagnostics import Diagnostics, report
 from .eve import Lab, Network, Node, Objects, Topology
-from .log import initialize_logging
+from .filters import SourceFilter
+from .inventory import Inventory
+from .ir import load_ir, save_ir
+from .log import initialize_logging, log_context, stop_logging
 from .mapper import Eve2CMLmapper
+from .options import Options
+from .partition import split
+from .textreport import TextReport
+from .validate import validate
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def parse_xml(xml_content: str, filename: str, mapper: Eve2CMLmapper):
+def parse_xml(
+    xml_content: str,
+    filename: str,
+    mapper: Eve2CMLmapper,
+    diagnostics: Optional[Diagnostics] = None,
+    options: Optional[Options] = None,
+):
     lab = ET.fromstring(xml_content)
     lab_name = lab.attrib.get("name", "")
     lab_version = lab.attrib.get("version", "")
@@ -47,86 +80,562 @@ def parse_xml(xml_content: str, filename: str, mapper: Eve2CMLmapper):
         objects=Objects.parse(lab, ".//objects", filename),
         filename=filename,
         mapper=mapper,
+        diagnostics=diagnostics,
+        options=options,
     )
 
     return parsed_lab
 
 
-def convert_file(content: str, filename: str, mapper: Eve2CMLmapper) -> Lab:
-    _LOGGER.info("Parse XML file %s", filename)
-    lab = parse_xml(content, filename, mapper)
-    _LOGGER.info("Done with file %s", filename)
+def convert_file(
+    content: str,
+    filename: str,
+    mapper: Eve2CMLmapper,
+    diagnostics: Optional[Diagnostics] = None,
+    options: Optional[Options] = None,
+) -> Lab:
+    with log_context(lab=filename, phase="parse"):
+        _LOGGER.info("Parse XML file %s", filename)
+        lab = parse_xml(content, filename, mapper, diagnostics, options)
+        _LOGGER.info("Done with file %s", filename)
     return lab
 
 
-def convert_files(file_or_zip: str, mapper: Eve2CMLmapper) -> list[Lab]:
+def _convert_source(
+    source: LabSource,
+    mapper: Eve2CMLmapper,
+    diagnostics: Optional[Diagnostics] = None,
+    options: Optional[Options] = None,
+    dedup: Optional[Deduplicator] = None,
+) -> Optional[Lab]:
+    if dedup is not None and dedup.skip(source, diagnostics):
+        return None
+    lab = convert_file(
+        source.read().decode("utf-8"), source.filename, mapper, diagnostics, options
+    )
+    if dedup is not None:
+        dedup.register(source, lab)
+    return lab
+
+
+def _zip_sources(
+    zip_file: zipfile.ZipFile, selection: Optional[SourceFilter] = None
+) -> Iterator[LabSource]:
+    # the selection only needs the archive directory, members with a lab
+    # name filter are opened for a peek at the start of the lab
+    for file_info in zip_file.infolist():
+        dirname = str(Path(file_info.filename).parent)
+        if dirname.startswith("__MACOSX"):
+            continue
+        filename = Path(file_info.filename).name
+        if filename.endswith(".unl"):
+            if selection is not None and not selection.accepts(
+                file_info.filename, partial(zip_file.open, file_info)
+            ):
+                continue
+            dir = f"{dirname}--{filename}" if dirname != "." else filename
+            yield LabSource(
+                dir,
+                file_info.CRC,
+                file_info.file_size,
+                partial(zip_file.read, file_info.filename),
+            )
+
+
+def _accepts_file(selection: Optional[SourceFilter], filename: str) -> bool:
+    return selection is None or selection.accepts(
+        Path(filename).as_posix(), lambda: open(filename, "rb")
+    )
+
+
+def lab_sources(
+    file_or_zip: str, selection: Optional[SourceFilter] = None
+) -> Iterator[LabSource]:
+    # the labs in a ZIP archive or a single lab file, raises
+    # FileNotFoundError for a missing file
+    if zipfile.is_zipfile(file_or_zip):
+        with zipfile.ZipFile(file_or_zip, "r") as zip_file:
+            yield from _zip_sources(zip_file, selection)
+        return
+    if not _accepts_file(selection, file_or_zip):
+        return
+    content = Path(file_or_zip).read_bytes()
+    yield LabSource(file_or_zip, zlib.crc32(content), len(content), lambda: content)
+
+
+def _convert_zip(
+    zip_file: zipfile.ZipFile,
+    mapper: Eve2CMLmapper,
+    diagnostics: Optional[Diagnostics] = None,
+    options: Optional[Options] = None,
+    dedup: Optional[Deduplicator] = None,
+    selection: Optional[SourceFilter] = None,
+) -> list[Lab]:
+    lab: list[Lab] = []
+    for source in _zip_sources(zip_file, selection):
+        try:
+            converted = _convert_source(source, mapper, diagnostics, options, dedup)
+            if converted is not None:
+                lab.append(converted)
+        except KeyError:
+            print(f"File {Path(source.filename).name} not found in the ZIP archive.")
+    return lab
+
+
+def convert_content(
+    content: bytes,
+    filename: str,
+    mapper: Eve2CMLmapper,
+    diagnostics: Optional[Diagnostics] = None,
+    options: Optional[Options] = None,
+) -> list[Lab]:
+    buffer = io.BytesIO(content)
+    if zipfile.is_zipfile(buffer):
+        with zipfile.ZipFile(buffer, "r") as zip_file:
+            return _convert_zip(zip_file, mapper, diagnostics, options)
+    return [
+        convert_file(content.decode("utf-8"), filename, mapper, diagnostics, options)
+    ]
+
+
+def convert_files(
+    file_or_zip: str,
+    mapper: Eve2CMLmapper,
+    diagnostics: Optional[Diagnostics] = None,
+    options: Optional[Options] = None,
+    dedup: Optional[Deduplicator] = None,
+    selection: Optional[SourceFilter] = None,
+) -> list[Lab]:
     lab: list[Lab] = []
     if zipfile.is_zipfile(file_or_zip):
         with zipfile.ZipFile(file_or_zip, "r") as zip_file:
-            for file_info in zip_file.infolist():
-                dirname = str(Path(file_info.filename).parent)
-                if dirname.startswith("__MACOSX"):
-                    continue
-                filename = Path(file_info.filename).name
-                if filename.endswith(".unl"):
-                    try:
-                        content = zip_file.read(file_info.filename)
-                        dir = f"{dirname}--{filename}" if dirname != "." else filename
-                        lab.append(convert_file(content.decode("utf-8"), dir, mapper))
-                    except KeyError:
-                        print(f"File {filename} not found in the ZIP archive.")
+            lab.extend(
+                _convert_zip(zip_file, mapper, diagnostics, options, dedup, selection)
+            )
+    elif dedup is not None or selection is not None:
+        try:
+            sources = list(lab_sources(file_or_zip, selection))
+        except FileNotFoundError as exc:
+            _LOGGER.critical("%s", exc)
+            sys.exit(1)
+        if len(sources) == 0:
+            return lab
+        converted = _convert_source(sources[0], mapper, diagnostics, options, dedup)
+        if converted is not None:
+            lab.append(converted)
     else:
         try:
             with open(file_or_zip, encoding="utf-8") as xml_file:
                 txt_content = xml_file.read()
-                lab.append(convert_file(txt_content, file_or_zip, mapper))
+                lab.append(
+                    convert_file(txt_content, file_or_zip, mapper, diagnostics, options)
+                )
         except FileNotFoundError as exc:
             _LOGGER.critical("%s", exc)
             sys.exit(1)
     return lab
 
 
-def dump_as_text(out: io.TextIOWrapper, lab: Lab, dump_all: bool):
-    out.write(">>> Nodes <<<\n")
-    for node in lab.topology.nodes:
-        out.write(f"{node}\n")
-        num_ifaces = len(node.interfaces) - 1
-        for idx, interface in enumerate(node.interfaces):
-            bullet = "|--" if idx < num_ifaces else "\\__"
-            out.write(f"  {bullet} {interface}\n")
-        out.write("\n")
+def yaml_multiline_string_pipe(dumper, data):
+    text_list = [line.rstrip() for line in data.splitlines()]
+    fixed_data = "\n".join(text_list)
+    if len(text_list) > 1:
+        return dumper.represent_scalar("tag:yaml.org,2002:str", fixed_data, style="|")
+    return dumper.represent_scalar("tag:yaml.org,2002:str", fixed_data)
+
+
+# the representer is registered on our own dumper class and not globally, a
+# long running process (see serve) should not alter the PyYAML state of others
+class CMLDumper(yaml.Dumper):
+    pass
+
+
+CMLDumper.add_representer(str, yaml_multiline_string_pipe)
+CMLDumper.add_representer(
+    ConfigFile, lambda dumper, data: dumper.represent_scalar("!config", data.path)
+)
+CMLDumper.add_representer(
+    FlowMap,
+    lambda dumper, data: dumper.represent_mapping(
+        "tag:yaml.org,2002:map", data, flow_style=True
+    ),
+)
+
+
+class CMLAnchorDumper(CMLDumper):
+    # configs which several nodes share are written once, see configrefs.py
+    def ignore_aliases(self, data):
+        return not isinstance(data, SharedConfig)
+
+
+CMLAnchorDumper.add_representer(SharedConfig, yaml_multiline_string_pipe)
+
+
+def cml_yaml(cml: dict, dumper: type[yaml.Dumper] = CMLDumper) -> str:
+    return yaml.dump(cml, Dumper=dumper, sort_keys=False)
+
+
+def dump_as_text(out: TextIO, lab: Lab, dump_all: bool, max_field_bytes: int = 0):
+    TextReport(out, dump_all, max_field_bytes).write(lab)
+
+
+def cml_outputs(
+    lab: Lab, configset: Optional[str] = None
+) -> Iterator[tuple[Path, dict[str, Any]]]:
+    # the lab is converted once (or was converted by a worker process),
+    # config set variants only re-bind the node configurations of that result
+    cml_filename = Path(lab.filename).with_suffix(".yaml")
+    cml = lab.converted if lab.converted is not None else lab.as_cml_dict()
+    if configset is None:
+        yield cml_filename, cml
+        return
+
+    if configset == "all":
+        if len(lab.objects.configsets) == 0:
+            _LOGGER.info("no config sets in %s", lab.filename)
+            yield cml_filename, cml
+        for config_set in lab.objects.configsets:
+            yield (
+                cml_filename.with_name(f"{cml_filename.stem}--{config_set.slug}.yaml"),
+                lab.with_configset(cml, config_set),
+            )
+        return
+
+    selected = lab.objects.get_configset(int(configset))
+    if selected is None:
+        _LOGGER.warning(
+            "config set %s not found in %s, using default configs",
+            configset,
+            lab.filename,
+        )
+        yield cml_filename, cml
+        return
+    yield cml_filename, lab.with_configset(cml, selected)
+
+
+def _host_size_arg(value: str) -> tuple[int, int]:
+    cpus, sep, ram = value.partition(":")
+    if not sep or not cpus.isdigit() or not ram.isdigit():
+        raise argparse.ArgumentTypeError("must be CPUS:RAM_GB, like 32:256")
+    if int(cpus) == 0 or int(ram) == 0:
+        raise argparse.ArgumentTypeError("CPUS and RAM_GB must be above 0")
+    return int(cpus), int(ram) * 1024
+
+
+def _configset_arg(value: str) -> str:
+    if value != "all" and not value.isdigit():
+        raise argparse.ArgumentTypeError("must be a config set ID or 'all'")
+    return value
+
+
+def _duplicate_outputs(lab: Lab, output: Path) -> list[tuple[str, Path]]:
+    # the output name is derived from the lab filename, e.g. "lab.yaml" or
+    # "lab--setname.yaml", the duplicates get the same suffix.  Returns the
+    # duplicate lab filenames and their output names.
+    suffix = output.name[len(Path(lab.filename).stem) :]
+    return [
+        (duplicate, Path(duplicate).with_name(f"{Path(duplicate).stem}{suffix}"))
+        for duplicate in lab.duplicates
+    ]
+
 
-    out.write(">>> Networks <<<\n")
-    for network in lab.topology.networks:
-        out.write(f"{network}")
-    out.write("\n")
+def _imported_from(cml: dict[str, Any], source: str, duplicate: str) -> dict[str, Any]:
+    # the topology of a duplicate refers to the duplicate lab file
+    lab = dict(cml["lab"])
+    for key in ("description", "notes"):
+        if isinstance(lab.get(key), str):
+            lab[key] = lab[key].replace(source, duplicate)
+    return {**cml, "lab": lab}
 
-    out.write(">>> Text objects <<<\n")
+
+def _emit(args: argparse.Namespace, filename: Path, content: str):
+    if args.stdout:
+        print(centered_line_with_stars(str(filename)))
+        sys.stdout.write(content)
+        print(centered_line_with_stars())
+        return
+    with open(filename, "w", encoding="utf-8") as out:
+        out.write(content)
+
+
+def _extract_blobs(lab: Lab) -> int:
+    # inline payloads of text objects (like images) are written next to
+    # the output as <lab>--text<ID>-<N>.<ext>
+    base = Path(lab.filename)
+    count = 0
     for text_object in lab.objects.textobjects:
-        out.write(f"{text_object}")
-    out.write("\n")
+        for blob in text_object.blobs:
+            target = base.with_name(
+                f"{base.stem}--text{text_object.id}-{blob.index}{blob.extension}"
+            )
+            target.write_bytes(text_object.blob_content(blob))
+            count += 1
+    return count
+
+
+# an output file: name, content and the topology for the capacity report
+Rendered = tuple[Path, str, Optional[dict[str, Any]]]
+
+
+def _split_outputs(
+    args: argparse.Namespace,
+    lab: Lab,
+    outputs: Iterator[tuple[Path, dict[str, Any]]],
+    rendered: list[Rendered],
+) -> Iterator[tuple[Path, dict[str, Any]]]:
+    # topologies with more than --max-nodes-per-lab nodes are written as
+    # parts <name>--part<N>.yaml, the manifest <name>--manifest.json lists
+    # the parts and the cut links, it is added to rendered
+    max_nodes = args.max_nodes_per_lab
+    for cml_filename, cml in outputs:
+        if max_nodes <= 0 or len(cml["nodes"]) <= max_nodes:
+            yield cml_filename, cml
+            continue
+        result = split(lab, cml, max_nodes)
+        filenames = [
+            cml_filename.with_name(f"{cml_filename.stem}--part{idx + 1}.yaml")
+            for idx in range(len(result.parts))
+        ]
+        manifest_filename = cml_filename.with_name(
+            f"{cml_filename.stem}--manifest.json"
+        )
+        manifest = result.manifest(lab.filename, filenames)
+        rendered.append(
+            (manifest_filename, f"{json.dumps(manifest, indent=2)}\n", None)
+        )
+        for duplicate, target in _duplicate_outputs(lab, manifest_filename):
+            # the manifest of a duplicate lists the parts of the duplicate
+            stem = target.name[: -len("--manifest.json")]
+            parts = [
+                target.with_name(f"{stem}{filename.name[len(cml_filename.stem) :]}")
+                for filename in filenames
+            ]
+            manifest = result.manifest(duplicate, parts)
+            rendered.append((target, f"{json.dumps(manifest, indent=2)}\n", None))
+        yield from zip(filenames, result.parts)
+
+
+def _validated(
+    lab: Lab, cml: dict[str, Any], diagnostics: Optional[Diagnostics] = None
+) -> bool:
+    with log_context(lab=lab.filename, phase="validate"):
+        errors = validate(cml, lab)
+    for error in errors:
+        report(
+            diagnostics,
+            "invalid",
+            error.code,
+            lab.filename,
+            logging.ERROR,
+            "%s: %s",
+            lab.filename,
+            error,
+            logger=_LOGGER,
+        )
+    return len(errors) == 0
+
+
+def _yaml_content(
+    args: argparse.Namespace,
+    filename: Path,
+    cml: dict[str, Any],
+    rendered: list[Rendered],
+) -> str:
+    # the configs are written inline unless --config-anchors or --configs-dir
+    # is given, the config files are added to rendered
+    if args.compact:
+        cml = compact(cml)
+    if args.config_anchors:
+        return cml_yaml(shared_configs(cml, args.config_min_bytes), CMLAnchorDumper)
+    if args.configs_dir:
+        cml, files = config_files(
+            cml, Path(args.configs_dir), filename.parent, args.config_min_bytes
+        )
+        rendered.extend((target, config, None) for target, config in files.items())
+    return cml_yaml(cml)
+
+
+def _render_yaml(
+    args: argparse.Namespace,
+    lab: Lab,
+    diagnostics: Optional[Diagnostics] = None,
+) -> tuple[list[Rendered], int]:
+    # Converts, validates and emits all topologies of a lab before anything
+    # is written, this does not depend on other labs and may run on a
+    # thread.  Returns the outputs and the number of invalid topologies.
+    check = args.validate or args.strict
+    invalid = 0
+    rendered: list[Rendered] = []
+    outputs = _split_outputs(args, lab, cml_outputs(lab, args.configset), rendered)
+    for cml_filename, cml in outputs:
+        if check and not _validated(lab, cml, diagnostics):
+            invalid += 1
+            if args.strict:
+                continue
+        content = _yaml_content(args, cml_filename, cml, rendered)
+        rendered.append((cml_filename, content, cml))
+        # the duplicates are written on their own, the notes name their file
+        for duplicate, target in _duplicate_outputs(lab, cml_filename):
+            imported = _imported_from(cml, lab.filename, duplicate)
+            content = _yaml_content(args, target, imported, rendered)
+            rendered.append((target, content, cml))
+    return rendered, invalid
+
+
+def _yaml_renders(
+    args: argparse.Namespace,
+    labs: list[Lab],
+    diagnostics: Optional[Diagnostics] = None,
+) -> Iterator[tuple[Lab, Callable[[], tuple[list[Rendered], int]]]]:
+    # the labs with a function returning their outputs, in order.  With the
+    # thread backend, the pool works a few labs ahead of the writer.
+    if args.backend != "threads" or args.jobs <= 1:
+        for lab in labs:
+            yield lab, partial(_render_yaml, args, lab, diagnostics)
+        return
+    ahead: deque[tuple[Lab, Future[tuple[list[Rendered], int]]]] = deque()
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for lab in labs:
+            ahead.append((lab, pool.submit(_render_yaml, args, lab, diagnostics)))
+            if len(ahead) > 2 * args.jobs:
+                lab, future = ahead.popleft()
+                yield lab, future.result
+        while ahead:
+            lab, future = ahead.popleft()
+            yield lab, future.result
+
+
+def _write_yaml(
+    args: argparse.Namespace,
+    rendered: list[Rendered],
+    capacity: Optional[CapacityReport] = None,
+    written: Optional[set[Path]] = None,
+):
+    # written holds the config files of --configs-dir which were written
+    # before, these are named by their content
+    for filename, content, cml in rendered:
+        if capacity is not None and cml is not None:
+            capacity.add(filename.name, cml)
+        if written is not None and cml is None and filename.suffix == ".cfg":
+            if filename in written:
+                continue
+            written.add(filename)
+        _emit(args, filename, content)
+
+
+def _write_text(args: argparse.Namespace, lab: Lab):
+    txt_filename = (
+        sys.stdout.fileno()
+        if args.stdout
+        else str(Path(lab.filename).with_suffix(".txt"))
+    )
+    with open(txt_filename, "w", encoding="utf-8") as out:
+        dump_as_text(out, lab, args.all, args.max_field_bytes)
+    # the text does not name the lab file, duplicates get a link or a copy
+    duplicates = _duplicate_outputs(lab, Path(lab.filename).with_suffix(".txt"))
+    if isinstance(txt_filename, str):
+        for _, target in duplicates:
+            link_or_copy(Path(txt_filename), target)
+    elif duplicates:
+        text = io.StringIO()
+        dump_as_text(text, lab, args.all, args.max_field_bytes)
+        for _, target in duplicates:
+            _emit(args, target, text.getvalue())
+
+
+def _write_output(
+    args: argparse.Namespace,
+    labs: list[Lab],
+    diagnostics: Optional[Diagnostics] = None,
+    capacity: Optional[CapacityReport] = None,
+    failures: Optional[FailureReport] = None,
+) -> int:
+    # returns the number of topologies which failed validation, with --strict
+    # these are not written.  A lab which can't be converted is recorded in
+    # the failure report, the others are still written.
+    if args.text:
+        if args.validate or args.strict:
+            _LOGGER.warning(
+                "--validate and --strict only apply to YAML output, ignoring"
+            )
+        if args.max_nodes_per_lab > 0:
+            _LOGGER.warning("--max-nodes-per-lab only applies to YAML output, ignoring")
+        if capacity is not None:
+            _LOGGER.warning("--capacity-report only applies to YAML output, ignoring")
+        if args.config_anchors or args.configs_dir:
+            _LOGGER.warning("shared configs only apply to YAML output, ignoring")
+        if args.compact:
+            _LOGGER.warning("--compact only applies to YAML output, ignoring")
+
+    invalid = 0
+    written: set[Path] = set()
+    renders = (
+        ((lab, None) for lab in labs)
+        if args.text
+        else _yaml_renders(args, labs, diagnostics)
+    )
+    for lab, render in renders:
+        with log_context(lab=lab.filename, phase="output"):
+            try:
+                if render is None:
+                    _write_text(args, lab)
+                else:
+                    rendered, count = render()
+                    invalid += count
+                    _write_yaml(args, rendered, capacity, written)
+                # the topology of a worker process is not needed anymore
+                lab.converted = None
+            except Exception as exc:
+                if failures is None:
+                    raise
+                failures.add(
+                    lab.filename, "convert-error", f"{exc.__class__.__name__}: {exc}"
+                )
+                # like the duplicates of a lab which fails in a worker process
+                for duplicate in lab.duplicates:
+                    failures.add(
+                        duplicate, "convert-error", f"duplicate of {lab.filename}"
+                    )
+    return invalid
+
 
-    if not dump_all:
+def _write_capacity(filename: str, capacity: CapacityReport):
+    write = capacity.write_json if filename.endswith(".json") else capacity.write_text
+    if filename == "-":
+        write(sys.stdout)
         return
+    with open(filename, "w", encoding="utf-8") as out:
+        write(out)
+
+
+def _write_inventory(
+    filename: str,
+    paths: list[str],
+    mapper: Eve2CMLmapper,
+    selection: Optional[SourceFilter] = None,
+):
+    inventory = Inventory()
+    for path in paths:
+        try:
+            for source in lab_sources(path, selection):
+                inventory.scan(source)
+        except FileNotFoundError as exc:
+            _LOGGER.error("%s", exc)
+            inventory.failed += 1
 
-    out.write(">>> Tasks <<<\n")
-    for task in lab.objects.tasks:
-        out.write(f"{task}")
-    out.write("\n")
+    write = inventory.write_json if filename.endswith(".json") else inventory.write_csv
+    if filename == "-":
+        write(sys.stdout, mapper)
+        return
+    with open(filename, "w", encoding="utf-8", newline="") as out:
+        write(out, mapper)
 
-    out.write(">>> Configs <<<\n")
-    for config in lab.objects.configs:
-        out.write(f"{config}")
-    out.write("\n")
 
-    out.write(">>> Config sets <<<\n")
-    for configset in lab.objects.configsets:
-        out.write(f"Config Set ID: {configset.id}\n")
-        out.write(f"Config Set Name: {configset.name}\n")
-        out.write("Contained Configs:\n")
-        for config in configset.configs:
-            out.write(f"{config}\n")
-        out.write("\n")
+def _selection(args: argparse.Namespace) -> Optional[SourceFilter]:
+    patterns = (args.include, args.exclude, args.lab, args.exclude_lab)
+    if not any(patterns):
+        return None
+    return SourceFilter(*patterns)
 
 
 def centered_line_with_stars(name="", cols=80) -> str:
@@ -141,11 +650,18 @@ def centered_line_with_stars(name="", cols=80) -> str:
     return f"{asterisks_left} {name} {asterisks_right}"
 
 
-def main():
+def main(argv: Optional[list[str]] = None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if len(argv) > 0 and argv[0] == "serve":
+        from .server import serve_main
+
+        return serve_main(argv[1:])
+
     parser = argparse.ArgumentParser(
         description="Convert UNL/XML topologies to CML2 topologies"
     )
-    parser.epilog = f"Example: {parser.prog} exportedlabs.zip"
+    parser.epilog = f"Example: {parser.prog} exportedlabs.zip, see '{parser.prog} serve -h' for the conversion server"
     parser.add_argument(
         "-V", "--version", action="version", version=f"%(prog)s {__version__}"
     )
@@ -160,6 +676,17 @@ def main():
         "--stdout", action="store_true", help="do not store in files, print to stdout"
     )
     parser.add_argument("--nocolor", action="store_true", help="no color log output")
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="log JSON lines with the lab, node and phase of each message",
+    )
+    parser.add_argument(
+        "--log-queue",
+        action="store_true",
+        help="format log messages in one listener thread, worker processes "
+        "send their messages to it",
+    )
     parser.add_argument("--dump", action="store_true", help="Dump the mapper as YAML")
     parser.add_argument("--mapper", help="custom mapper YAML file")
     parser.add_argument("-t", "--text", action="store_true", help="text output")
@@ -167,12 +694,204 @@ def main():
         "--all", action="store_true", help="print all objects in text mode"
     )
     parser.add_argument(
-        "file_or_zip", nargs="+", help="Path to either a UNL or  ZIP with UNL file"
+        "--max-field-bytes",
+        type=int,
+        default=0,
+        help="truncate configs, tasks and text objects in text mode, default is 0 (no limit)",
+    )
+    parser.add_argument(
+        "--configset",
+        type=_configset_arg,
+        help="use the configs of this config set ID, 'all' writes one file per set",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--trim-fillers",
+        action="store_true",
+        help="no filler interfaces beyond the highest connected slot",
+    )
+    parser.add_argument(
+        "--max-ums-ports",
+        type=int,
+        default=0,
+        help="split larger networks into a tree of unmanaged switches, default is 0 (no limit)",
+    )
+    parser.add_argument(
+        "--max-nodes-per-lab",
+        type=int,
+        default=0,
+        metavar="N",
+        help="split larger topologies into linked labs with external connectors, default is 0 (no limit)",
+    )
+    parser.add_argument(
+        "--rewrite-ifaces",
+        action="store_true",
+        help="replace EVE interface names in node configs by the CML interface labels",
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="convert identical labs only once, the others get the same output",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="leave out node, interface and link values which CML defaults, "
+        "one line per interface and link",
+    )
+    parser.add_argument(
+        "--config-anchors",
+        action="store_true",
+        help="write configs which several nodes share once, as YAML anchors",
+    )
+    parser.add_argument(
+        "--configs-dir",
+        metavar="DIR",
+        help="write configs into DIR/<sha256>.cfg, the topology refers to them "
+        "with a !config tag, see --inline-configs",
+    )
+    parser.add_argument(
+        "--inline-configs",
+        action="store_true",
+        help="the arguments are topologies written with --configs-dir, replace "
+        "their config references by the configs for a CML import",
+    )
+    parser.add_argument(
+        "--config-min-bytes",
+        type=int,
+        default=256,
+        metavar="N",
+        help="only configs of at least N bytes are shared or written to "
+        "--configs-dir, default is 256",
+    )
+    parser.add_argument(
+        "--diag-limit",
+        type=int,
+        default=5,
+        help="log only the first N messages of each kind, -1 logs all, default is 5",
+    )
+    parser.add_argument("--diag-json", help="write the conversion summary as JSON")
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="check the generated topologies for problems which fail a CML import",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="like --validate, invalid topologies are not written and the exit code is 1",
+    )
+    parser.add_argument(
+        "--extract-images",
+        action="store_true",
+        help="write images embedded in text objects next to the output",
+    )
+    parser.add_argument(
+        "--keep-going",
+        action="store_true",
+        help="skip labs which can't be parsed instead of stopping",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=0,
+        help="time limit in seconds to parse a lab, default is 0 (no limit)",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=int,
+        default=0,
+        metavar="MB",
+        help="memory limit to parse a lab, default is 0 (no limit)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of labs parsed in parallel worker processes (or threads), default is 1",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="processes",
+        help="run --jobs in worker processes (default, needed for --timeout and --max-memory) "
+        "or threads, which also convert and emit the YAML output in parallel",
+    )
+    parser.add_argument("--failures", help="write the labs which failed as JSON")
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="only convert lab files (or ZIP members) matching this glob, 're:' for a regex, repeatable",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="skip lab files (or ZIP members) matching this glob or 're:' regex, repeatable",
+    )
+    parser.add_argument(
+        "--lab",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="only convert labs whose name matches this glob or 're:' regex, repeatable",
+    )
+    parser.add_argument(
+        "--exclude-lab",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="skip labs whose name matches this glob or 're:' regex, repeatable",
+    )
+    parser.add_argument(
+        "--inventory",
+        metavar="FILE",
+        help="only count node, network and object types into a CSV (or .json) file, '-' is stdout",
+    )
+    parser.add_argument(
+        "--capacity-report",
+        metavar="FILE",
+        help="write the vCPUs and RAM of the generated labs as text (or .json), '-' is stdout",
+    )
+    parser.add_argument(
+        "--host-size",
+        type=_host_size_arg,
+        metavar="CPUS:RAM_GB",
+        help="propose a placement of the labs onto compute hosts of this size in the capacity report",
+    )
+    parser.add_argument(
+        "--hosts",
+        type=int,
+        default=0,
+        help="number of compute hosts for the placement, default is 0 (as many as needed)",
+    )
+    parser.add_argument(
+        "--save-ir",
+        metavar="DIR",
+        help="save a snapshot of each parsed lab into DIR for re-mapping with --from-ir",
+    )
+    parser.add_argument(
+        "--from-ir",
+        metavar="DIR",
+        help="convert the lab snapshots in DIR instead of parsing UNL files again",
+    )
+    parser.add_argument(
+        "file_or_zip", nargs="*", help="Path to either a UNL or  ZIP with UNL file"
+    )
+    args = parser.parse_args(argv)
+    if len(args.file_or_zip) == 0 and not args.from_ir:
+        parser.error("the following arguments are required: file_or_zip")
+
+    initialize_logging(args.level, args.nocolor, args.log_json, args.log_queue)
+    try:
+        _run(parser, args)
+    finally:
+        stop_logging()
 
-    initialize_logging(args.level, args.nocolor)
 
+def _run(parser: argparse.ArgumentParser, args: argparse.Namespace):
     if args.dump:
         _LOGGER.warning("dumping the mapper into %s", args.file_or_zip)
         filename = sys.stdout.fileno() if args.stdout else args.file_or_zip[0]
@@ -180,52 +899,96 @@ def main():
             Eve2CMLmapper().load().dump(fh)
         return
 
+    if args.inline_configs:
+        for filename in args.file_or_zip:
+            path = Path(filename)
+            _emit(args, path, cml_yaml(load_topology(path)))
+        return
+
     if args.all and not args.text:
         _LOGGER.warning("--all is only relevant with text output, ignoring")
 
     mapper = Eve2CMLmapper().load(args.mapper)
-    labs: list[Lab] = []
-    for arg in args.file_or_zip:
-        labs.extend(convert_files(arg, mapper))
-
-    # YAML is the default
-    if not args.text:
-
-        def yaml_multiline_string_pipe(dumper, data):
-            text_list = [line.rstrip() for line in data.splitlines()]
-            fixed_data = "\n".join(text_list)
-            if len(text_list) > 1:
-                return dumper.represent_scalar(
-                    "tag:yaml.org,2002:str", fixed_data, style="|"
-                )
-            return dumper.represent_scalar("tag:yaml.org,2002:str", fixed_data)
-
-        yaml.add_representer(str, yaml_multiline_string_pipe)
-
-        if args.stdout:
-            for lab in labs:
-                print(
-                    centered_line_with_stars(
-                        str(Path(lab.filename).with_suffix(".yaml"))
-                    )
-                )
-                sys.stdout.write(yaml.dump(lab.as_cml_dict(), sort_keys=False))
-                print(centered_line_with_stars())
-            return
-
-        for lab in labs:
-            cml_filename = Path(lab.filename).with_suffix(".yaml")
-            with open(cml_filename, "w", encoding="utf-8") as cml_file:
-                cml_file.write(yaml.dump(lab.as_cml_dict(), sort_keys=False))
+    try:
+        selection = _selection(args)
+    except re.error as exc:
+        parser.error(f"invalid pattern: {exc}")
+    if args.inventory:
+        _write_inventory(args.inventory, args.file_or_zip, mapper, selection)
         return
-
-    # this is simply text output
-    for lab in labs:
-        txt_filename = (
-            sys.stdout.fileno()
-            if args.stdout
-            else str(Path(lab.filename).with_suffix(".txt"))
+    if args.hosts < 0:
+        parser.error("--hosts must not be negative")
+    if args.hosts > 0 and args.host_size is None:
+        parser.error("--hosts needs --host-size")
+    if args.config_anchors and args.configs_dir:
+        parser.error("--config-anchors and --configs-dir exclude each other")
+    if 0 < args.max_ums_ports < 3:
+        parser.error("--max-ums-ports needs at least 3 ports")
+    options = Options(
+        trim_fillers=args.trim_fillers,
+        max_ums_ports=args.max_ums_ports,
+        rewrite_ifaces=args.rewrite_ifaces,
+    )
+    diagnostics = Diagnostics(args.diag_limit if args.diag_limit >= 0 else None)
+    dedup = Deduplicator() if args.dedup else None
+    if args.backend == "threads" and (args.timeout > 0 or args.max_memory > 0):
+        parser.error("--timeout and --max-memory need --backend processes")
+    limits = Limits(
+        args.timeout, args.max_memory * 1024 * 1024, max(args.jobs, 1), args.backend
+    )
+    failures = FailureReport()
+    labs: list[Lab] = []
+    if args.from_ir:
+        labs.extend(load_ir(args.from_ir, mapper, diagnostics, options))
+    if limits.isolated or limits.threaded or args.keep_going:
+        runner = BatchRunner(
+            mapper,
+            diagnostics,
+            options,
+            dedup,
+            limits,
+            args.keep_going,
+            failures,
+            selection,
         )
-        with open(txt_filename, "w", encoding="utf-8") as out:
-            dump_as_text(out, lab, args.all)
-    return
+        labs.extend(runner.run(args.file_or_zip))
+    else:
+        for arg in args.file_or_zip:
+            labs.extend(
+                convert_files(arg, mapper, diagnostics, options, dedup, selection)
+            )
+    if selection is not None and selection.skipped > 0:
+        _LOGGER.info("%d lab file(s) not selected", selection.skipped)
+    if dedup is not None and dedup.skipped > 0:
+        _LOGGER.warning("%d duplicate lab(s) skipped", dedup.skipped)
+    if args.save_ir:
+        save_ir(args.save_ir, labs)
+
+    capacity = None
+    if args.capacity_report:
+        host_cpus, host_ram = args.host_size or (0, 0)
+        capacity = CapacityReport(mapper, args.hosts, host_cpus, host_ram)
+    if args.configs_dir and not args.stdout and not args.text:
+        Path(args.configs_dir).mkdir(parents=True, exist_ok=True)
+    invalid = _write_output(args, labs, diagnostics, capacity, failures)
+    if capacity is not None:
+        _write_capacity(args.capacity_report, capacity)
+    if args.extract_images:
+        count = sum(_extract_blobs(lab) for lab in labs)
+        _LOGGER.info("%d embedded image(s) extracted", count)
+
+    summary = diagnostics.summary(logging.getLogger().getEffectiveLevel())
+    if summary:
+        sys.stderr.write(f"Conversion summary:\n{summary}\n")
+    if args.diag_json:
+        with open(args.diag_json, "w", encoding="utf-8") as fh:
+            diagnostics.dump_json(fh)
+    if args.failures:
+        with open(args.failures, "w", encoding="utf-8") as fh:
+            failures.dump_json(fh)
+    if len(failures) > 0:
+        sys.stderr.write(f"{len(failures)} lab(s) failed:\n{failures.summary()}\n")
+    if invalid > 0:
+        _LOGGER.error("%d topologies failed validation", invalid)
+    if len(failures) > 0 or (invalid > 0 and args.strict):
+        sys.exit(1)
@@ -1,13 +1,18 @@
 import io
 import logging
+import operator
+import re
 import sys
+from collections.abc import Callable, Iterator
 from importlib.resources import files
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, Union
 
 import yaml
 from yaml.parser import ParserError
 
+from .diagnostics import Diagnostics, report
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -30,17 +35,163 @@ class CMLdef:
         }
 
 
+class NodeResources:
+    # vCPUs and RAM (in MB) a node definition uses by default, for nodes
+    # without their own values or with an overriding mapping
+    def __init__(self, cpus: int = 0, ram: int = 0):
+        self.cpus = cpus
+        self.ram = ram
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(cpus={self.cpus}, ram={self.ram})"
+
+    def as_dict(self):
+        return {"cpus": self.cpus, "ram": self.ram}
+
+
+_PLACEHOLDER = re.compile(r"\{([^{}]*)\}")
+_EXPRESSION = re.compile(r"\s*(slot|n|i)((?:\s*(?://|%|\*|\+|-)\s*\d+)*)\s*$")
+_OPERATION = re.compile(r"(//|%|\*|\+|-)\s*(\d+)")
+_OPERATORS: dict[str, Callable[[int, int], int]] = {
+    "//": operator.floordiv,
+    "%": operator.mod,
+    "*": operator.mul,
+    "+": operator.add,
+    "-": operator.sub,
+}
+
+
+class InterfaceRule:
+    # Interface names generated from a pattern like "Ethernet{slot//4}/{slot%4}".
+    # Placeholders use the slot, the index i within the rule or the number
+    # n = start + i * step, their operations are applied from left to right.
+    # The pattern is compiled once, a name is computed without any lookup.
+    def __init__(
+        self, pattern: str, start: int = 0, step: int = 1, count: Optional[int] = None
+    ):
+        self.pattern = pattern
+        self.start = start
+        self.step = step
+        self.count = count
+        self._parts: list[Union[str, tuple[str, list[tuple[Callable, int]]]]] = []
+
+        pos = 0
+        for match in _PLACEHOLDER.finditer(pattern):
+            if match.start() > pos:
+                self._parts.append(pattern[pos : match.start()])
+            pos = match.end()
+            expression = _EXPRESSION.match(match.group(1))
+            if expression is None:
+                raise ValueError(f"invalid placeholder {match.group(0)} in {pattern}")
+            operations = [
+                (_OPERATORS[op], int(value))
+                for op, value in _OPERATION.findall(expression.group(2))
+            ]
+            for func, value in operations:
+                if value == 0 and func in (operator.floordiv, operator.mod):
+                    raise ValueError(f"division by zero in {pattern}")
+            self._parts.append((expression.group(1), operations))
+        if pos < len(pattern):
+            self._parts.append(pattern[pos:])
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(pattern={self.pattern}, start={self.start}, step={self.step}, count={self.count})"
+
+    def name(self, slot: int, index: int) -> str:
+        values = {"slot": slot, "i": index, "n": self.start + index * self.step}
+        result: list[str] = []
+        for part in self._parts:
+            if isinstance(part, str):
+                result.append(part)
+                continue
+            var, operations = part
+            value = values[var]
+            for func, operand in operations:
+                value = func(value, operand)
+            result.append(str(value))
+        return "".join(result)
+
+    def as_dict(self) -> dict[str, Any]:
+        result: dict[str, Any] = {"pattern": self.pattern}
+        if self.start != 0:
+            result["start"] = self.start
+        if self.step != 1:
+            result["step"] = self.step
+        if self.count is not None:
+            result["count"] = self.count
+        return result
+
+
+class InterfaceList:
+    # Explicit interface names, optionally followed by a rule for all slots
+    # after them.  Without a count, a rule covers any slot.
+    def __init__(self, names: list[str], rule: Optional[InterfaceRule] = None):
+        self.names = names
+        self.rule = rule
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(names={len(self.names)}, rule={self.rule})"
+
+    @classmethod
+    def from_spec(cls, spec: Union[list[Any], dict[str, Any]]) -> "InterfaceList":
+        if isinstance(spec, dict):
+            return cls([], InterfaceRule(**spec))
+        if not isinstance(spec, list):
+            raise ValueError(f"expected a list or a rule, got {spec!r}")
+        names: list[str] = []
+        rule: Optional[InterfaceRule] = None
+        for entry in spec:
+            if rule is not None:
+                raise ValueError("a rule must be the last entry of an interface list")
+            if isinstance(entry, dict):
+                rule = InterfaceRule(**entry)
+            else:
+                names.append(str(entry))
+        return cls(names, rule)
+
+    def as_spec(self) -> Union[list[Any], dict[str, Any]]:
+        if self.rule is None:
+            return self.names
+        if len(self.names) == 0:
+            return self.rule.as_dict()
+        return [*self.names, self.rule.as_dict()]
+
+    @property
+    def size(self) -> Optional[int]:
+        if self.rule is None:
+            return len(self.names)
+        if self.rule.count is None:
+            return None
+        return len(self.names) + self.rule.count
+
+    def has_slot(self, slot: int) -> bool:
+        size = self.size
+        return slot >= 0 and (size is None or slot < size)
+
+    def __getitem__(self, slot: int) -> str:
+        if slot < len(self.names):
+            return self.names[slot]
+        if not self.has_slot(slot):
+            raise IndexError(slot)
+        assert self.rule is not None
+        return self.rule.name(slot, slot - len(self.names))
+
+
 class Eve2CMLmapper:
     def __init__(self):
         self.map: dict[str, CMLdef] = {}
         self.unknown_type: str = ""
-        self.interface_lists: dict[str, list[str]] = {}
+        self.interface_lists: dict[str, InterfaceList] = {}
+        self.node_defaults: dict[str, NodeResources] = {}
 
     def as_dict(self):
         return {
             "map": {k: v.as_dict() for k, v in self.map.items()},
             "unknown_type": self.unknown_type,
-            "interface_lists": self.interface_lists,
+            "interface_lists": {
+                k: v.as_spec() for k, v in self.interface_lists.items()
+            },
+            "node_defaults": {k: v.as_dict() for k, v in self.node_defaults.items()},
         }
 
     def dump(self, out: io.TextIOWrapper):
@@ -70,35 +221,134 @@ class Eve2CMLmapper:
 
         mapper = Eve2CMLmapper()
         mapper.unknown_type = map_data.get("unknown_type", "")
-        mapper.interface_lists = map_data.get("interface_lists", {})
+        for key, value in map_data.get("interface_lists", {}).items():
+            try:
+                mapper.interface_lists[key] = InterfaceList.from_spec(value)
+            except (TypeError, ValueError) as exc:
+                _LOGGER.critical("invalid interface list %s: %s", key, exc)
+                sys.exit(1)
         for key, value in map_data.get("map", {}).items():
             mapper.map[key] = CMLdef(**value)
+        for key, value in map_data.get("node_defaults", {}).items():
+            mapper.node_defaults[key] = NodeResources(**value)
 
         return mapper
 
-    def node_def(self, obj_type: str, template: str, image: str) -> CMLdef:
+    @staticmethod
+    def _lookup(obj_type: str, template: str, image: str) -> str:
         lookup = f"{obj_type}:{template}"
         if len(image) > 0:
             lookup = f"{lookup}:{image}".lower()
-        found = self.map.get(lookup)
-        if not found:
-            # special case for non-template images like IOL or Docker
-            longest_prefix = ""
-            longest_cmldef = None
-            for key, cmldef in self.map.items():
-                if lookup.startswith(key) and len(key) > len(longest_prefix):
-                    longest_prefix = key
-                    longest_cmldef = cmldef
-            if longest_cmldef:
-                _LOGGER.info("mapped node type %s", longest_cmldef)
-                return longest_cmldef
-            _LOGGER.warning("Unmapped node type %s %s %s", obj_type, template, image)
+        return lookup
+
+    def resolve_key(self, obj_type: str, template: str, image: str) -> Optional[str]:
+        # the map key used for an EVE node: an exact match or, for images
+        # without a template like IOL or Docker, the longest matching prefix
+        lookup = self._lookup(obj_type, template, image)
+        if lookup in self.map:
+            return lookup
+        longest_prefix = ""
+        for key in self.map:
+            if lookup.startswith(key) and len(key) > len(longest_prefix):
+                longest_prefix = key
+        return longest_prefix or None
+
+    def node_def(
+        self,
+        obj_type: str,
+        template: str,
+        image: str,
+        diag: Optional[Diagnostics] = None,
+        lab: str = "",
+    ) -> CMLdef:
+        key = self.resolve_key(obj_type, template, image)
+        if key is None:
+            report(
+                diag,
+                "unmapped",
+                (obj_type, template, image),
+                lab,
+                logging.WARNING,
+                "Unmapped node type %s %s %s",
+                obj_type,
+                template,
+                image,
+                logger=_LOGGER,
+            )
             return CMLdef(self.unknown_type, None, True)
+        found = self.map[key]
+        if key != self._lookup(obj_type, template, image):
+            # special case for non-template images like IOL or Docker
+            report(
+                diag,
+                "prefix-mapped",
+                (obj_type, template, image),
+                lab,
+                logging.INFO,
+                "mapped node type %s",
+                found,
+                logger=_LOGGER,
+            )
         return found
 
-    def cml_iface_label(self, slot: int, node_def: str, label: str) -> str:
+    def cml_iface_label(
+        self,
+        slot: int,
+        node_def: str,
+        label: str,
+        diag: Optional[Diagnostics] = None,
+        lab: str = "",
+    ) -> str:
         interfaces = self.interface_lists.get(node_def)
         if interfaces is None:
-            _LOGGER.warning("No mapping: %s %d", node_def, slot)
+            report(
+                diag,
+                "no-iface-mapping",
+                node_def,
+                lab,
+                logging.WARNING,
+                "No mapping: %s %d",
+                node_def,
+                slot,
+                logger=_LOGGER,
+            )
+            return label
+        if not interfaces.has_slot(slot):
+            # the validator reports this, the EVE label is used meanwhile
+            report(
+                diag,
+                "iface-out-of-range",
+                (node_def, slot),
+                lab,
+                logging.ERROR,
+                "Slot %d not in interface list of %s (%d interfaces)",
+                slot,
+                node_def,
+                interfaces.size,
+                logger=_LOGGER,
+            )
             return label
         return interfaces[slot]
+
+    def cml_iface_labels(
+        self,
+        slots: range,
+        node_def: str,
+        label: str,
+        diag: Optional[Diagnostics] = None,
+        lab: str = "",
+    ) -> Iterator[str]:
+        # same as cml_iface_label() for a range of slots, the list lookup (and
+        # the report of a missing list) happens once per range
+        interfaces = self.interface_lists.get(node_def)
+        if interfaces is None:
+            if len(slots) > 0:
+                self.cml_iface_label(slots[0], node_def, label, diag, lab)
+            for _ in slots:
+                yield label
+            return
+        for slot in slots:
+            if interfaces.has_slot(slot):
+                yield interfaces[slot]
+            else:
+                yield self.cml_iface_label(slot, node_def, label, diag, lab)
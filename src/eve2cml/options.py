@@ -0,0 +1,17 @@
+class Options:
+    # knobs that change the generated CML topology, shared by all labs of a
+    # conversion run
+    def __init__(
+        self,
+        trim_fillers: bool = False,
+        max_ums_ports: int = 0,
+        rewrite_ifaces: bool = False,
+    ):
+        self.trim_fillers = trim_fillers
+        # 0 means a single unmanaged switch regardless of the port count
+        self.max_ums_ports = max_ums_ports
+        # replace EVE interface names in node configs by the CML labels
+        self.rewrite_ifaces = rewrite_ifaces
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({', '.join(f'{k}={v!r}' for k, v in vars(self).items())})"
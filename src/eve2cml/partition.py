@@ -0,0 +1,250 @@
+import heapq
+import logging
+from collections import Counter
+from collections.abc import Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .eve.interface import Interface
+from .eve.node import Node
+
+if TYPE_CHECKING:
+    from .eve import Lab
+
+_LOGGER = logging.getLogger(__name__)
+
+# refinement stops earlier when a pass does not move any node
+_REFINE_PASSES = 8
+
+
+def partition(
+    nodes: Sequence[str], edges: Sequence[tuple[str, str]], max_nodes: int
+) -> dict[str, int]:
+    # Splits a graph into the smallest number of parts with at most max_nodes
+    # nodes each, trying to cut few edges.  Parts are grown one after the
+    # other from the frontier of the previous part, always adding the node
+    # with the most edges into the part and the fewest to unassigned nodes
+    # (greedy graph growing).  Then nodes
+    # on the boundary move to the part they have the most edges to, as long
+    # as that cuts fewer edges and the part has room.  Both steps are close
+    # to linear in the number of edges.
+    count = -(-len(nodes) // max_nodes)
+    if count <= 1:
+        return dict.fromkeys(nodes, 0)
+
+    position = {node: idx for idx, node in enumerate(nodes)}
+    adjacency: dict[str, list[str]] = {node: [] for node in nodes}
+    for a, b in edges:
+        if a != b:
+            adjacency[a].append(b)
+            adjacency[b].append(a)
+
+    # balanced sizes for growing, the refinement may fill parts up to max
+    target = -(-len(nodes) // count)
+    part: dict[str, int] = {}
+    heap: list[tuple[int, int, str]] = []
+    unassigned = iter(nodes)
+    for index in range(count):
+        # the frontier left by the previous part seeds the next one
+        seeds = [node for _, _, node in sorted(heap) if node not in part]
+        heap = [(0, position[node], node) for node in seeds[:1]]
+        gains: dict[str, int] = {}
+        size = 0
+        while size < target and len(part) < len(nodes):
+            if len(heap) == 0:
+                # next connected component
+                seed = next(node for node in unassigned if node not in part)
+                heap.append((0, position[seed], seed))
+            gain, _, node = heapq.heappop(heap)
+            if node in part or -gain != gains.get(node, 0):
+                continue
+            part[node] = index
+            size += 1
+            for neighbor in adjacency[node]:
+                if neighbor in part:
+                    continue
+                if neighbor in gains:
+                    # one more edge into the part, one less to the rest
+                    gains[neighbor] += 2
+                else:
+                    gains[neighbor] = sum(
+                        1 if part.get(other) == index else -1
+                        for other in adjacency[neighbor]
+                        if part.get(other, index) == index
+                    )
+                heapq.heappush(heap, (-gains[neighbor], position[neighbor], neighbor))
+
+    sizes = Counter(part.values())
+    for _ in range(_REFINE_PASSES):
+        moved = 0
+        for node in nodes:
+            own = part[node]
+            links = Counter(part[neighbor] for neighbor in adjacency[node])
+            if len(links) == 0 or (len(links) == 1 and own in links):
+                continue
+            best, best_links = max(links.items(), key=lambda item: (item[1], -item[0]))
+            if best == own or best_links <= links.get(own, 0):
+                continue
+            if sizes[best] >= max_nodes or sizes[own] <= 1:
+                continue
+            part[node] = best
+            sizes[own] -= 1
+            sizes[best] += 1
+            moved += 1
+        if moved == 0:
+            break
+    return part
+
+
+class CutLink:
+    # a link between two parts, each side ends on an external connector
+    # which is configured with the same bridge name
+    def __init__(self, link_id: str, bridge: str):
+        self.link_id = link_id
+        self.bridge = bridge
+        self.ends: list[dict[str, Any]] = []
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"link": self.link_id, "bridge": self.bridge, "ends": self.ends}
+
+
+class Split:
+    # connectors is the number of connectors for cut links in each part
+    def __init__(
+        self,
+        parts: list[dict[str, Any]],
+        cuts: list[CutLink],
+        connectors: list[int],
+    ):
+        self.parts = parts
+        self.cuts = cuts
+        self.connectors = connectors
+
+    def manifest(self, source: str, filenames: list[Path]) -> dict[str, Any]:
+        return {
+            "source": source,
+            "parts": [
+                {
+                    "part": idx + 1,
+                    "file": filename.name,
+                    "title": cml["lab"]["title"],
+                    "nodes": len(cml["nodes"]) - connectors,
+                    "connectors": connectors,
+                    "links": len(cml["links"]),
+                }
+                for idx, (filename, cml, connectors) in enumerate(
+                    zip(filenames, self.parts, self.connectors)
+                )
+            ],
+            "cut_links": [cut.as_dict() for cut in self.cuts],
+        }
+
+
+def _connector(
+    lab: "Lab", node_id: int, name: str, bridge: str, peer: dict[str, Any]
+) -> dict[str, Any]:
+    obj_type = "cml_ext_conn"
+    node = Node(
+        id=node_id,
+        name=name,
+        interfaces=[
+            Interface(id=0, name="port", obj_type=obj_type, network_id=0, slot=0)
+        ],
+        obj_type=obj_type,
+        template=obj_type,
+        left=peer["x"],
+        top=peer["y"] - 64,
+        ethernet=1,
+    )
+    node.cml_config = bridge
+    return node.as_cml_dict(node_id, lab)
+
+
+def split(lab: "Lab", cml: dict[str, Any], max_nodes: int) -> Split:
+    # Partitions a converted topology into labs of at most max_nodes nodes
+    # (not counting the connectors for the cut links).  A cut link keeps its
+    # ID in both parts and ends on a connector, the connectors of a link
+    # share a bridge name.
+    nodes = {node["id"]: node for node in cml["nodes"]}
+    links = cml["links"]
+    part = partition(
+        list(nodes), [(link["n1"], link["n2"]) for link in links], max_nodes
+    )
+    count = max(part.values()) + 1
+
+    part_nodes: list[list[dict[str, Any]]] = [[] for _ in range(count)]
+    for node_id, node in nodes.items():
+        part_nodes[part[node_id]].append(node)
+    part_links: list[list[dict[str, Any]]] = [[] for _ in range(count)]
+    cuts: list[CutLink] = []
+    connectors = [0] * count
+    next_id = max(int(node_id[1:]) for node_id in nodes) + 1
+    for link in links:
+        ends = ((link["n1"], link["i1"]), (link["n2"], link["i2"]))
+        sides = [part[node_id] for node_id, _ in ends]
+        if sides[0] == sides[1]:
+            part_links[sides[0]].append(link)
+            continue
+        cut = CutLink(link["id"], f"e2c-{link['id']}")
+        for (node_id, iface_id), index, peer_id in zip(
+            ends, sides, (link["n2"], link["n1"])
+        ):
+            node = nodes[node_id]
+            connector = _connector(
+                lab,
+                next_id,
+                f"xc-{link['id']}-{nodes[peer_id]['label']}",
+                cut.bridge,
+                node,
+            )
+            next_id += 1
+            part_nodes[index].append(connector)
+            connectors[index] += 1
+            part_links[index].append(
+                {
+                    **link,
+                    "n1": node_id,
+                    "i1": iface_id,
+                    "n2": connector["id"],
+                    "i2": "i0",
+                }
+            )
+            label = next(
+                (
+                    iface["label"]
+                    for iface in node["interfaces"]
+                    if iface["id"] == iface_id
+                ),
+                iface_id,
+            )
+            cut.ends.append(
+                {
+                    "part": index + 1,
+                    "node": node["label"],
+                    "interface": label,
+                    "connector": connector["label"],
+                }
+            )
+        cuts.append(cut)
+
+    parts: list[dict[str, Any]] = []
+    for index in range(count):
+        title = f"{cml['lab']['title']} ({index + 1}/{count})"
+        parts.append(
+            {
+                **cml,
+                "lab": {**cml["lab"], "title": title},
+                # text annotations stay with the first part
+                "annotations": cml["annotations"] if index == 0 else [],
+                "links": part_links[index],
+                "nodes": part_nodes[index],
+            }
+        )
+    _LOGGER.info(
+        "%s: %d nodes split into %d labs, %d link(s) cut",
+        lab.filename,
+        len(nodes),
+        count,
+        len(cuts),
+    )
+    return Split(parts, cuts, connectors)
@@ -0,0 +1,115 @@
+import re
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import Any, Optional
+
+# full interface type names, an EVE name like "e0/1" or "Gi0/1" starts with
+# an abbreviation of one of these
+INTERFACE_TYPES = (
+    "Ethernet",
+    "FastEthernet",
+    "GigabitEthernet",
+    "TenGigabitEthernet",
+    "TwentyFiveGigE",
+    "FortyGigabitEthernet",
+    "HundredGigE",
+    "Management",
+    "mgmt",
+    "Serial",
+    "port",
+)
+
+# type and number of an interface name, like "Gi" and "0/1"
+_NAME = re.compile(r"([A-Za-z][A-Za-z-]*)(\d[\w/.:]*)$")
+
+# an interface name is neither preceded nor followed by a word character or
+# a "/", "Ethernet0/1" must not match in "Ethernet0/10" or "Ethernet0/1/0"
+_BEFORE = r"(?<![\w/])"
+_AFTER = r"(?![\w/])"
+
+
+def name_variants(name: str) -> set[str]:
+    # the ways a config can refer to an interface: the EVE name itself and
+    # all abbreviations of the full type name which are at least as long as
+    # the one used by EVE, like "Gi0/1", "Giga0/1" ... "GigabitEthernet0/1"
+    variants = {name}
+    match = _NAME.match(name)
+    if match is None:
+        return variants
+    prefix, number = match.groups()
+    for full in INTERFACE_TYPES:
+        if not full.lower().startswith(prefix.lower()):
+            continue
+        for length in range(len(prefix), len(full) + 1):
+            variants.add(f"{full[:length]}{number}")
+    return variants
+
+
+def rename_table(pairs: Iterable[tuple[str, str]]) -> dict[str, str]:
+    # (EVE name, CML label) pairs of a node to a lower case variant -> CML
+    # label table, variants which refer to different interfaces are dropped
+    table: dict[str, str] = {}
+    ambiguous: set[str] = set()
+    for name, label in pairs:
+        if name == label:
+            continue
+        for variant in name_variants(name):
+            key = variant.lower()
+            if key == label.lower():
+                continue
+            if table.setdefault(key, label) != label:
+                ambiguous.add(key)
+    for key in ambiguous:
+        del table[key]
+    return table
+
+
+def _trie_pattern(trie: dict[str, Any]) -> str:
+    # a node which ends a word has the "" key, longer words are tried first
+    branches = [
+        re.escape(char) + _trie_pattern(child)
+        for char, child in sorted(trie.items())
+        if char
+    ]
+    if len(branches) == 0:
+        return ""
+    if "" in trie:
+        return f"(?:{'|'.join(branches)})?"
+    if len(branches) == 1:
+        return branches[0]
+    return f"(?:{'|'.join(branches)})"
+
+
+@lru_cache(maxsize=256)
+def _compile(keys: tuple[str, ...]) -> "re.Pattern[str]":
+    # A single pattern for all names of a node.  The alternatives share their
+    # prefixes like in a trie, the regex engine never backtracks further than
+    # the current name and a config is scanned once regardless of the size of
+    # the table.  Nodes of the same type mostly share the table.
+    trie: dict[str, Any] = {}
+    for key in keys:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return re.compile(f"{_BEFORE}{_trie_pattern(trie)}{_AFTER}", re.IGNORECASE)
+
+
+class InterfaceRenamer:
+    def __init__(self, table: dict[str, str]):
+        self.table = table
+        self._pattern: Optional[re.Pattern[str]] = None
+        if len(table) > 0:
+            self._pattern = _compile(tuple(sorted(table)))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self.table)} names)"
+
+    def _replace(self, match: "re.Match[str]") -> str:
+        return self.table[match.group(0).lower()]
+
+    def rewrite(self, text: str) -> tuple[str, int]:
+        # returns the new text and the number of replaced names
+        if self._pattern is None or not text:
+            return text, 0
+        return self._pattern.subn(self._replace, text)
@@ -0,0 +1,268 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+from xml.etree.ElementTree import ParseError
+
+import yaml
+
+from ._version import __version__
+from .diagnostics import Diagnostics
+from .log import initialize_logging
+from .main import CMLDumper, convert_content
+from .mapper import Eve2CMLmapper
+
+_LOGGER = logging.getLogger(__name__)
+
+# the mapper of a worker process, set once by the pool initializer
+_WORKER_MAPPER: Optional[Eve2CMLmapper] = None
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(message or REASONS.get(status, ""))
+        self.status = status
+
+
+def _init_worker(mapper: Eve2CMLmapper):
+    global _WORKER_MAPPER
+    _WORKER_MAPPER = mapper
+
+
+def convert_upload(
+    content: bytes, filename: str, fmt: str, mapper: Optional[Eve2CMLmapper] = None
+) -> tuple[str, int, dict[str, float]]:
+    mapper = mapper or _WORKER_MAPPER or Eve2CMLmapper.load()
+    timings: dict[str, float] = {}
+
+    start = time.perf_counter()
+    labs = convert_content(content, filename, mapper, Diagnostics())
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    topologies = {lab.filename: lab.as_cml_dict() for lab in labs}
+    timings["convert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if fmt == "json":
+        body = json.dumps(topologies)
+    else:
+        body = yaml.dump_all(topologies.values(), Dumper=CMLDumper, sort_keys=False)
+    timings["emit"] = time.perf_counter() - start
+    return body, len(labs), timings
+
+
+class ConversionServer:
+    def __init__(
+        self,
+        mapper: Eve2CMLmapper,
+        workers: int = 2,
+        max_upload: int = 64 * 1024 * 1024,
+        executor: Optional[Executor] = None,
+    ):
+        self.mapper = mapper
+        self.workers = workers
+        self.max_upload = max_upload
+        self._executor = executor
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            # forked workers would inherit the sockets of open connections and
+            # keep them from being closed, start them from scratch instead
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.mapper,),
+            )
+        return self._executor
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080):
+        # bound the number of conversions in flight, everything else waits
+        # here and not in the executor queue
+        self._slots = asyncio.Semaphore(self.workers)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = await reader.readline()
+        if not request_line:
+            raise ConnectionResetError
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError as exc:
+            raise HTTPError(400) from exc
+
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        body = b""
+        if method == "POST":
+            length = headers.get("content-length")
+            if length is None or not length.isdigit():
+                raise HTTPError(411)
+            if int(length) > self.max_upload:
+                raise HTTPError(413)
+            body = await reader.readexactly(int(length))
+        return method, target, headers, body
+
+    async def _convert(self, target: str, headers: dict[str, str], body: bytes):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        filename = query.get("filename", [headers.get("x-filename", "upload.unl")])[0]
+        fmt = query.get("format", [""])[0]
+        if not fmt:
+            fmt = "json" if "json" in headers.get("accept", "") else "yaml"
+        if fmt not in ("json", "yaml"):
+            raise HTTPError(400, f"unknown format {fmt}")
+        if len(body) == 0:
+            raise HTTPError(400, "empty upload")
+
+        assert self._slots is not None
+        queued = time.perf_counter()
+        async with self._slots:
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            try:
+                result, num_labs, timings = await loop.run_in_executor(
+                    self.executor, convert_upload, body, filename, fmt
+                )
+            except (ParseError, UnicodeDecodeError) as exc:
+                raise HTTPError(422, f"can't convert {filename}: {exc}") from exc
+        timings["queue"] = started - queued
+
+        content_type = "application/json" if fmt == "json" else "application/yaml"
+        extra = {
+            "Server-Timing": ", ".join(
+                f"{name};dur={value * 1000:.3f}" for name, value in timings.items()
+            ),
+            "X-Eve2cml-Labs": str(num_labs),
+        }
+        return result, content_type, extra
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        received = time.perf_counter()
+        status = 200
+        content_type = "text/plain; charset=utf-8"
+        extra: dict[str, str] = {}
+        try:
+            method, target, headers, body = await self._read_request(reader)
+            path = urlsplit(target).path
+            if path == "/health":
+                result = "ok\n"
+            elif path != "/convert":
+                raise HTTPError(404)
+            elif method != "POST":
+                raise HTTPError(405)
+            else:
+                result, content_type, extra = await self._convert(target, headers, body)
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            writer.close()
+            return
+        except HTTPError as exc:
+            status = exc.status
+            result = f"{exc}\n"
+        except Exception as exc:
+            _LOGGER.exception("conversion failed")
+            status = 500
+            result = f"{exc}\n"
+
+        payload = result.encode("utf-8")
+        total = time.perf_counter() - received
+        response = [
+            f"HTTP/1.1 {status} {REASONS[status]}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(payload)}",
+            f"Server: eve2cml/{__version__}",
+            f"X-Response-Time: {total * 1000:.3f}ms",
+            "Connection: close",
+        ]
+        response.extend(f"{key}: {value}" for key, value in extra.items())
+        _LOGGER.info("%s %d %d bytes %.3fs", target, status, len(payload), total)
+        writer.write("\r\n".join(response).encode("latin-1") + b"\r\n\r\n")
+        writer.write(payload)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def serve(server: ConversionServer, host: str, port: int):
+    async_server = await server.start(host, port)
+    addresses = ", ".join(str(sock.getsockname()) for sock in async_server.sockets)
+    _LOGGER.warning("serving on %s", addresses)
+    try:
+        async with async_server:
+            await async_server.serve_forever()
+    finally:
+        server.close()
+
+
+def serve_main(argv: list[str]):
+    parser = argparse.ArgumentParser(
+        prog="eve2cml serve",
+        description="Run a conversion server, POST UNL or ZIP files to /convert",
+    )
+    parser.epilog = (
+        "Example: curl --data-binary @lab.unl "
+        "'http://127.0.0.1:8080/convert?filename=lab.unl&format=yaml'"
+    )
+    parser.add_argument(
+        "--level",
+        default="warning",
+        choices=["debug", "info", "warning", "error", "critical"],
+        help="specify the log level, default is warning",
+    )
+    parser.add_argument("--nocolor", action="store_true", help="no color log output")
+    parser.add_argument("--mapper", help="custom mapper YAML file")
+    parser.add_argument("--host", default="127.0.0.1", help="listen address")
+    parser.add_argument("--port", type=int, default=8080, help="listen port")
+    parser.add_argument(
+        "--workers", type=int, default=2, help="number of conversion processes"
+    )
+    parser.add_argument(
+        "--max-upload",
+        type=int,
+        default=64,
+        help="maximum upload size in MB, default is 64",
+    )
+    args = parser.parse_args(argv)
+
+    initialize_logging(args.level, args.nocolor)
+
+    server = ConversionServer(
+        Eve2CMLmapper.load(args.mapper),
+        workers=args.workers,
+        max_upload=args.max_upload * 1024 * 1024,
+    )
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
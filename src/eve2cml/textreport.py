@@ -0,0 +1,139 @@
+from collections.abc import Iterator
+from typing import TextIO
+
+from .eve import Config, Lab, Task, TextObject
+
+# large fields are written in slices of this size
+CHUNK_SIZE = 64 * 1024
+
+
+class TextReport:
+    # Writes the text representation of labs.  Sections are generated lazily
+    # and collected in a bounded buffer, field content (configs, tasks, text
+    # object HTML) is passed on in slices and can be truncated to
+    # max_field_bytes.
+    def __init__(
+        self,
+        out: TextIO,
+        dump_all: bool = False,
+        max_field_bytes: int = 0,
+        buffer_size: int = CHUNK_SIZE,
+    ):
+        self.out = out
+        self.dump_all = dump_all
+        self.max_field_bytes = max_field_bytes
+        self.buffer_size = buffer_size
+        self._buffer: list[str] = []
+        self._buffered = 0
+
+    def _emit(self, chunk: str):
+        self._buffer.append(chunk)
+        self._buffered += len(chunk)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.out.write("".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+
+    def field(self, value: str) -> Iterator[str]:
+        limit = self.max_field_bytes
+        if limit > 0 and len(value) > limit // 4:
+            # a character is at most four bytes in UTF-8, only the prefix
+            # that can possibly fit is encoded
+            head = value[:limit].encode("utf-8")
+            if len(value) > limit or len(head) > limit:
+                shown = head[:limit].decode("utf-8", errors="ignore")
+                yield from self._slices(shown)
+                yield f"... [truncated, {len(value)} characters total]"
+                return
+        yield from self._slices(value)
+
+    @staticmethod
+    def _slices(value: str) -> Iterator[str]:
+        if len(value) <= CHUNK_SIZE:
+            yield value
+            return
+        for start in range(0, len(value), CHUNK_SIZE):
+            yield value[start : start + CHUNK_SIZE]
+
+    def write(self, lab: Lab):
+        for section in self.sections(lab):
+            for chunk in section:
+                self._emit(chunk)
+        self.flush()
+
+    def sections(self, lab: Lab) -> Iterator[Iterator[str]]:
+        yield self.nodes(lab)
+        yield self.networks(lab)
+        yield self.text_objects(lab)
+        if not self.dump_all:
+            return
+        yield self.tasks(lab)
+        yield self.configs(lab)
+        yield self.configsets(lab)
+
+    def nodes(self, lab: Lab) -> Iterator[str]:
+        yield ">>> Nodes <<<\n"
+        for node in lab.topology.nodes:
+            yield f"{node}\n"
+            num_ifaces = len(node.interfaces) - 1
+            for idx, interface in enumerate(node.interfaces):
+                bullet = "|--" if idx < num_ifaces else "\\__"
+                yield f"  {bullet} {interface}\n"
+            yield "\n"
+
+    def networks(self, lab: Lab) -> Iterator[str]:
+        yield ">>> Networks <<<\n"
+        for network in lab.topology.networks:
+            yield f"{network}"
+        yield "\n"
+
+    def text_object(self, text_object: TextObject) -> Iterator[str]:
+        yield (
+            f"Text ID: {text_object.id}, Name: {text_object.name}, "
+            f"Type: {text_object.obj_type}, Strings: "
+        )
+        yield from self.field(text_object.strings)
+        yield ", Data: "
+        yield from self.field(text_object.prettify())
+        yield f", Pos: {text_object.left}/{text_object.top}/{text_object.z_index}"
+
+    def text_objects(self, lab: Lab) -> Iterator[str]:
+        yield ">>> Text objects <<<\n"
+        for text_object in lab.objects.textobjects:
+            yield from self.text_object(text_object)
+        yield "\n"
+
+    def task(self, task: Task) -> Iterator[str]:
+        yield f"Task {task.id}, Name: {task.name}, Type: {task.obj_type}, Data: "
+        yield from self.field(task.text)
+
+    def tasks(self, lab: Lab) -> Iterator[str]:
+        yield ">>> Tasks <<<\n"
+        for task in lab.objects.tasks:
+            yield from self.task(task)
+        yield "\n"
+
+    def config(self, config: Config) -> Iterator[str]:
+        yield f"Config ID: {config.id}, Data: "
+        yield from self.field(config.data)
+
+    def configs(self, lab: Lab) -> Iterator[str]:
+        yield ">>> Configs <<<\n"
+        for config in lab.objects.configs:
+            yield from self.config(config)
+        yield "\n"
+
+    def configsets(self, lab: Lab) -> Iterator[str]:
+        yield ">>> Config sets <<<\n"
+        for configset in lab.objects.configsets:
+            yield f"Config Set ID: {configset.id}\n"
+            yield f"Config Set Name: {configset.name}\n"
+            yield "Contained Configs:\n"
+            for config in configset.configs:
+                yield from self.config(config)
+                yield "\n"
+            yield "\n"
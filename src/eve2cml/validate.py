@@ -0,0 +1,177 @@
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from .eve import Lab
+
+
+class ValidationError:
+    def __init__(
+        self,
+        code: str,
+        message: str,
+        node: Optional[str] = None,
+        link: Optional[str] = None,
+    ):
+        self.code = code
+        self.message = message
+        self.node = node
+        self.link = link
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "code": self.code,
+            "message": self.message,
+            "node": self.node,
+            "link": self.link,
+        }
+
+    def __str__(self):
+        where = " ".join(
+            f"{k}={v}" for k, v in (("node", self.node), ("link", self.link)) if v
+        )
+        return f"{self.code}: {self.message}" + (f" ({where})" if where else "")
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.code!r}, {self.message!r})"
+
+
+def _node_slots(lab: "Lab") -> dict[str, set[int]]:
+    # slots of the interfaces in the lab, everything else on a node is a filler
+    return {
+        f"n{node.id}": {iface.slot for iface in node.interfaces}
+        for node in lab.topology.nodes
+    }
+
+
+def _dangling_networks(lab: "Lab") -> list[ValidationError]:
+    errors: list[ValidationError] = []
+    network_ids = {network.id for network in lab.topology.networks}
+    for node in lab.topology.nodes:
+        for iface in node.interfaces:
+            if iface.network_id and iface.network_id not in network_ids:
+                errors.append(
+                    ValidationError(
+                        "dangling-network",
+                        f"interface {iface.name} refers to missing network {iface.network_id}",
+                        node=f"n{node.id}",
+                    )
+                )
+    return errors
+
+
+def validate(cml: dict[str, Any], lab: Optional["Lab"] = None) -> list[ValidationError]:
+    # Checks a converted topology for problems which make a CML import fail.
+    # All checks use hash lookups, the topology is traversed once.  With the
+    # lab, links are also checked against the interfaces of the EVE nodes and
+    # the interface slots against the interface lists of the mapper.
+    errors: list[ValidationError] = []
+    interface_lists = lab.mapper.interface_lists if lab is not None else {}
+    real_slots = _node_slots(lab) if lab is not None else None
+    if lab is not None:
+        errors.extend(_dangling_networks(lab))
+
+    # node id -> interface id -> slot
+    nodes: dict[str, dict[str, int]] = {}
+    labels: set[str] = set()
+    for node in cml.get("nodes", []):
+        node_id = node["id"]
+        if node_id in nodes:
+            errors.append(
+                ValidationError("duplicate-node-id", "duplicate node ID", node=node_id)
+            )
+        if node["label"] in labels:
+            errors.append(
+                ValidationError(
+                    "duplicate-label",
+                    f"duplicate node label {node['label']}",
+                    node=node_id,
+                )
+            )
+        labels.add(node["label"])
+
+        names = interface_lists.get(node.get("node_definition") or "")
+        ifaces: dict[str, int] = {}
+        slots: set[int] = set()
+        for iface in node.get("interfaces", []):
+            slot = iface["slot"]
+            if iface["id"] in ifaces:
+                errors.append(
+                    ValidationError(
+                        "duplicate-interface-id",
+                        f"duplicate interface ID {iface['id']}",
+                        node=node_id,
+                    )
+                )
+            if slot in slots:
+                errors.append(
+                    ValidationError(
+                        "duplicate-slot", f"duplicate slot {slot}", node=node_id
+                    )
+                )
+            if names is not None and not names.has_slot(slot):
+                errors.append(
+                    ValidationError(
+                        "slot-out-of-range",
+                        f"slot {slot} is not in the interface list of "
+                        f"{node['node_definition']} ({names.size} interfaces)",
+                        node=node_id,
+                    )
+                )
+            ifaces[iface["id"]] = slot
+            slots.add(slot)
+        nodes[node_id] = ifaces
+
+    link_ids: set[str] = set()
+    used: dict[tuple[str, str], str] = {}
+    for link in cml.get("links", []):
+        link_id = link["id"]
+        if link_id in link_ids:
+            errors.append(
+                ValidationError("duplicate-link-id", "duplicate link ID", link=link_id)
+            )
+        link_ids.add(link_id)
+        for node_key, iface_key in (("n1", "i1"), ("n2", "i2")):
+            node_id = link[node_key]
+            iface_id = link[iface_key]
+            link_ifaces = nodes.get(node_id)
+            if link_ifaces is None:
+                errors.append(
+                    ValidationError(
+                        "dangling-node", f"unknown node {node_id}", link=link_id
+                    )
+                )
+                continue
+            slot = link_ifaces.get(iface_id)
+            if slot is None:
+                errors.append(
+                    ValidationError(
+                        "dangling-interface",
+                        f"unknown interface {iface_id}",
+                        node=node_id,
+                        link=link_id,
+                    )
+                )
+                continue
+            # nodes which are not in the lab (like the connectors of a split
+            # lab) have no EVE interfaces to compare with
+            node_slots = real_slots.get(node_id) if real_slots is not None else None
+            if node_slots is not None and slot not in node_slots:
+                errors.append(
+                    ValidationError(
+                        "filler-link",
+                        f"link to filler interface {iface_id}",
+                        node=node_id,
+                        link=link_id,
+                    )
+                )
+            other = used.setdefault((node_id, iface_id), link_id)
+            if other != link_id:
+                errors.append(
+                    ValidationError(
+                        "interface-in-use",
+                        f"interface {iface_id} is already used by {other}",
+                        node=node_id,
+                        link=link_id,
+                    )
+                )
+    return errors
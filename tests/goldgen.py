@@ -0,0 +1,130 @@
+# golden output corpus: the YAML and text output of a set of EVE labs,
+# compared byte for byte by test_golden.py
+#
+# regenerate with: make golden (or uv run python -m tests.goldgen)
+# check only with: uv run python -m tests.goldgen --check
+#
+# Regenerate only for an intended change of the output and review the diff
+# of tests/golden/expected before committing it.
+import argparse
+import difflib
+import io
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+
+from eve2cml.main import (
+    Eve2CMLmapper,
+    cml_outputs,
+    cml_yaml,
+    convert_file,
+    dump_as_text,
+)
+
+TESTS = Path(__file__).parent
+GOLDEN = TESTS / "golden"
+EXPECTED = GOLDEN / "expected"
+
+# IOL slot mapping (iol, ioll2-*), pnet clouds, NAT, bridges and hubs, config
+# sets and all text object shapes (shapes)
+LABS = [
+    TESTS / "testdata" / "configsets.unl",
+    TESTS / "testdata" / "hub.unl",
+    TESTS / "testdata" / "ioll2-v1.unl",
+    TESTS / "testdata" / "ioll2-v2.unl",
+    TESTS / "testdata" / "nat.unl",
+    TESTS / "testdata" / "pnet.unl",
+    TESTS / "testdata" / "test.unl",
+    GOLDEN / "labs" / "iol.unl",
+    GOLDEN / "labs" / "shapes.unl",
+]
+
+
+def _convert(path: Path):
+    # the lab file name is part of the output, only the base name is used to
+    # not depend on the location of the checkout.
+    return convert_file(
+        path.read_text(encoding="utf-8"), path.name, Eve2CMLmapper.load()
+    )
+
+
+def outputs(path: Path) -> Iterator[tuple[str, str]]:
+    # (file name, content) of the outputs of a lab: the topology, one
+    # topology per config set and the text report with all fields
+    lab = _convert(path)
+    for filename, cml in cml_outputs(lab):
+        yield filename.name, cml_yaml(cml)
+    if lab.objects.configsets:
+        for filename, cml in cml_outputs(lab, "all"):
+            yield filename.name, cml_yaml(cml)
+    text = io.StringIO()
+    dump_as_text(text, lab, True)
+    yield f"{path.stem}.txt", text.getvalue()
+
+
+def diff(name: str, expected: str, actual: str, context: int = 3) -> str:
+    lines = difflib.unified_diff(
+        expected.splitlines(keepends=True),
+        actual.splitlines(keepends=True),
+        f"expected/{name}",
+        f"actual/{name}",
+        n=context,
+    )
+    return "".join(lines)
+
+
+def check() -> list[str]:
+    # names of the outputs which differ, are missing or are not generated
+    # anymore
+    generated = {}
+    for path in LABS:
+        generated.update(outputs(path))
+    problems = []
+    for name, content in sorted(generated.items()):
+        target = EXPECTED / name
+        if not target.exists():
+            problems.append(f"{name}: missing")
+        elif target.read_bytes() != content.encode("utf-8"):
+            problems.append(f"{name}: differs")
+    for target in sorted(EXPECTED.iterdir()):
+        if target.name not in generated:
+            problems.append(f"{target.name}: not generated")
+    return problems
+
+
+def generate() -> int:
+    EXPECTED.mkdir(parents=True, exist_ok=True)
+    generated = set()
+    for path in LABS:
+        for name, content in outputs(path):
+            (EXPECTED / name).write_bytes(content.encode("utf-8"))
+            generated.add(name)
+    for target in EXPECTED.iterdir():
+        if target.name not in generated:
+            target.unlink()
+    return len(generated)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.goldgen",
+        description="regenerate (or check) the golden output corpus",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only compare, exit with 1 if an output differs",
+    )
+    args = parser.parse_args(argv)
+    if args.check:
+        problems = check()
+        for problem in problems:
+            print(problem)
+        return 1 if problems else 0
+    count = generate()
+    print(f"{count} golden output(s) written to {EXPECTED}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
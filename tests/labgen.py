@@ -0,0 +1,70 @@
+# generates synthetic EVE-NG labs for scaling tests and benchmarks
+import base64
+
+
+def make_unl(
+    nodes: int,
+    ethernet: int = 8,
+    node_type: str = "qemu",
+    template: str = "viosl2",
+    hub_size: int = 0,
+    config_size: int = 0,
+    name: str = "generated",
+    same_config: bool = False,
+) -> str:
+    # nodes form a chain of p2p bridges (interface 1 of a node connects to
+    # interface 0 of the next one), the first hub_size nodes additionally
+    # share one bridge via their last interface.  Configs name their node
+    # unless same_config is set.
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>',
+        f'<lab name="{name}" version="1" scripttimeout="300" lock="0">',
+        "  <topology>",
+        "    <nodes>",
+    ]
+    for node_id in range(1, nodes + 1):
+        lines.append(
+            f'      <node id="{node_id}" name="N{node_id}" type="{node_type}" '
+            f'template="{template}" image="" ethernet="{ethernet}" cpu="1" '
+            f'ram="512" config="{1 if config_size else 0}" '
+            f'left="{(node_id % 40) * 50}" top="{(node_id // 40) * 50}">'
+        )
+        if node_id > 1:
+            lines.append(
+                f'        <interface id="0" name="e0" type="ethernet" network_id="{node_id - 1}"/>'
+            )
+        if node_id < nodes:
+            lines.append(
+                f'        <interface id="1" name="e1" type="ethernet" network_id="{node_id}"/>'
+            )
+        if node_id <= hub_size:
+            lines.append(
+                f'        <interface id="{ethernet - 1}" name="e{ethernet - 1}" '
+                f'type="ethernet" network_id="{nodes}"/>'
+            )
+        lines.append("      </node>")
+    lines.append("    </nodes>")
+    lines.append("    <networks>")
+    for net_id in range(1, nodes):
+        lines.append(
+            f'      <network id="{net_id}" type="bridge" name="net{net_id}" '
+            f'left="{(net_id % 40) * 50 + 25}" top="{(net_id // 40) * 50}"/>'
+        )
+    if hub_size:
+        lines.append(
+            f'      <network id="{nodes}" type="bridge" name="hub" left="0" top="-100"/>'
+        )
+    lines.append("    </networks>")
+    lines.append("  </topology>")
+    if config_size:
+        lines.append("  <objects>")
+        lines.append("    <configs>")
+        for node_id in range(1, nodes + 1):
+            hostname = "N" if same_config else f"N{node_id}"
+            body = f"hostname {hostname}\n" + "!\n" * (config_size // 2)
+            data = base64.b64encode(body.encode()).decode()
+            lines.append(f'      <config id="{node_id}">{data}</config>')
+        lines.append("    </configs>")
+        lines.append("  </objects>")
+    lines.append("</lab>")
+    return "\n".join(lines) + "\n"
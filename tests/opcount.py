@@ -0,0 +1,53 @@
+# operation counts for scaling tests, unlike the run time these do not depend
+# on the load of the machine
+import math
+import os
+import sys
+from collections.abc import Callable, Sequence
+from typing import Any
+
+import eve2cml
+
+_PACKAGE = os.path.dirname(eve2cml.__file__)
+
+
+def count_ops(func: Callable[..., Any], *args, **kwargs) -> tuple[int, Any]:
+    # Returns the number of operations and the result of func.  Operations
+    # are the calls of Python functions (of any package, like yaml) and the
+    # executed lines of eve2cml, loops in eve2cml count without a call.
+    # Tracing the lines of other packages would only make it slower.  A
+    # tracer which was set before (like the one of coverage) is restored.
+    count = 0
+
+    def local(frame, event, arg):
+        nonlocal count
+        if event == "line":
+            count += 1
+        return local
+
+    def tracer(frame, event, arg):
+        nonlocal count
+        count += 1
+        if frame.f_code.co_filename.startswith(_PACKAGE):
+            return local
+        return None
+
+    previous = sys.gettrace()
+    sys.settrace(tracer)
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        sys.settrace(previous)
+    return count, result
+
+
+def growth_exponent(sizes: Sequence[int], counts: Sequence[int]) -> float:
+    # least squares fit of count = c * size^k, returns k (1 is linear, 2 is
+    # quadratic; n log n is a little above 1)
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(count, 1)) for count in counts]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum(
+        (x - mean_x) ** 2 for x in xs
+    )
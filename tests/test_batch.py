@@ -0,0 +1,193 @@
+import base64
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from eve2cml import main as main_module
+from eve2cml.batch import BatchRunner, FailureReport, Limits
+from eve2cml.dedup import Deduplicator
+from eve2cml.eve import Lab
+from eve2cml.main import Eve2CMLmapper, cml_yaml, convert_files, main
+
+from .labgen import make_unl
+
+
+@pytest.fixture
+def files(request, tmp_path) -> list[str]:
+    # copies, the output is written next to the labs
+    testdata = Path(request.path).parent / "testdata"
+    for name in ("test.unl", "test.zip", "hub.unl"):
+        (tmp_path / name).write_bytes((testdata / name).read_bytes())
+    bad = tmp_path / "bad.unl"
+    bad.write_text("this is not XML")
+    return [
+        str(tmp_path / "test.unl"),
+        str(bad),
+        str(tmp_path / "missing.unl"),
+        str(tmp_path / "test.zip"),
+        str(tmp_path / "hub.unl"),
+    ]
+
+
+def _unconvertible(tmp_path) -> list[str]:
+    # labs which parse but fail in the conversion: an unknown pnet network
+    # and a square without its SVG
+    pnet = tmp_path / "pnet.unl"
+    pnet.write_text(make_unl(2).replace('type="bridge"', 'type="pnet_x"'))
+    square = base64.b64encode(b'<div style="left: 1px; top: 2px;">x</div>')
+    objects = (
+        '  <objects><textobjects><textobject id="1" name="sq" type="square">'
+        f"<data>{square.decode()}</data></textobject></textobjects></objects>\n"
+        "</lab>"
+    )
+    shape = tmp_path / "shape.unl"
+    shape.write_text(make_unl(2).replace("</lab>", objects))
+    good = tmp_path / "good.unl"
+    good.write_text(make_unl(2))
+    return [str(pnet), str(shape), str(good)]
+
+
+@pytest.mark.parametrize("limits", [Limits(), Limits(timeout=30, jobs=3)])
+def test_keep_going(files, limits):
+    mapper = Eve2CMLmapper.load()
+    failures = FailureReport()
+    runner = BatchRunner(mapper, limits=limits, keep_going=True, failures=failures)
+    labs = runner.run(files)
+    assert [lab.filename for lab in labs] == [files[0], "test.unl", files[4]]
+    # parallel workers finish in any order
+    assert sorted((f.filename, f.reason) for f in failures.failures) == [
+        (files[1], "parse-error"),
+        (files[2], "not-found"),
+    ]
+    # same result as without a worker process
+    expected = convert_files(files[4], mapper)[0].as_cml_dict()
+    assert cml_yaml(labs[2].as_cml_dict()) == cml_yaml(expected)
+
+
+@pytest.mark.parametrize("limits", [Limits(), Limits(jobs=2)])
+def test_stop(files, limits):
+    runner = BatchRunner(Eve2CMLmapper.load(), limits=limits)
+    with pytest.raises(SystemExit):
+        runner.run(files)
+
+
+def _slow(*args, **kwargs):
+    time.sleep(30)
+
+
+def _greedy(*args, **kwargs):
+    return bytearray(1024 * 1024 * 1024)
+
+
+@pytest.mark.parametrize(
+    "func,limits,reason",
+    [
+        (_slow, Limits(timeout=0.5), "timeout"),
+        (_greedy, Limits(max_memory=64 * 1024 * 1024), "memory"),
+    ],
+)
+def test_limits(files, monkeypatch, func, limits, reason):
+    # the forked workers see the patched function
+    monkeypatch.setattr(main_module, "convert_file", func)
+    failures = FailureReport()
+    runner = BatchRunner(Eve2CMLmapper.load(), limits=limits, failures=failures)
+    start = time.monotonic()
+    assert runner.run(files[:1]) == []
+    assert time.monotonic() - start < 10
+    assert [f.reason for f in failures.failures] == [reason]
+
+
+def test_failure_report(files, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    report = tmp_path / "failures.json"
+    with pytest.raises(SystemExit):
+        main(["--keep-going", "--failures", str(report), *files])
+    assert (tmp_path / "test.yaml").exists()
+    assert [f["reason"] for f in json.loads(report.read_text())] == [
+        "parse-error",
+        "not-found",
+    ]
+
+
+@pytest.mark.parametrize("extra", [[], ["--timeout", "30"], ["--jobs", "2"]])
+def test_conversion_errors(tmp_path, extra):
+    labs = _unconvertible(tmp_path)
+    report = tmp_path / "failures.json"
+    with pytest.raises(SystemExit):
+        main(["--keep-going", "--failures", str(report), *extra, *labs])
+    assert (tmp_path / "good.yaml").exists()
+    failures = json.loads(report.read_text())
+    assert sorted(f["filename"] for f in failures) == labs[:2]
+    assert {f["reason"] for f in failures} == {"convert-error"}
+
+
+def test_dedup_in_flight(tmp_path):
+    # identical labs dispatched before the first one is done
+    content = make_unl(20)
+    files = []
+    for name in ("a", "b", "c"):
+        (tmp_path / f"{name}.unl").write_text(content)
+        files.append(str(tmp_path / f"{name}.unl"))
+    dedup = Deduplicator()
+    runner = BatchRunner(Eve2CMLmapper.load(), dedup=dedup, limits=Limits(jobs=3))
+    [lab] = runner.run(files)
+    assert lab.filename == files[0]
+    assert lab.duplicates == files[1:]
+    assert dedup.skipped == 2
+
+
+def test_converted_in_worker(tmp_path, monkeypatch):
+    # the topology of a worker is written, the lab is not converted again
+    # and the diagnostics of the worker are counted
+    lab = tmp_path / "lab.unl"
+    lab.write_text(make_unl(4, config_size=4))
+    main([str(lab)])
+    expected = (tmp_path / "lab.yaml").read_text()
+
+    converted = []
+    as_cml_dict = Lab.as_cml_dict
+
+    def counted(self):
+        converted.append(os.getpid())
+        return as_cml_dict(self)
+
+    monkeypatch.setattr(Lab, "as_cml_dict", counted)
+    report = tmp_path / "diag.json"
+    main(["--timeout", "30", "--diag-json", str(report), str(lab)])
+    assert (tmp_path / "lab.yaml").read_text() == expected
+    assert converted == []
+    [serialized] = json.loads(report.read_text())["serialized"]
+    assert serialized["count"] == 4
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [[], ["--jobs", "2"], ["--timeout", "30", "--jobs", "2"], ["--backend", "threads"]],
+)
+def test_dedup_failures(tmp_path, extra):
+    # a failing lab fails its duplicates, the same with one or more jobs
+    names = []
+    for name, content in (
+        ("bad1", "this is not XML"),
+        ("pnet1", make_unl(2).replace('type="bridge"', 'type="pnet_x"')),
+        ("bad2", "this is not XML"),
+        ("pnet2", make_unl(2).replace('type="bridge"', 'type="pnet_x"')),
+    ):
+        (tmp_path / f"{name}.unl").write_text(content)
+        names.append(str(tmp_path / f"{name}.unl"))
+    report = tmp_path / "failures.json"
+    with pytest.raises(SystemExit):
+        main(["--keep-going", "--dedup", "--failures", str(report), *extra, *names])
+    failures = sorted(
+        (Path(f["filename"]).stem, f["reason"], f["detail"].startswith("duplicate"))
+        for f in json.loads(report.read_text())
+    )
+    assert failures == [
+        ("bad1", "parse-error", False),
+        ("bad2", "parse-error", True),
+        ("pnet1", "convert-error", False),
+        ("pnet2", "convert-error", True),
+    ]
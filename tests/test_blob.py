@@ -0,0 +1,76 @@
+import base64
+import time
+from pathlib import Path
+
+from eve2cml.eve import TextObject
+from eve2cml.eve.blob import strip_blobs
+from eve2cml.main import main
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 64
+
+HTML = (
+    '<div id="customText1" class="customShape customText" style="left: 10px; '
+    'top: 20px; z-index: 1001; background: url(data:image/gif;base64,R0lGODlh);">'
+    '<p style="color: rgb(255, 0, 0); font-size: 20px;">Hello</p>'
+    '<img src="data:image/png;base64,{payload}" width="10"></div>'
+)
+
+
+def _html(payload: bytes) -> str:
+    encoded = base64.encodebytes(payload).decode()
+    return HTML.format(payload=encoded)
+
+
+def _text_object(payload: bytes) -> TextObject:
+    data = base64.b64encode(_html(payload).encode()).decode()
+    return TextObject(1, "txt", "text", data)
+
+
+def test_strip_blobs():
+    html, blobs = strip_blobs(_html(PNG))
+    assert [blob.mime for blob in blobs] == ["image/gif", "image/png"]
+    assert "url(eve2cml-blob:0)" in html
+    assert 'src="eve2cml-blob:1"' in html
+    assert blobs[1].extension == ".png"
+    assert blobs[1].content(_html(PNG)) == PNG
+    assert strip_blobs("<p>data: none</p>") == ("<p>data: none</p>", [])
+
+
+def test_text_object():
+    text_object = _text_object(PNG)
+    assert "base64" not in text_object.prettify()
+    assert text_object.strings == "Hello"
+    assert text_object.left == 10
+    assert text_object.blob_content(text_object.blobs[1]) == PNG
+    [annotation] = text_object.as_cml_annotations()
+    assert annotation["color"] == "#FF0000FF"
+
+
+def test_large_image():
+    # the time to parse does not depend on the size of the image
+    start = time.perf_counter()
+    _text_object(b"x" * 100).prettify()
+    small = time.perf_counter() - start
+
+    text_object = _text_object(b"x" * 20 * 1024 * 1024)
+    start = time.perf_counter()
+    pretty = text_object.prettify()
+    large = time.perf_counter() - start
+    assert len(pretty) < 1000
+    assert large < small + 1.0
+
+
+def test_extract_images(tmp_path, monkeypatch):
+    data = base64.b64encode(_html(PNG).encode()).decode()
+    lab = tmp_path / "lab.unl"
+    lab.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?><lab name="images"><topology/>'
+        "<objects><textobjects>"
+        f'<textobject id="3" name="txt" type="text"><data>{data}</data></textobject>'
+        "</textobjects></objects></lab>"
+    )
+    monkeypatch.chdir(tmp_path)
+    main(["--extract-images", str(lab)])
+    assert (tmp_path / "lab.yaml").exists()
+    assert (tmp_path / "lab--text3-1.png").read_bytes() == PNG
+    assert Path(tmp_path / "lab--text3-0.gif").exists()
@@ -0,0 +1,136 @@
+import io
+import json
+
+import pytest
+
+from eve2cml.capacity import CapacityReport, LabUsage, pack
+from eve2cml.main import Eve2CMLmapper, convert_file, main
+
+from .labgen import make_unl
+
+
+def _usage(name: str, cpus: int, ram: int) -> LabUsage:
+    usage = LabUsage(name)
+    usage.cpus = cpus
+    usage.ram = ram
+    return usage
+
+
+def _node(node_def: str, cpus=None, ram=None, cpu_limit=None):
+    return {
+        "node_definition": node_def,
+        "cpus": cpus,
+        "ram": ram,
+        "cpu_limit": cpu_limit,
+    }
+
+
+def test_node_defaults():
+    mapper = Eve2CMLmapper.load()
+    report = CapacityReport(mapper)
+    usage = report.add(
+        "lab.yaml",
+        {
+            "nodes": [
+                _node("iosv"),
+                _node("iosv", cpus=2, ram=1024, cpu_limit=50),
+                _node("unmanaged_switch"),
+                _node("nosuchdef"),
+            ]
+        },
+    )
+    assert (usage.nodes, usage.cpus, usage.ram) == (4, 3, 1536)
+    assert usage.cpu_share == 2
+    assert usage.unknown == {"nosuchdef": 1}
+
+
+def test_pack():
+    labs = [
+        _usage(f"l{idx}", cpus, ram)
+        for idx, (cpus, ram) in enumerate(
+            [(4, 8), (8, 4), (2, 2), (6, 6), (10, 1), (3, 3)]
+        )
+    ]
+
+    def names(hosts):
+        return [[usage.name for usage in host.labs] for host in hosts]
+
+    hosts, unplaced = pack(labs, 10, 10)
+    assert names(hosts) == [["l4"], ["l0", "l2"], ["l1"], ["l3", "l5"]]
+    assert unplaced == []
+
+    hosts, unplaced = pack(labs, 10, 10, hosts=2)
+    assert names(hosts) == [["l4"], ["l0", "l2"]]
+    assert [usage.name for usage in unplaced] == ["l1", "l3", "l5"]
+
+    # too large for any host
+    hosts, unplaced = pack([_usage("big", 20, 1)], 10, 10)
+    assert hosts == []
+    assert [usage.name for usage in unplaced] == ["big"]
+
+
+def test_report_output():
+    mapper = Eve2CMLmapper.load()
+    report = CapacityReport(mapper, host_cpus=4, host_ram=4096)
+    for idx in range(3):
+        lab = convert_file(make_unl(3), f"lab{idx}.unl", mapper)
+        report.add(f"lab{idx}.yaml", lab.as_cml_dict())
+    out = io.StringIO()
+    report.write_json(out)
+    result = json.loads(out.getvalue())
+    assert result["total"] == {
+        "name": "total",
+        "nodes": 9,
+        "cpus": 9,
+        "ram": 4608,
+        "cpu_share": 9,
+    }
+    assert [host["labs"] for host in result["hosts"]] == [
+        ["lab0.yaml"],
+        ["lab1.yaml"],
+        ["lab2.yaml"],
+    ]
+
+    out = io.StringIO()
+    report.write_text(out)
+    assert "3 host(s) with 4 vCPUs and 4096 MB RAM" in out.getvalue()
+
+
+def test_capacity_cli(tmp_path, capsys):
+    lab_file = tmp_path / "lab.unl"
+    lab_file.write_text(make_unl(4))
+    main(["--capacity-report", "-", "--host-size", "2:1", str(lab_file)])
+    out = capsys.readouterr().out
+    assert "lab.yaml" in out
+    assert "0 host(s) with 2 vCPUs and 1024 MB RAM" in out
+    assert "not placed: lab.yaml" in out
+
+
+@pytest.mark.parametrize(
+    "options",
+    [["--host-size", "0:0"], ["--host-size", "4:0"], ["--hosts", "2"]],
+)
+def test_capacity_cli_hosts(tmp_path, options):
+    lab_file = tmp_path / "lab.unl"
+    lab_file.write_text(make_unl(4))
+    with pytest.raises(SystemExit):
+        main(["--capacity-report", "-", *options, str(lab_file)])
+
+
+def test_capacity_duplicates(tmp_path, capsys):
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.unl").write_text(make_unl(4))
+    main(
+        [
+            "--dedup",
+            "--capacity-report",
+            "-",
+            str(tmp_path / "a.unl"),
+            str(tmp_path / "b.unl"),
+        ]
+    )
+    out = capsys.readouterr().out
+    assert "a.yaml" in out
+    assert "b.yaml" in out
+    total = next(line for line in out.splitlines() if line.startswith("total"))
+    assert total.split()[1] == "8"
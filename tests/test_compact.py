@@ -0,0 +1,88 @@
+import copy
+
+import yaml
+
+from eve2cml.compact import compact
+from eve2cml.main import Eve2CMLmapper, cml_yaml, convert_file, main
+
+from .goldgen import LABS
+from .labgen import make_unl
+
+# the defaults CML uses for the keys which --compact leaves out
+NODE_DEFAULTS = {
+    "boot_disk_size": None,
+    "configuration": "",
+    "cpu_limit": None,
+    "cpus": None,
+    "data_volume": None,
+    "hide_links": False,
+    "image_definition": None,
+    "ram": None,
+    "tags": [],
+}
+
+
+def _with_defaults(cml):
+    for node in cml["nodes"]:
+        for key, value in NODE_DEFAULTS.items():
+            node.setdefault(key, copy.copy(value))
+        for iface in node["interfaces"]:
+            iface.setdefault("type", "physical")
+    for link in cml["links"]:
+        link.setdefault("conditioning", {})
+    return cml
+
+
+def _sorted(cml):
+    # the key order of the records differs
+    return yaml.safe_dump(cml, sort_keys=True)
+
+
+def test_compact_labs():
+    for path in LABS:
+        lab = convert_file(path.read_text(), path.name, Eve2CMLmapper.load())
+        cml = lab.as_cml_dict()
+        full = cml_yaml(cml)
+        content = cml_yaml(compact(cml))
+        assert len(content) < len(full), path.name
+        # nothing but defaults is left out
+        loaded = yaml.safe_load(content)
+        assert _sorted(_with_defaults(loaded)) == _sorted(yaml.safe_load(full))
+        # the topology itself is not changed
+        assert cml_yaml(cml) == full
+
+
+def test_compact_records():
+    content = make_unl(3, config_size=4)
+    cml = convert_file(content, "lab.unl", Eve2CMLmapper.load()).as_cml_dict()
+    cml["nodes"][1]["configuration"] = ""
+    output = cml_yaml(compact(cml))
+    loaded = yaml.safe_load(output)
+    assert "- {id: l0, n1: n1, i1: i1, n2: n2, i2: i0, label: net1-0}" in output
+    assert "  - {id: i0, label: GigabitEthernet0/0, slot: 0}" in output
+    assert "configuration" in loaded["nodes"][0]
+    assert "configuration" not in loaded["nodes"][1]
+    assert set(loaded["nodes"][2]) == {
+        "id",
+        "configuration",
+        "cpus",
+        "label",
+        "node_definition",
+        "ram",
+        "x",
+        "y",
+        "interfaces",
+    }
+
+
+def test_compact_cli(tmp_path):
+    lab = tmp_path / "lab.unl"
+    lab.write_text(make_unl(20, ethernet=16))
+    main([str(lab)])
+    full = (tmp_path / "lab.yaml").read_text()
+    main(["--compact", str(lab)])
+    compacted = (tmp_path / "lab.yaml").read_text()
+    assert len(compacted) < len(full) * 0.7
+    assert _sorted(_with_defaults(yaml.safe_load(compacted))) == _sorted(
+        yaml.safe_load(full)
+    )
@@ -0,0 +1,110 @@
+import pytest
+import yaml
+
+from eve2cml.configrefs import config_files, load_topology, shared_configs
+from eve2cml.eve.config import Config, ConfigPool, config_digest
+from eve2cml.main import (
+    CMLAnchorDumper,
+    Eve2CMLmapper,
+    cml_yaml,
+    convert_file,
+    main,
+)
+
+from .labgen import make_unl
+
+
+def _lab(nodes=6, config_size=600):
+    content = make_unl(nodes, config_size=config_size, same_config=True)
+    return convert_file(content, "lab.unl", Eve2CMLmapper.load())
+
+
+def test_pool():
+    pool = ConfigPool()
+    first = Config(1, "aG9zdG5hbWUgUjEK")
+    second = Config(2, "aG9zdG5hbWUgUjEK")
+    third = Config.from_text(3, "hostname R1\n")
+    for config in (first, second, third):
+        config.share(pool)
+    assert first.data == "hostname R1\n"
+    assert first.data is second.data is third.data
+    assert len(pool) == 1
+    assert pool.intern("") == ""
+    assert len(pool) == 1
+
+
+def test_pool_lab():
+    lab = _lab()
+    configs = [node["configuration"] for node in lab.as_cml_dict()["nodes"]]
+    assert len(set(map(id, configs))) == 1
+    assert len(lab.objects.config_pool) == 1
+
+
+def test_default_inline():
+    cml = _lab().as_cml_dict()
+    content = cml_yaml(cml)
+    assert "&id" not in content
+    assert content.count("hostname N") == 6
+
+
+def test_anchors():
+    cml = _lab().as_cml_dict()
+    content = cml_yaml(shared_configs(cml, 256), CMLAnchorDumper)
+    assert content.count("hostname N") == 1
+    assert content.count("*id001") == 5
+    # CML reads plain YAML, the aliases resolve to the config
+    assert yaml.safe_load(content) == yaml.safe_load(cml_yaml(cml))
+    assert len(content) < len(cml_yaml(cml)) / 2
+    # small configs stay inline
+    small = cml_yaml(shared_configs(cml, 10000), CMLAnchorDumper)
+    assert small == cml_yaml(cml)
+
+
+def test_config_files(tmp_path):
+    cml = _lab().as_cml_dict()
+    config = cml["nodes"][0]["configuration"]
+    result, files = config_files(cml, tmp_path / "configs", tmp_path, 256)
+    target = tmp_path / "configs" / f"{config_digest(config)}.cfg"
+    assert files == {target: config}
+    assert result["nodes"][0]["configuration"].path == f"configs/{target.name}"
+    assert cml["nodes"][0]["configuration"] == config
+    content = cml_yaml(result)
+    assert content.count(f"configuration: !config 'configs/{target.name}'\n") == 6
+    # round trip through the loader of the references
+    target.parent.mkdir()
+    target.write_text(config)
+    (tmp_path / "lab.yaml").write_text(content)
+    assert load_topology(tmp_path / "lab.yaml") == cml
+
+
+def test_config_files_cli(tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.unl").write_text(
+            make_unl(4, config_size=600, same_config=True)
+        )
+    labs = [str(tmp_path / "a.unl"), str(tmp_path / "b.unl")]
+    main(labs)
+    inline = (tmp_path / "a.yaml").read_text()
+    configs = tmp_path / "out" / "configs"
+    main(["--configs-dir", str(configs), *labs])
+    [written] = configs.iterdir()
+    assert written.read_text().startswith("hostname N\n")
+    content = (tmp_path / "a.yaml").read_text()
+    assert content.count(f"!config 'out/configs/{written.name}'") == 4
+    # plain YAML loaders and CML can't read the tag
+    with pytest.raises(yaml.constructor.ConstructorError):
+        yaml.safe_load(content)
+    # inlined again, this is the default output
+    main(["--inline-configs", str(tmp_path / "a.yaml")])
+    assert (tmp_path / "a.yaml").read_text() == inline
+
+
+def test_config_anchors_cli(tmp_path):
+    lab = tmp_path / "lab.unl"
+    lab.write_text(make_unl(4, config_size=600, same_config=True))
+    main([str(lab)])
+    inline = (tmp_path / "lab.yaml").read_text()
+    main(["--config-anchors", str(lab)])
+    anchored = (tmp_path / "lab.yaml").read_text()
+    assert len(anchored) < len(inline)
+    assert yaml.safe_load(anchored) == yaml.safe_load(inline)
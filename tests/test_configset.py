@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+
+from eve2cml.main import Eve2CMLmapper, cml_outputs, convert_files, main
+
+
+@pytest.fixture
+def lab(request):
+    testdata = Path(request.path).parent / "testdata" / "configsets.unl"
+    [lab] = convert_files(str(testdata), Eve2CMLmapper.load())
+    return lab
+
+
+def _configs(cml):
+    return [node["configuration"] for node in cml["nodes"]]
+
+
+def test_default(lab):
+    [(filename, cml)] = cml_outputs(lab)
+    assert filename.name == "configsets.yaml"
+    assert _configs(cml) == ["hostname R1\n", "hostname R2\n"]
+
+
+def test_single_set(lab, caplog):
+    [(filename, cml)] = cml_outputs(lab, "1")
+    assert filename.name == "configsets.yaml"
+    assert _configs(cml) == ["hostname R1-initial\n", ""]
+
+    [(_, cml)] = cml_outputs(lab, "42")
+    assert _configs(cml) == ["hostname R1\n", "hostname R2\n"]
+    assert "config set 42 not found" in caplog.text
+
+
+def test_all_sets(lab, mocker):
+    spy = mocker.spy(lab, "as_cml_dict")
+    outputs = list(cml_outputs(lab, "all"))
+    assert spy.call_count == 1
+    assert [filename.name for filename, _ in outputs] == [
+        "configsets--Initial_Setup.yaml",
+        "configsets--Solved.yaml",
+    ]
+    initial, solved = (cml for _, cml in outputs)
+    assert _configs(initial) == ["hostname R1-initial\n", ""]
+    assert _configs(solved)[1].startswith("hostname R2-solved\ninterface Gi0/0")
+    # links and annotations are shared, not rebuilt
+    assert initial["links"] is solved["links"]
+    assert len(solved["links"]) == 1
+
+
+def test_cli(tmp_path, request):
+    testdata = Path(request.path).parent / "testdata" / "configsets.unl"
+    target = tmp_path / "configsets.unl"
+    target.write_bytes(testdata.read_bytes())
+    main(["--configset", "all", str(target)])
+    assert sorted(path.name for path in tmp_path.glob("*.yaml")) == [
+        "configsets--Initial_Setup.yaml",
+        "configsets--Solved.yaml",
+    ]
+    with pytest.raises(SystemExit):
+        main(["--configset", "first", str(target)])
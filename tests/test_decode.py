@@ -1,4 +1,8 @@
+from pathlib import Path
+
+from eve2cml.eve import Task
 from eve2cml.eve.decode import decode_data
+from eve2cml.main import Eve2CMLmapper, convert_files
 
 
 def test_decode_data():
@@ -13,3 +17,27 @@ def test_decode_data():
     # Test when data is an invalid base64 encoded string
     invalid_data = "InvalidData"
     assert decode_data(invalid_data) == invalid_data
+
+
+def test_decode_data_lenient():
+    # line breaks are not valid in strict mode, the fallback handles them
+    assert decode_data("SGVsbG8g\nV29ybGQh\n") == "Hello World!"
+
+
+def test_lazy_config_and_task(request):
+    testdata = Path(request.path).parent / "testdata" / "test.unl"
+    mapper = Eve2CMLmapper.load()
+    [lab] = convert_files(str(testdata), mapper)
+    configs = lab.objects.configs + lab.objects.configsets[0].configs
+    assert not any(config.decoded for config in configs)
+
+    lab.as_cml_dict()
+    # only the configs of the default set are used by the two nodes
+    assert all(config.decoded for config in lab.objects.configs)
+    assert not any(config.decoded for config in lab.objects.configsets[0].configs)
+    assert lab.objects.configs[0].data == "hostname host1\n"
+
+    task = Task(1, "task", "html", "SGVsbG8gV29ybGQh")
+    assert task.text == "Hello World!"
+    task.data = "V29ybGQh"
+    assert task.text == "World!"
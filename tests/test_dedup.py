@@ -0,0 +1,73 @@
+import logging
+import zipfile
+from pathlib import Path
+
+from eve2cml.dedup import Deduplicator
+from eve2cml.main import Eve2CMLmapper, convert_files, main
+
+
+def _archive(request, tmp_path) -> Path:
+    testdata = Path(request.path).parent / "testdata"
+    archive = tmp_path / "students.zip"
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.write(testdata / "test.unl", "alice/test.unl")
+        zip_file.write(testdata / "hub.unl", "alice/hub.unl")
+        zip_file.write(testdata / "test.unl", "bob/test.unl")
+        zip_file.write(testdata / "test.unl", "carol/lab.unl")
+    return archive
+
+
+def test_dedup(request, tmp_path):
+    archive = _archive(request, tmp_path)
+    plain = tmp_path / "copy.unl"
+    plain.write_bytes(
+        (Path(request.path).parent / "testdata" / "test.unl").read_bytes()
+    )
+
+    dedup = Deduplicator()
+    mapper = Eve2CMLmapper.load()
+    labs = convert_files(str(archive), mapper, dedup=dedup)
+    labs.extend(convert_files(str(plain), mapper, dedup=dedup))
+    assert [lab.filename for lab in labs] == ["alice--test.unl", "alice--hub.unl"]
+    assert labs[0].duplicates == ["bob--test.unl", "carol--lab.unl", str(plain)]
+    assert dedup.skipped == 3
+
+
+def test_dedup_cli(request, tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.WARNING)
+    archive = _archive(request, tmp_path)
+    monkeypatch.chdir(tmp_path)
+    main(["--dedup", str(archive)])
+    outputs = sorted(path.name for path in tmp_path.glob("*.yaml"))
+    assert outputs == [
+        "alice--hub.yaml",
+        "alice--test.yaml",
+        "bob--test.yaml",
+        "carol--lab.yaml",
+    ]
+    original = (tmp_path / "alice--test.yaml").read_text()
+    for name in ("bob--test.unl", "carol--lab.unl"):
+        output = (tmp_path / name).with_suffix(".yaml").read_text()
+        assert f"Imported from {name} " in output
+        assert output == original.replace("alice--test.unl", name)
+    assert "2 duplicate lab(s) skipped" in caplog.text
+
+
+def test_dedup_stdout(request, tmp_path, monkeypatch, capsys):
+    archive = _archive(request, tmp_path)
+    monkeypatch.chdir(tmp_path)
+    main(["--dedup", "--stdout", str(archive)])
+    out = capsys.readouterr().out
+    for name in ("alice--test", "alice--hub", "bob--test", "carol--lab"):
+        assert f" {name}.yaml " in out
+        assert f"Imported from {name}.unl " in out
+    assert list(tmp_path.glob("*.yaml")) == []
+
+
+def test_dedup_text(request, tmp_path, monkeypatch):
+    archive = _archive(request, tmp_path)
+    monkeypatch.chdir(tmp_path)
+    main(["--dedup", "--text", str(archive)])
+    original = tmp_path / "alice--test.txt"
+    for name in ("bob--test.txt", "carol--lab.txt"):
+        assert (tmp_path / name).read_text() == original.read_text()
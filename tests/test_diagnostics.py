@@ -0,0 +1,74 @@
+import io
+import json
+import logging
+import pickle
+from pathlib import Path
+
+from eve2cml.diagnostics import Diagnostics
+from eve2cml.main import Eve2CMLmapper, convert_files
+
+
+def test_rate_limit(caplog):
+    caplog.set_level(logging.INFO)
+    diag = Diagnostics(limit=2)
+    for idx in range(10):
+        diag.record("kind", ("a", idx % 2), "lab1", logging.WARNING, "msg %d", idx)
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages == [
+        "msg 0",
+        "msg 1",
+        "more 'kind' messages suppressed, see summary",
+    ]
+    assert len(diag) == 2
+    assert [event.count for event in diag.events["kind"].values()] == [5, 5]
+
+
+def test_summary_and_json(request):
+    testdata = Path(request.path).parent / "testdata"
+    mapper = Eve2CMLmapper.load()
+    diag = Diagnostics(limit=0)
+    labs = []
+    for filename in ("test.unl", "hub.unl", "nat.unl"):
+        labs.extend(convert_files(str(testdata / filename), mapper, diag))
+    for lab in labs:
+        lab.as_cml_dict()
+
+    # vpcs is not in the default map, all seven nodes end up in one entry
+    [unmapped] = diag.events["unmapped"].values()
+    assert unmapped.key == ("vpcs", "vpcs", "")
+    assert unmapped.count == 7
+    assert len(unmapped.labs) == 3
+
+    summary = diag.summary(logging.WARNING)
+    assert "unmapped: 7 occurrence(s), 1 distinct" in summary
+    assert "serialized" not in summary
+    assert "serialized" in diag.summary(logging.INFO)
+
+    out = io.StringIO()
+    diag.dump_json(out)
+    data = json.loads(out.getvalue())
+    assert data["unmapped"][0]["key"] == ["vpcs", "vpcs", ""]
+    assert data["internal"][0]["level"] == "WARNING"
+
+
+def test_fork_merge(caplog):
+    caplog.set_level(logging.INFO)
+    diag = Diagnostics(limit=2)
+    diag.record("kind", "a", "lab1", logging.WARNING, "msg %d", 0)
+    # a worker process gets a copy without the lock
+    child = pickle.loads(pickle.dumps(diag.fork()))
+    assert child.events == {}
+    for idx in range(1, 4):
+        child.record("kind", "b", "lab2", logging.WARNING, "msg %d", idx)
+    diag.merge(child)
+    diag.record("kind", "a", "lab1", logging.WARNING, "msg %d", 4)
+    assert [record.getMessage() for record in caplog.records] == [
+        "msg 0",
+        "msg 1",
+        "more 'kind' messages suppressed, see summary",
+    ]
+    assert {key: event.count for key, event in diag.events["kind"].items()} == {
+        "a": 2,
+        "b": 3,
+    }
+    assert diag.events["kind"]["b"].labs == {"lab2": 3}
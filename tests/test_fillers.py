@@ -0,0 +1,27 @@
+from eve2cml.main import Eve2CMLmapper, convert_file
+from eve2cml.options import Options
+
+from .labgen import make_unl
+
+
+def _convert(options=None):
+    content = make_unl(3, ethernet=8, template="viosl2")
+    lab = convert_file(content, "fillers.unl", Eve2CMLmapper.load(), options=options)
+    return lab.as_cml_dict()
+
+
+def test_fillers():
+    result = _convert()
+    for node in result["nodes"]:
+        assert [iface["slot"] for iface in node["interfaces"]] == list(range(8))
+        assert [iface["id"] for iface in node["interfaces"]] == [
+            f"i{idx}" for idx in range(8)
+        ]
+    assert result["nodes"][0]["interfaces"][7]["label"] == "GigabitEthernet1/3"
+
+
+def test_trim_fillers():
+    result = _convert(Options(trim_fillers=True))
+    # the first node only has interface 1 connected, slot 0 is a gap filler
+    assert [len(node["interfaces"]) for node in result["nodes"]] == [2, 2, 1]
+    assert result["nodes"][0]["interfaces"][0]["label"] == "GigabitEthernet0/0"
@@ -0,0 +1,106 @@
+import io
+import zipfile
+
+from eve2cml.filters import Pattern, SourceFilter, peek_lab_name
+from eve2cml.main import Eve2CMLmapper, _zip_sources, convert_files
+
+from .labgen import make_unl
+
+
+def _archive(tmp_path, labs: dict[str, str]) -> str:
+    filename = str(tmp_path / "labs.zip")
+    with zipfile.ZipFile(filename, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for member, name in labs.items():
+            zip_file.writestr(member, make_unl(3, name=name, config_size=5000))
+    return filename
+
+
+def test_pattern():
+    assert Pattern("lab-*.unl").matches("a/b/lab-1.unl", path=True)
+    assert not Pattern("lab-*.unl").matches("a/b/lab-1.unl")
+    assert Pattern("a/*/lab-?.unl").matches("a/b/lab-1.unl", path=True)
+    assert not Pattern("a/lab-?.unl").matches("a/b/lab-1.unl", path=True)
+    assert Pattern("re:b/lab-\\d").matches("a/b/lab-1.unl", path=True)
+    assert not Pattern("re:^b/").matches("a/b/lab-1.unl", path=True)
+
+
+def test_peek_lab_name():
+    content = make_unl(2, name="Core &amp; Edge").encode()
+    assert peek_lab_name(io.BytesIO(content)) == "Core & Edge"
+    assert peek_lab_name(io.BytesIO(b"<html><body/></html>")) is None
+    assert peek_lab_name(io.BytesIO(b"not xml at all")) is None
+    assert peek_lab_name(io.BytesIO(b"")) is None
+
+
+class _CountingStream(io.BytesIO):
+    def __init__(self, content: bytes, reads: list[int]):
+        super().__init__(content)
+        self._reads = reads
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self._reads.append(len(data))
+        return data
+
+
+def test_peek_reads_only_the_header():
+    content = make_unl(500, config_size=2000).encode()
+    reads: list[int] = []
+    assert SourceFilter(labs=["generated"]).accepts(
+        "lab.unl", lambda: _CountingStream(content, reads)
+    )
+    assert sum(reads) < 100_000 < len(content)
+
+
+def test_zip_selection(tmp_path):
+    filename = _archive(
+        tmp_path,
+        {
+            "site1/core.unl": "Core A",
+            "site1/edge.unl": "Edge A",
+            "site2/core.unl": "Core B",
+            "site2/notes.unl": "Notes",
+        },
+    )
+
+    def selected(selection: SourceFilter) -> list[str]:
+        with zipfile.ZipFile(filename) as zip_file:
+            return [source.filename for source in _zip_sources(zip_file, selection)]
+
+    assert selected(SourceFilter(include=["core.unl"])) == [
+        "site1--core.unl",
+        "site2--core.unl",
+    ]
+    assert selected(SourceFilter(include=["site1/*"], exclude=["re:edge"])) == [
+        "site1--core.unl"
+    ]
+    assert selected(SourceFilter(labs=["Core *"], exclude_labs=["* B"])) == [
+        "site1--core.unl"
+    ]
+    selection = SourceFilter(exclude_labs=["re:^(Edge|Notes)"])
+    assert selected(selection) == ["site1--core.unl", "site2--core.unl"]
+    assert selection.skipped == 2
+
+
+def test_unselected_members_are_not_read(tmp_path, mocker):
+    filename = _archive(tmp_path, {"a.unl": "A", "b.unl": "B"})
+    read = mocker.spy(zipfile.ZipFile, "read")
+    opened = mocker.spy(zipfile.ZipFile, "open")
+    labs = convert_files(
+        filename, Eve2CMLmapper.load(), selection=SourceFilter(exclude=["b.*"])
+    )
+    assert [lab.name for lab in labs] == ["A"]
+    # one read of a.unl, nothing of b.unl
+    assert [call.args[1] for call in read.call_args_list] == ["a.unl"]
+    assert opened.call_count == 1
+
+
+def test_plain_file_selection(tmp_path):
+    lab_file = tmp_path / "lab.unl"
+    lab_file.write_text(make_unl(2, name="Lab One"))
+    mapper = Eve2CMLmapper.load()
+    assert (
+        convert_files(str(lab_file), mapper, selection=SourceFilter(labs=["Two"])) == []
+    )
+    [lab] = convert_files(str(lab_file), mapper, selection=SourceFilter(labs=["Lab*"]))
+    assert lab.name == "Lab One"
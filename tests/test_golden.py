@@ -0,0 +1,24 @@
+import pytest
+
+from .goldgen import EXPECTED, LABS, diff, outputs
+
+# the output may only change on purpose, see goldgen.py to regenerate
+
+
+@pytest.mark.parametrize("path", LABS, ids=[path.name for path in LABS])
+def test_golden(path):
+    for name, content in outputs(path):
+        target = EXPECTED / name
+        assert target.exists(), f"{name} missing, run 'make golden'"
+        expected = target.read_bytes()
+        if expected != content.encode("utf-8"):
+            pytest.fail(
+                f"{name} differs from the golden output:\n"
+                f"{diff(name, expected.decode('utf-8'), content)}",
+                pytrace=False,
+            )
+
+
+def test_golden_complete():
+    names = {name for path in LABS for name, _ in outputs(path)}
+    assert sorted(path.name for path in EXPECTED.iterdir()) == sorted(names)
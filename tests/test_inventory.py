@@ -0,0 +1,54 @@
+import csv
+import json
+from pathlib import Path
+
+from eve2cml.dedup import LabSource
+from eve2cml.inventory import Inventory, network_category
+from eve2cml.main import Eve2CMLmapper, main
+
+from .labgen import make_unl
+
+
+def _source(content: str, name: str = "lab.unl") -> LabSource:
+    data = content.encode()
+    return LabSource(name, 0, len(data), lambda: data)
+
+
+def test_scan():
+    inventory = Inventory()
+    inventory.scan(_source(make_unl(10, hub_size=4, config_size=100)))
+    inventory.scan(_source(make_unl(5, template="vios")))
+    inventory.scan(_source("<lab><nodes>"))
+    assert inventory.labs == 2
+    assert inventory.failed == 1
+    assert inventory.nodes == {("qemu", "viosl2", ""): 10, ("qemu", "vios", ""): 5}
+    assert inventory.networks == {"bridge": 14}
+    assert inventory.objects["configs"] == 10
+
+    rows = {row["name"]: row for row in inventory.rows(Eve2CMLmapper.load())}
+    assert rows["qemu:viosl2:"]["mapping"] == "qemu:viosl2 -> iosvl2"
+    assert rows["qemu:viosl2:"]["count"] == 10
+    assert rows["bridge"]["count"] == 14
+
+
+def test_network_category():
+    assert [
+        network_category(t) for t in ("bridge", "nat0", "pnet3", "internal", "x")
+    ] == ["bridge", "nat", "pnet", "internal", "unhandled"]
+
+
+def test_inventory_cli(request, tmp_path, monkeypatch):
+    testdata = Path(request.path).parent / "testdata"
+    monkeypatch.chdir(tmp_path)
+    files = [str(testdata / "test.zip"), str(testdata / "pnet.unl")]
+    main(["--inventory", str(tmp_path / "inventory.csv"), *files])
+    with open(tmp_path / "inventory.csv", newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    assert rows[0] == {"kind": "labs", "name": "scanned", "mapping": "", "count": "2"}
+    assert {"kind": "network", "name": "pnet0", "mapping": "pnet", "count": "1"} in rows
+
+    main(["--inventory", str(tmp_path / "inventory.json"), *files])
+    result = json.loads((tmp_path / "inventory.json").read_text())
+    assert result["node"]["vpcs:vpcs:"] == {"count": 4, "mapping": "unmapped"}
+    # nothing is converted
+    assert not (tmp_path / "test.yaml").exists()
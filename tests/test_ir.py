@@ -0,0 +1,58 @@
+import io
+import pickle
+import struct
+import zlib
+from pathlib import Path
+
+import pytest
+
+from eve2cml import ir
+from eve2cml.main import Eve2CMLmapper, cml_yaml, convert_files, dump_as_text, main
+
+
+def _outputs(lab) -> tuple[str, str]:
+    text = io.StringIO()
+    dump_as_text(text, lab, True)
+    return text.getvalue(), cml_yaml(lab.as_cml_dict())
+
+
+@pytest.mark.parametrize("filename", ["test.unl", "configsets.unl", "pnet.unl"])
+def test_roundtrip(request, filename):
+    testdata = Path(request.path).parent / "testdata" / filename
+    mapper = Eve2CMLmapper.load()
+    [lab] = convert_files(str(testdata), mapper)
+    content = ir.dumps(lab)
+    assert content.startswith(ir.MAGIC)
+    restored = ir.loads(content, mapper)
+    # the annotations come with the snapshot, no HTML parsing needed
+    assert restored.objects.annotations is not None
+    assert all(t.raw and t._data is None for t in restored.objects.textobjects)
+    assert _outputs(restored) == _outputs(lab)
+
+
+def test_invalid():
+    mapper = Eve2CMLmapper.load()
+    with pytest.raises(ir.IRError, match="not a snapshot"):
+        ir.loads(b"<lab/>", mapper)
+    header = struct.pack("!9sH", ir.MAGIC, ir.VERSION + 1)
+    with pytest.raises(ir.IRError, match="not supported"):
+        ir.loads(header, mapper)
+    header = struct.pack("!9sH", ir.MAGIC, ir.VERSION)
+    with pytest.raises(ir.IRError):
+        ir.loads(header + b"garbage", mapper)
+    # only builtin types are accepted
+    payload = zlib.compress(pickle.dumps(Path("/etc/passwd")))
+    with pytest.raises(ir.IRError, match="not allowed"):
+        ir.loads(header + payload, mapper)
+
+
+def test_save_and_load(request, tmp_path, monkeypatch):
+    testdata = Path(request.path).parent / "testdata"
+    monkeypatch.chdir(tmp_path)
+    main(["--save-ir", "ir", str(testdata / "test.zip")])
+    expected = (tmp_path / "test.yaml").read_text()
+    (tmp_path / "test.yaml").unlink()
+    assert len(list((tmp_path / "ir").glob("*.e2cir"))) == 1
+
+    main(["--from-ir", "ir"])
+    assert (tmp_path / "test.yaml").read_text() == expected
@@ -1,8 +1,12 @@
+import json
 import logging
 
 import pytest
 
-from eve2cml.log import initialize_logging
+from eve2cml.log import initialize_logging, log_context, log_queue, stop_logging
+from eve2cml.main import main
+
+from .labgen import make_unl
 
 
 @pytest.mark.parametrize(
@@ -23,11 +27,12 @@ def test_initialize_logging(caplog, nocolor):
     # Retrieve captured log records
     log_records = caplog.records
 
-    # Verify colored log levels
-    if not nocolor:
-        for record in log_records:
-            assert record.levelname.startswith("\033[")
-            assert record.levelname.endswith("\033[0m")
+    # Verify colored log levels, the records themselves are not changed
+    formatter = logging.getLogger().handlers[-1].formatter
+    for record in log_records:
+        assert "\033[" not in record.levelname
+        formatted = formatter.format(record)
+        assert formatted.startswith("\033[") != nocolor
 
     # Verify log messages content
     assert log_records[0].message == "Debug message"
@@ -35,3 +40,75 @@ def test_initialize_logging(caplog, nocolor):
     assert log_records[2].message == "Warning message"
     assert log_records[3].message == "Error message"
     assert log_records[4].message == "Critical message"
+
+
+def _json_lines(text: str) -> list[dict]:
+    return [json.loads(line) for line in text.splitlines() if line.startswith("{")]
+
+
+def test_json_context(capsys):
+    initialize_logging("INFO", nocolor=True, json_lines=True)
+    logger = logging.getLogger("eve2cml.test")
+    logger.info("outside")
+    with log_context(lab="lab.unl", phase="convert"):
+        with log_context(node=3):
+            logger.warning("node %d", 3)
+        logger.info("lab", extra={"node": 7})
+    logger.debug("disabled")
+
+    entries = _json_lines(capsys.readouterr().err)
+    assert [entry["message"] for entry in entries] == ["outside", "node 3", "lab"]
+    assert [(e["lab"], e["node"], e["phase"]) for e in entries] == [
+        (None, None, None),
+        ("lab.unl", 3, "convert"),
+        ("lab.unl", 7, "convert"),
+    ]
+    assert entries[1]["level"] == "WARNING"
+    assert entries[1]["logger"] == "eve2cml.test"
+
+
+def test_queue(capsys):
+    listener = initialize_logging("INFO", nocolor=True, json_lines=True, queue=True)
+    assert listener is not None
+    assert log_queue() is listener.queue
+    with log_context(lab="lab.unl", phase="parse"):
+        logging.getLogger("eve2cml.test").info("queued")
+    stop_logging()
+    assert log_queue() is None
+    # logging directly again
+    logging.getLogger("eve2cml.test").info("direct")
+
+    entries = _json_lines(capsys.readouterr().err)
+    assert [entry["message"] for entry in entries] == ["queued", "direct"]
+    assert entries[0]["lab"] == "lab.unl"
+    assert entries[0]["phase"] == "parse"
+    # only one handler of ours is installed
+    initialize_logging("INFO", nocolor=True)
+    ours = [h for h in logging.getLogger().handlers if h.filters]
+    assert len(ours) == 1
+
+
+def test_queue_workers(capsys, tmp_path):
+    # the records of the worker processes are formatted by the listener of
+    # the main process, with their context
+    lab = tmp_path / "lab.unl"
+    lab.write_text(make_unl(3))
+    main(
+        [
+            "--level",
+            "info",
+            "--log-json",
+            "--log-queue",
+            "--timeout",
+            "30",
+            str(lab),
+        ]
+    )
+    entries = _json_lines(capsys.readouterr().err)
+    phases = {entry["phase"] for entry in entries if entry["lab"] == str(lab)}
+    assert {"parse", "convert"} <= phases
+    parsed = [entry for entry in entries if entry["phase"] == "parse"]
+    assert parsed[0]["message"] == f"Parse XML file {lab}"
+    nodes = {entry["node"] for entry in entries if entry["phase"] == "convert"}
+    assert {1, 2, 3} <= nodes
+    assert log_queue() is None
@@ -19,6 +19,41 @@ def mock_args(mocker):
             text=False,
             file_or_zip=["test.unl"],
             mapper=None,
+            configset=None,
+            max_field_bytes=0,
+            trim_fillers=False,
+            max_ums_ports=0,
+            rewrite_ifaces=False,
+            max_nodes_per_lab=0,
+            dedup=False,
+            diag_limit=5,
+            diag_json=None,
+            validate=False,
+            strict=False,
+            save_ir=None,
+            from_ir=None,
+            keep_going=False,
+            timeout=0,
+            max_memory=0,
+            jobs=1,
+            backend="processes",
+            log_json=False,
+            log_queue=False,
+            config_anchors=False,
+            configs_dir=None,
+            inline_configs=False,
+            config_min_bytes=256,
+            compact=False,
+            failures=None,
+            extract_images=False,
+            inventory=None,
+            capacity_report=None,
+            host_size=None,
+            hosts=0,
+            include=[],
+            exclude=[],
+            lab=[],
+            exclude_lab=[],
         ),
     )
 
@@ -27,7 +62,11 @@ def test_main_yaml_output(mocker, mock_args):
     _ = mock_args
     mocker.patch(
         "eve2cml.main.convert_files",
-        return_value=[mock.Mock(filename="test", as_cml_dict=lambda: {})],
+        return_value=[
+            mock.Mock(
+                filename="test", as_cml_dict=lambda: {}, duplicates=[], converted=None
+            )
+        ],
     )
     mock_open = mocker.patch("builtins.open", mock.mock_open())
     main.main()
@@ -43,6 +82,7 @@ def test_main_dump(mocker, mock_args):
                 filename="test",
                 topology=mock.Mock(nodes=[], networks=[]),
                 objects=mock.Mock(textobjects=[]),
+                duplicates=[],
             )
         ],
     )
@@ -56,3 +56,36 @@ def test_custom_mapper(request, caplog):
     assert pytest_wrapped_e.type is SystemExit
     assert pytest_wrapped_e.value.code == 1
     assert "can't use provided mapper" in caplog.text
+
+
+def test_interface_rules():
+    m = mapper.Eve2CMLmapper().load()
+    assert m.cml_iface_label(0, "iol-xe", "e0") == "Ethernet0/0"
+    assert m.cml_iface_label(13, "iol-xe", "e13") == "Ethernet3/1"
+    assert m.cml_iface_label(31, "iol-xe", "e31") == "Ethernet7/3"
+    # beyond the count of the rule
+    assert m.cml_iface_label(32, "iol-xe", "e32") == "e32"
+    assert m.cml_iface_label(0, "nxosv9000", "") == "mgmt0"
+    assert m.cml_iface_label(64, "nxosv9000", "") == "Ethernet1/64"
+
+    ifaces = mapper.InterfaceList.from_spec(
+        ["mgmt", {"pattern": "Gi{n}/{i // 2}x{slot%3+1}", "start": 10, "step": 2}]
+    )
+    assert ifaces.size is None
+    assert ifaces[0] == "mgmt"
+    assert [ifaces[slot] for slot in (1, 2, 3)] == ["Gi10/0x2", "Gi12/0x3", "Gi14/1x1"]
+    assert ifaces[100000] == "Gi200008/49999x2"
+    assert (
+        mapper.InterfaceList.from_spec(ifaces.as_spec()).as_spec() == ifaces.as_spec()
+    )
+
+    with pytest.raises(IndexError):
+        mapper.InterfaceList.from_spec(["a", "b"])[2]
+    for spec in (
+        {"pattern": "Gi{slot**2}"},
+        {"pattern": "Gi{slot%0}"},
+        [{"pattern": "Gi{slot}"}, "mgmt"],
+        {"name": "Gi{slot}"},
+    ):
+        with pytest.raises((TypeError, ValueError)):
+            mapper.InterfaceList.from_spec(spec)
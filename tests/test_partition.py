@@ -0,0 +1,105 @@
+import json
+from collections import Counter
+
+from eve2cml.main import Eve2CMLmapper, convert_file, main
+from eve2cml.partition import partition, split
+from eve2cml.validate import validate
+
+from .labgen import make_unl
+from .opcount import count_ops, growth_exponent
+
+
+def _cut(part, edges):
+    return sum(1 for a, b in edges if part[a] != part[b])
+
+
+def test_partition_cliques():
+    # two cliques of 5 joined by a single edge, listed interleaved
+    nodes = [f"{side}{idx}" for idx in range(5) for side in "ab"]
+    edges = [
+        (f"{side}{i}", f"{side}{j}")
+        for side in "ab"
+        for i in range(5)
+        for j in range(i + 1, 5)
+    ]
+    edges.append(("a0", "b0"))
+    part = partition(nodes, edges, 5)
+    assert Counter(part.values()) == {0: 5, 1: 5}
+    assert _cut(part, edges) == 1
+
+
+def test_partition_small():
+    assert partition(["n1", "n2"], [("n1", "n2")], 2) == {"n1": 0, "n2": 0}
+
+
+def test_partition_disconnected():
+    nodes = [f"n{idx}" for idx in range(10)]
+    part = partition(nodes, [], 3)
+    assert sorted(Counter(part.values()).values()) == [1, 3, 3, 3]
+
+
+def _grid(size: int) -> tuple[list[str], list[tuple[str, str]]]:
+    nodes = [f"{x}.{y}" for x in range(size) for y in range(size)]
+    edges = [(f"{x}.{y}", f"{x + 1}.{y}") for x in range(size - 1) for y in range(size)]
+    edges += [
+        (f"{x}.{y}", f"{x}.{y + 1}") for x in range(size) for y in range(size - 1)
+    ]
+    return nodes, edges
+
+
+def test_partition_scaling():
+    # grids of about n, 2n, 4n and 8n nodes in four parts, the operations
+    # grow close to linearly (n log n would be about 1.1)
+    sides = [16, 23, 32, 45]
+    counts = [count_ops(partition, *_grid(side), side * side // 4)[0] for side in sides]
+    assert growth_exponent([side * side for side in sides], counts) < 1.2
+
+
+def test_partition_grid():
+    nodes, edges = _grid(100)
+    part = partition(nodes, edges, 2500)
+    sizes = Counter(part.values())
+    assert len(sizes) == 4
+    assert max(sizes.values()) <= 2500
+    # four strips cut 300 edges, a random assignment about 15000
+    assert _cut(part, edges) < 1000
+
+
+def test_split():
+    lab = convert_file(make_unl(10), "split.unl", Eve2CMLmapper.load())
+    cml = lab.as_cml_dict()
+    result = split(lab, cml, 4)
+    assert len(result.parts) == 3
+    assert len(result.cuts) == 2
+    labels = [node["label"] for part in result.parts for node in part["nodes"]]
+    assert sorted(label for label in labels if label.startswith("N")) == sorted(
+        node["label"] for node in cml["nodes"]
+    )
+    for part in result.parts:
+        assert validate(part, lab) == []
+    bridges = Counter(
+        node["configuration"]
+        for part in result.parts
+        for node in part["nodes"]
+        if node["node_definition"] == "external_connector"
+    )
+    assert bridges == {cut.bridge: 2 for cut in result.cuts}
+    ends = result.cuts[0].ends
+    assert [end["part"] for end in ends] == [1, 2]
+    assert ends[0]["interface"] == "GigabitEthernet0/1"
+
+
+def test_max_nodes_per_lab_cli(tmp_path):
+    lab_file = tmp_path / "big.unl"
+    lab_file.write_text(make_unl(12))
+    main(["--max-nodes-per-lab", "5", "--strict", str(lab_file)])
+    assert not (tmp_path / "big.yaml").exists()
+    manifest = json.loads((tmp_path / "big--manifest.json").read_text())
+    assert [part["file"] for part in manifest["parts"]] == [
+        f"big--part{idx}.yaml" for idx in (1, 2, 3)
+    ]
+    assert len(manifest["cut_links"]) == 2
+    assert sum(part["nodes"] for part in manifest["parts"]) == 12
+    assert sum(part["connectors"] for part in manifest["parts"]) == 4
+    for idx in (1, 2, 3):
+        assert (tmp_path / f"big--part{idx}.yaml").exists()
@@ -0,0 +1,92 @@
+import time
+
+from eve2cml.main import Eve2CMLmapper, convert_file
+from eve2cml.options import Options
+from eve2cml.rewrite import InterfaceRenamer, name_variants, rename_table
+
+from .labgen import make_unl
+
+
+def test_name_variants():
+    variants = name_variants("Gi0/1")
+    assert {"Gi0/1", "Gig0/1", "GigabitEthernet0/1"} <= variants
+    assert "G0/1" not in variants
+    assert "Ethernet0/1" in name_variants("e0/1")
+    assert name_variants("mgmt") == {"mgmt"}
+
+
+def test_rename_table():
+    table = rename_table(
+        [("e0/0", "GigabitEthernet0/0"), ("e0/1", "GigabitEthernet0/1"), ("x", "x")]
+    )
+    assert table["ethernet0/1"] == "GigabitEthernet0/1"
+    assert table["e0/0"] == "GigabitEthernet0/0"
+    assert "x" not in table
+    # the same variant for two different labels is ambiguous
+    assert "e0" not in rename_table([("e0", "Gi0/0"), ("E0", "Gi0/1")])
+
+
+def test_rewrite_boundaries():
+    renamer = InterfaceRenamer(
+        rename_table(
+            [
+                ("e0/1", "GigabitEthernet0/1"),
+                ("e0/2", "GigabitEthernet0/2"),
+                ("e0/10", "GigabitEthernet0/10"),
+            ]
+        )
+    )
+    config = (
+        "interface Ethernet0/1\n"
+        " description to e0/2 of R2\n"
+        "interface Ethernet0/1.100\n"
+        "interface Ethernet0/10\n"
+        "interface Ethernet0/1/0\n"
+        "interface XEthernet0/2\n"
+        "ip route 0.0.0.0 0.0.0.0 eth0/2\n"
+    )
+    result, count = renamer.rewrite(config)
+    assert result == (
+        "interface GigabitEthernet0/1\n"
+        " description to GigabitEthernet0/2 of R2\n"
+        "interface GigabitEthernet0/1.100\n"
+        "interface GigabitEthernet0/10\n"
+        "interface Ethernet0/1/0\n"
+        "interface XEthernet0/2\n"
+        "ip route 0.0.0.0 0.0.0.0 GigabitEthernet0/2\n"
+    )
+    assert count == 5
+
+
+def test_rewrite_swap():
+    # one pass, a replaced name is never replaced again
+    renamer = InterfaceRenamer(rename_table([("e0/1", "e0/2"), ("e0/2", "e0/1")]))
+    assert renamer.rewrite("e0/1 e0/2")[0] == "e0/2 e0/1"
+
+
+def test_rewrite_is_linear_in_the_table():
+    pairs = [
+        (f"e{s}/{p}", f"GigabitEthernet{s}/{p}") for s in range(50) for p in range(20)
+    ]
+    renamer = InterfaceRenamer(rename_table(pairs))
+    config = "interface Ethernet49/19\n no shutdown\n" * 2000
+    start = time.perf_counter()
+    result, count = renamer.rewrite(config)
+    assert count == 2000
+    assert result.startswith("interface GigabitEthernet49/19\n")
+    assert time.perf_counter() - start < 1
+
+
+def test_rewrite_ifaces_option():
+    mapper = Eve2CMLmapper.load()
+    for rewrite in (False, True):
+        lab = convert_file(
+            make_unl(2, template="viosl2"),
+            "rewrite.unl",
+            mapper,
+            options=Options(rewrite_ifaces=rewrite),
+        )
+        lab.topology.nodes[0].cml_config = "interface e1\n shutdown\n"
+        config = lab.as_cml_dict()["nodes"][0]["configuration"]
+        expected = "GigabitEthernet0/1" if rewrite else "e1"
+        assert config == f"interface {expected}\n shutdown\n"
@@ -0,0 +1,95 @@
+import io
+from typing import Any
+
+import pytest
+
+from eve2cml.main import Eve2CMLmapper, cml_yaml, convert_file, dump_as_text
+from eve2cml.options import Options
+from eve2cml.rewrite import name_variants
+from eve2cml.validate import validate
+
+from .labgen import make_unl
+from .opcount import count_ops, growth_exponent
+
+# Each phase of a conversion is measured in operations (see opcount.py) for
+# labs of n, 2n, 4n and 8n nodes.  n log n over these sizes has a growth
+# exponent of about 1.2, quadratic code has one close to 2.  A small
+# quadratic part shows first between the largest sizes, that step is
+# checked on its own as well.
+SIZES = [50, 100, 200, 400]
+MAX_EXPONENT = 1.25
+# the YAML emitter makes up most of the run time, it gets smaller labs
+EMIT_SCALE = 5
+
+PHASES = ["parse", "links", "nodes", "emit", "validate", "text"]
+
+
+def _converted(nodes: int, phases: dict[str, int]) -> dict[str, Any]:
+    # a chain of nodes with configs and one network connecting all of them,
+    # which becomes a tree of unmanaged switches
+    content = make_unl(nodes, hub_size=nodes, config_size=4)
+    mapper = Eve2CMLmapper.load()
+    options = Options(max_ums_ports=4)
+    phases["parse"], lab = count_ops(
+        convert_file, content, "lab.unl", mapper, None, options
+    )
+    phases["links"], (links, added) = count_ops(lab.convert_links)
+    phases["nodes"], cml_nodes = count_ops(
+        lambda: [
+            node.as_cml_dict(node.id, lab) for node in [*lab.topology.nodes, *added]
+        ]
+    )
+    cml = {
+        "lab": {"title": lab.name},
+        "annotations": [],
+        "links": links,
+        "nodes": cml_nodes,
+    }
+    phases["validate"], _ = count_ops(validate, cml, lab)
+    text = convert_file(content, "lab.unl", mapper, None, options)
+    phases["text"], _ = count_ops(dump_as_text, io.StringIO(), text, True)
+    return cml
+
+
+@pytest.fixture(scope="module")
+def measured() -> dict[str, list[int]]:
+    counts: dict[str, list[int]] = {phase: [] for phase in PHASES}
+    for nodes in SIZES:
+        phases: dict[str, int] = {}
+        _converted(nodes, phases)
+        phases["emit"], _ = count_ops(cml_yaml, _converted(nodes // EMIT_SCALE, {}))
+        for phase in PHASES:
+            counts[phase].append(phases[phase])
+    return counts
+
+
+@pytest.mark.parametrize("phase", PHASES)
+def test_phase_scaling(measured, phase):
+    counts = measured[phase]
+    exponent = growth_exponent(SIZES, counts)
+    assert exponent < MAX_EXPONENT, f"{phase}: {counts} grows with n^{exponent:.2f}"
+    last = growth_exponent(SIZES[-2:], counts[-2:])
+    assert last < MAX_EXPONENT, f"{phase}: {counts} grows with n^{last:.2f} at the end"
+
+
+def test_growth_exponent():
+    sizes = [10, 20, 40, 80]
+    assert growth_exponent(sizes, [3 * n for n in sizes]) == pytest.approx(1)
+    assert growth_exponent(sizes, [n * n + n for n in sizes]) > 1.8
+
+
+def test_count_ops():
+    # only calls are counted outside of eve2cml
+    def loop(n):
+        total = 0
+        for idx in range(n):
+            total += idx
+        return total
+
+    small, result = count_ops(loop, 10)
+    large, _ = count_ops(loop, 20)
+    assert result == 45
+    assert small == large == 1
+    # and the lines of eve2cml
+    lines, _ = count_ops(name_variants, "Gi0/1")
+    assert lines > 10
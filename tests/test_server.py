@@ -0,0 +1,78 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+import yaml
+
+from eve2cml.mapper import Eve2CMLmapper
+from eve2cml.server import ConversionServer
+
+
+async def _request(port: int, method: str, target: str, body: bytes = b""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n"
+    if method == "POST":
+        head += f"Content-Length: {len(body)}\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    header, _, payload = response.partition(b"\r\n\r\n")
+    lines = header.decode().split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return status, headers, payload.decode()
+
+
+def _run(requests):
+    async def runner():
+        server = ConversionServer(Eve2CMLmapper.load(), workers=1)
+        async_server = await server.start("127.0.0.1", 0)
+        port = async_server.sockets[0].getsockname()[1]
+        try:
+            return [await _request(port, *request) for request in requests]
+        finally:
+            async_server.close()
+            await async_server.wait_closed()
+            server.close()
+
+    return asyncio.run(runner())
+
+
+@pytest.mark.parametrize(
+    "filename,fmt",
+    [
+        ("test.unl", "yaml"),
+        ("test.unl", "json"),
+        ("test.zip", "yaml"),
+    ],
+)
+def test_convert(request, filename, fmt):
+    content = (Path(request.path).parent / "testdata" / filename).read_bytes()
+    target = f"/convert?filename={filename}&format={fmt}"
+    [(status, headers, payload)] = _run([("POST", target, content)])
+    assert status == 200
+    assert headers["X-Eve2cml-Labs"] == "1"
+    assert "parse;dur=" in headers["Server-Timing"]
+    assert "queue;dur=" in headers["Server-Timing"]
+    assert headers["X-Response-Time"].endswith("ms")
+    if fmt == "json":
+        [result] = json.loads(payload).values()
+    else:
+        result = yaml.safe_load(payload)
+    assert len(result["nodes"]) == 2
+    assert len(result["links"]) == 1
+
+
+def test_errors():
+    responses = _run(
+        [
+            ("GET", "/health"),
+            ("GET", "/convert"),
+            ("GET", "/nothere"),
+            ("POST", "/convert?format=xml", b"<lab/>"),
+            ("POST", "/convert", b"this is not XML"),
+        ]
+    )
+    assert [status for status, _, _ in responses] == [200, 405, 404, 400, 422]
@@ -0,0 +1,64 @@
+import pytest
+
+from eve2cml.eve.style import (
+    color_convert,
+    hsl_to_hex,
+    parse_rotate,
+    parse_style,
+    rgb_to_hex,
+    with_opacity,
+)
+
+
+def test_parse_style():
+    assert parse_style("left: 10px; top:20px;;  z-index : 3") == {
+        "left": "10px",
+        "top": "20px",
+        "z-index": "3",
+    }
+    style = "background: url(data:image/png;base64,AAAA); font-family: 'a;b:c'"
+    assert parse_style(style) == {
+        "background": "url(data:image/png;base64,AAAA)",
+        "font-family": "'a;b:c'",
+    }
+    # every caller gets its own copy of the cached result
+    parse_style("left: 1px")["left"] = "2px"
+    assert parse_style("left: 1px") == {"left": "1px"}
+
+
+def test_rgba():
+    assert rgb_to_hex("rgba(255, 0, 0, 0.5)") == "#FF000080"
+    assert rgb_to_hex("rgba(255, 0, 0, 50%)") == "#FF000080"
+    assert rgb_to_hex("rgba(255, 0, 0, .25)") == "#FF000040"
+    with pytest.raises(ValueError):
+        rgb_to_hex("rgba(255, 0, 0, 1.5)")
+
+
+def test_hsl():
+    assert hsl_to_hex("hsl(0, 100%, 50%)") == "#FF0000FF"
+    assert hsl_to_hex("hsl(120deg 100% 25%)") == "#008000FF"
+    assert hsl_to_hex("hsla(240, 100%, 50%, 0)") == "#0000FF00"
+    with pytest.raises(ValueError):
+        hsl_to_hex("hsl(0, 101%, 50%)")
+
+
+def test_color_convert():
+    assert color_convert("#123456") == "#123456FF"
+    assert color_convert("#abc") == "#aabbccFF"
+    assert color_convert("#abcd") == "#aabbccdd"
+    assert color_convert("transparent") == "#00000000"
+    assert color_convert("hsl(0, 0%, 100%)") == "#FFFFFFFF"
+    assert color_convert("red") == "red"
+
+
+def test_with_opacity():
+    assert with_opacity("#FF0000FF", "0.5") == "#FF000080"
+    assert with_opacity("#FF000080", "50%", "") == "#FF000040"
+    assert with_opacity("#FF0000FF", "") == "#FF0000FF"
+    assert with_opacity("red", "0.5") == "red"
+
+
+def test_parse_rotate():
+    assert parse_rotate("rotate(15deg)") == 15
+    assert parse_rotate("translate(1px, 2px) rotate(-7.5deg)") == -7
+    assert parse_rotate("scale(2)") == 0
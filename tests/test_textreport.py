@@ -0,0 +1,46 @@
+import io
+from pathlib import Path
+
+from eve2cml.eve import Config
+from eve2cml.main import Eve2CMLmapper, convert_files
+from eve2cml.textreport import CHUNK_SIZE, TextReport
+
+
+class RecordingWriter(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.sizes: list[int] = []
+
+    def write(self, s):
+        self.sizes.append(len(s))
+        return super().write(s)
+
+
+def test_field_truncation():
+    report = TextReport(io.StringIO(), max_field_bytes=8)
+    assert "".join(report.field("short")) == "short"
+    assert "".join(report.field("exactly8")) == "exactly8"
+    assert (
+        "".join(report.field("0123456789"))
+        == "01234567... [truncated, 10 characters total]"
+    )
+    # never split a multi-byte character
+    assert "".join(report.field("äöüäöü")).startswith("äöüä...")
+
+
+def test_large_config_is_streamed(request):
+    testdata = Path(request.path).parent / "testdata" / "test.unl"
+    [lab] = convert_files(str(testdata), Eve2CMLmapper.load())
+    big = Config(1, "")
+    big._data = "x" * (5 * 1024 * 1024)
+    lab.objects.configs = [big]
+
+    out = RecordingWriter()
+    TextReport(out, dump_all=True).write(lab)
+    assert max(out.sizes) < 2 * CHUNK_SIZE
+    assert out.getvalue().count("x") >= 5 * 1024 * 1024
+
+    out = RecordingWriter()
+    TextReport(out, dump_all=True, max_field_bytes=100).write(lab)
+    assert f"truncated, {5 * 1024 * 1024} characters total" in out.getvalue()
+    assert len(out.getvalue()) < 10000
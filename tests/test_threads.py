@@ -0,0 +1,89 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from eve2cml.diagnostics import Diagnostics
+from eve2cml.main import Eve2CMLmapper, cml_yaml, convert_file, dump_as_text, main
+from eve2cml.options import Options
+
+from .goldgen import LABS
+from .labgen import make_unl
+
+# conversions on a thread pool must give the serial results, a few
+# conversions of each lab at once are enough to hit shared state
+CONVERSIONS = 40
+
+
+def _contents() -> list[tuple[str, str]]:
+    contents = [(path.name, path.read_text(encoding="utf-8")) for path in LABS]
+    contents.append(("hub.unl", make_unl(30, hub_size=30, config_size=4)))
+    return contents
+
+
+def _convert(name: str, content: str, diagnostics=None) -> tuple[str, str]:
+    mapper = Eve2CMLmapper.load()
+    options = Options(max_ums_ports=4)
+    lab = convert_file(content, name, mapper, diagnostics, options)
+    text = io.StringIO()
+    dump_as_text(text, lab, True)
+    return cml_yaml(lab.as_cml_dict()), text.getvalue()
+
+
+def test_concurrent_conversions():
+    contents = _contents()
+    serial = [_convert(name, content) for name, content in contents]
+    diagnostics = Diagnostics()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(
+            pool.map(
+                lambda idx: _convert(*contents[idx % len(contents)], diagnostics),
+                range(CONVERSIONS),
+            )
+        )
+    for idx, result in enumerate(results):
+        assert result == serial[idx % len(contents)], contents[idx % len(contents)][0]
+    # every conversion is counted
+    serialized = sum(event.count for event in diagnostics.events["serialized"].values())
+    assert serialized % (CONVERSIONS // len(contents)) == 0
+
+
+def test_shared_lab():
+    # the same parsed lab converted on many threads at once
+    name, content = "hub.unl", make_unl(30, hub_size=30, config_size=4)
+    lab = convert_file(
+        content, name, Eve2CMLmapper.load(), None, Options(max_ums_ports=4)
+    )
+    nodes = len(lab.topology.nodes)
+    expected = lab.as_cml_dict()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: lab.as_cml_dict(), range(CONVERSIONS)))
+    # the dicts are compared, emitting YAML does not touch the lab
+    assert results == [expected] * CONVERSIONS
+    # the switches for the hub are not added to the lab
+    assert len(lab.topology.nodes) == nodes
+
+
+def test_backend_threads(tmp_path):
+    files = []
+    for idx in range(12):
+        path = tmp_path / f"lab{idx}.unl"
+        path.write_text(make_unl(5 + idx, hub_size=3))
+        files.append(str(path))
+    main(files)
+    serial = {path.name: path.read_bytes() for path in tmp_path.glob("*.yaml")}
+    for path in tmp_path.glob("*.yaml"):
+        path.unlink()
+    main(["--jobs", "4", "--backend", "threads", *files])
+    threaded = {path.name: path.read_bytes() for path in tmp_path.glob("*.yaml")}
+    assert len(serial) == 12
+    assert threaded == serial
+
+
+def test_backend_threads_limits(tmp_path):
+    lab = tmp_path / "lab.unl"
+    lab.write_text(make_unl(2))
+    with pytest.raises(SystemExit):
+        main(["--backend", "threads", "--timeout", "5", str(lab)])
+    assert not Path(tmp_path / "lab.yaml").exists()
@@ -0,0 +1,69 @@
+from collections import defaultdict
+
+import pytest
+
+from eve2cml.main import Eve2CMLmapper, convert_file
+from eve2cml.options import Options
+
+from .labgen import make_unl
+
+
+def _convert(hub_size: int, max_ums_ports: int):
+    content = make_unl(hub_size, ethernet=4, template="viosl2", hub_size=hub_size)
+    lab = convert_file(
+        content,
+        "tree.unl",
+        Eve2CMLmapper.load(),
+        options=Options(max_ums_ports=max_ums_ports),
+    )
+    return lab.as_cml_dict()
+
+
+@pytest.mark.parametrize(
+    "hub_size,max_ports", [(5, 0), (33, 32), (300, 32), (300, 3), (64, 8)]
+)
+def test_ums_tree(hub_size, max_ports):
+    result = _convert(hub_size, max_ports)
+    switches = {
+        node["id"] for node in result["nodes"] if node["label"].startswith("ums-")
+    }
+    if max_ports == 0 or hub_size <= max_ports:
+        assert len(switches) == 1
+    else:
+        # linear growth, about one switch per max_ports-2 members
+        assert len(switches) <= hub_size // (max_ports - 2) + 3
+
+    # every switch port is used once and stays within the limit
+    used = defaultdict(set)
+    graph = defaultdict(set)
+    for link in result["links"]:
+        for node, iface in ((link["n1"], link["i1"]), (link["n2"], link["i2"])):
+            assert iface not in used[node]
+            used[node].add(iface)
+        graph[link["n1"]].add(link["n2"])
+        graph[link["n2"]].add(link["n1"])
+    for switch in switches:
+        assert len(used[switch]) <= (max_ports or hub_size)
+
+    # without the p2p chain links, all hub members must still be connected
+    # through the switches
+    hub_graph = defaultdict(set)
+    for node, peers in graph.items():
+        for peer in peers:
+            if node in switches or peer in switches:
+                hub_graph[node].add(peer)
+    start = next(iter(switches))
+    seen = {start}
+    todo = [start]
+    while todo:
+        for peer in hub_graph[todo.pop()]:
+            if peer not in seen:
+                seen.add(peer)
+                todo.append(peer)
+    members = {f"n{idx}" for idx in range(1, hub_size + 1)}
+    assert members <= seen
+    assert switches <= seen
+
+    # tree: one link less than the number of nodes in it
+    hub_links = sum(len(peers) for peers in hub_graph.values()) // 2
+    assert hub_links == len(members) + len(switches) - 1
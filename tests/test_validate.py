@@ -0,0 +1,79 @@
+import pytest
+
+from eve2cml.main import Eve2CMLmapper, convert_file, main
+from eve2cml.validate import validate
+
+from .labgen import make_unl
+from .opcount import count_ops, growth_exponent
+
+
+def _lab(nodes: int, **kwargs):
+    return convert_file(make_unl(nodes, **kwargs), "valid.unl", Eve2CMLmapper.load())
+
+
+def _codes(errors) -> list[str]:
+    return sorted(error.code for error in errors)
+
+
+def test_valid():
+    lab = _lab(20, hub_size=5)
+    assert validate(lab.as_cml_dict(), lab) == []
+
+
+def test_invalid_topology():
+    lab = _lab(3)
+    cml = lab.as_cml_dict()
+    cml["nodes"][1]["label"] = cml["nodes"][0]["label"]
+    cml["nodes"][2]["interfaces"][2]["slot"] = 1
+    cml["links"].append({**cml["links"][0], "id": "l0"})
+    cml["links"].append({**cml["links"][1], "id": "l9", "n1": "n99"})
+    cml["links"].append({**cml["links"][1], "id": "l8", "i1": "i99"})
+    cml["links"].append({**cml["links"][1], "id": "l7", "i1": "i5"})
+    assert _codes(validate(cml, lab)) == [
+        "dangling-interface",
+        "dangling-node",
+        "duplicate-label",
+        "duplicate-link-id",
+        "duplicate-slot",
+        "filler-link",
+        "interface-in-use",
+        "interface-in-use",
+        "interface-in-use",
+    ]
+    # without the lab, fillers are not known
+    assert "filler-link" not in _codes(validate(cml))
+
+
+def test_dangling_network_and_range():
+    # the interface list of iosv has 16 entries
+    lab = _lab(2, ethernet=20, template="vios")
+    lab.topology.nodes[0].interfaces[0].network_id = 42
+    cml = lab.as_cml_dict()
+    errors = validate(cml, lab)
+    assert _codes(errors).count("slot-out-of-range") == 8
+    assert "dangling-network" in _codes(errors)
+    assert errors[0].as_dict()["node"] == "n1"
+
+
+def test_scaling():
+    # operations, not the run time, grow linearly with the lab size
+    sizes = [500, 1000, 2000, 4000]
+    counts = []
+    for nodes in sizes:
+        lab = _lab(nodes)
+        count, errors = count_ops(validate, lab.as_cml_dict(), lab)
+        assert errors == []
+        counts.append(count)
+    assert growth_exponent(sizes, counts) < 1.1
+
+
+def test_strict(request, tmp_path, monkeypatch):
+    lab = tmp_path / "lab.unl"
+    lab.write_text(make_unl(2, ethernet=20, template="vios"))
+    monkeypatch.chdir(tmp_path)
+    main(["--validate", str(lab)])
+    assert (tmp_path / "lab.yaml").exists()
+    (tmp_path / "lab.yaml").unlink()
+    with pytest.raises(SystemExit):
+        main(["--strict", str(lab)])
+    assert not (tmp_path / "lab.yaml").exists()